@@ -0,0 +1,413 @@
+# Tetris Game Agents (computer players)
+
+import random
+import time
+from game import ACTIONS, Tetromino
+from placements import drop_positions, position_moves
+from transposition import TranspositionTable
+from config import BEAM_WIDTH, BEAM_TIME_BUDGET
+
+# Seconds left unused of a search's time budget, covering the longest
+# step between two clock checks
+SEARCH_MARGIN = 0.0001
+
+# Weights of the board features scored by evaluate_board, per unit
+HEURISTIC_WEIGHTS = {
+    'height': -0.510066,    # sum of the column heights
+    'lines': 0.760666,      # lines cleared on the way to the board
+    'holes': -0.35663,      # empty cells below the top of their column
+    'bumpiness': -0.184483,  # sum of height differences of neighbouring columns
+}
+
+
+def evaluate_board(board, weights=HEURISTIC_WEIGHTS):
+    """
+    Score a board by its surface, from the heights and holes it keeps.
+    
+    Args:
+        board: Board object
+        weights: Dictionary of feature weights (see HEURISTIC_WEIGHTS)
+    
+    Returns:
+        Score (higher is better), not counting cleared lines
+    """
+    return surface_value(board.heights, sum(board.holes), weights)
+
+
+def surface_value(heights, holes, weights=HEURISTIC_WEIGHTS):
+    """
+    Score a board surface.
+    
+    Args:
+        heights: List of column heights
+        holes: Total number of holes
+        weights: Dictionary of feature weights (see HEURISTIC_WEIGHTS)
+    
+    Returns:
+        Score (higher is better), not counting cleared lines
+    """
+    bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+    return (weights['height'] * sum(heights) + weights['holes'] * holes
+            + weights['bumpiness'] * bumpiness)
+
+
+class RandomAgent:
+    """Presses a random key every tick."""
+    
+    def __init__(self, seed=None):
+        """
+        Initialize the agent.
+        
+        Args:
+            seed: Optional seed for the agent's random choices
+        """
+        self.rng = random.Random(seed)
+    
+    def act(self, game):
+        """
+        Choose the input for the current tick.
+        
+        Args:
+            game: TetrisGame object
+        
+        Returns:
+            Action name from game.ACTIONS, or None for no input
+        """
+        return self.rng.choice(ACTIONS)
+
+
+class DropAgent:
+    """Rotates and shifts each piece randomly, then hard drops it."""
+    
+    def __init__(self, seed=None):
+        """
+        Initialize the agent.
+        
+        Args:
+            seed: Optional seed for the agent's random choices
+        """
+        self.rng = random.Random(seed)
+        self.plan = []
+    
+    def act(self, game):
+        """
+        Choose the input for the current tick.
+        
+        Args:
+            game: TetrisGame object
+        
+        Returns:
+            Action name from game.ACTIONS, or None for no input
+        """
+        if not self.plan:
+            shift = self.rng.randint(-5, 5)
+            self.plan = (['rotate'] * self.rng.randint(0, 3)
+                         + ['move_left' if shift < 0 else 'move_right'] * abs(shift)
+                         + ['hard_drop'])
+        return self.plan.pop(0)
+
+
+class BeamAgent:
+    """
+    Plans each piece with an anytime beam search over the known pieces.
+    
+    The search places the current piece every way drop_positions finds,
+    keeps the best beam_width boards, places the next piece on each of
+    them, and so on for every piece of preview, one layer at a time. Each
+    finished layer replaces the chosen move, so when the time budget runs
+    out the agent plays the best move of the deepest layer it finished.
+    The chosen placement's inputs are then played one per tick.
+    """
+    
+    def __init__(self, seed=None, beam_width=BEAM_WIDTH, time_budget=BEAM_TIME_BUDGET,
+                 weights=HEURISTIC_WEIGHTS):
+        """
+        Initialize the agent.
+        
+        Args:
+            seed: Unused; the search is deterministic given the time it gets
+            beam_width: Boards kept from one layer to expand in the next
+            time_budget: Seconds a search may take, or None to always
+                         search every layer (reproducible, for evaluations)
+            weights: Dictionary of feature weights (see HEURISTIC_WEIGHTS)
+        """
+        self.beam_width = beam_width
+        self.time_budget = time_budget
+        self.weights = weights
+        self.plan = []
+        self.plan_key = None
+        
+        # Board evaluations by Zobrist hash; the boards searched after one
+        # piece are the roots of the search for the next
+        self.table = TranspositionTable()
+        
+        # Statistics
+        self.searches = 0
+        self.nodes = 0
+        self.depth = 0
+        self.search_time = 0.0
+        self.timeouts = 0
+    
+    def act(self, game):
+        """
+        Choose the input for the current tick.
+        
+        Args:
+            game: TetrisGame object
+        
+        Returns:
+            Action name from game.ACTIONS, or None for no input
+        """
+        if game.game_over:
+            return None
+        
+        key = (id(game.current_piece), game.pieces_placed)
+        if key != self.plan_key:
+            self.plan = position_moves(self.search(game))
+            self.plan_key = key
+        return self.plan.pop(0) if self.plan else None
+    
+    def search(self, game):
+        """
+        Find the best placement for the current piece.
+        
+        Args:
+            game: TetrisGame object
+        
+        Returns:
+            Position tuple from placements.drop_positions
+        """
+        start = time.perf_counter()
+        deadline = (start + self.time_budget - SEARCH_MARGIN
+                    if self.time_budget is not None else None)
+        self.searches += 1
+        self.table.new_search()
+        
+        board = game.board
+        piece = game.current_piece
+        roots = drop_positions(board, piece.shape_type, piece.rotation, piece.x, piece.y)
+        best = roots[0]
+        
+        # Parents are (lines so far, board, its occupancy, root position)
+        parents = [(0, board, board.occupancy(), None)]
+        pieces = [piece.shape_type, game.next_piece.shape_type]
+        for depth, shape_type in enumerate(pieces):
+            spawn = Tetromino(shape_type, board.width)
+            nodes = []
+            for lines, parent, occupancy, root in parents:
+                if root is None:
+                    positions = roots
+                else:
+                    if deadline is not None and time.perf_counter() >= deadline:
+                        return self.stop(start, depth, best, depth == 0 and nodes)
+                    positions = drop_positions(parent, shape_type, spawn.rotation,
+                                               spawn.x, spawn.y)
+                holes = sum(parent.holes)
+                for position in positions:
+                    if deadline is not None and time.perf_counter() >= deadline:
+                        return self.stop(start, depth, best, depth == 0 and nodes)
+                    node = self.score(parent, occupancy, holes, spawn, position, lines, root)
+                    if node is not None:
+                        nodes.append(node)
+            
+            if not nodes:
+                break
+            nodes.sort(key=lambda node: node[0], reverse=True)
+            best = nodes[0][-1]
+            if depth + 1 < len(pieces):
+                parents = [self.materialize(node, spawn) for node in nodes[:self.beam_width]]
+        
+        self.finish(start, len(pieces))
+        return best
+    
+    def score(self, board, occupancy, holes, piece, position, lines, root):
+        """
+        Score one placement on a board.
+        
+        Placements that clear no lines are scored from the board's heights
+        and holes without copying the board; the copy is only made if the
+        node is kept for the next layer (see materialize).
+        
+        Args:
+            board: Board object to place on
+            occupancy: The board's row bitmasks
+            holes: Total holes on the board
+            piece: Tetromino of the shape being placed
+            position: Position tuple from placements.drop_positions
+            lines: Lines cleared on the way to the board
+            root: Position of the current piece this node descends from,
+                  or None on the first layer
+        
+        Returns:
+            Node tuple (score, lines, board, occupancy, position, child,
+            root), or None if the placement ends the game
+        """
+        self.nodes += 1
+        rotation, x, y = position[:3]
+        masks = board.table[piece.shape_type][rotation]
+        if y + masks.top <= 0:
+            return None
+        root = position if root is None else root
+        
+        full_row = (1 << board.width) - 1
+        if any(occupancy[y + dy] | mask == full_row for dy, mask in masks.rows[x]):
+            piece.rotation = rotation
+            child = board.clone()
+            child.place_piece(piece, x, y)
+            cleared = child.clear_lines()
+            placed = list(occupancy)
+            for dy, mask in masks.rows[x]:
+                placed[y + dy] |= mask
+            kept = [row for row in placed if row != full_row]
+            child_occupancy = (0,) * (len(placed) - len(kept)) + tuple(kept)
+            value = self.table.get(child.zobrist)
+            if value is None:
+                value = evaluate_board(child, self.weights)
+                self.table.put(child.zobrist, value)
+            lines += cleared
+            return (self.weights['lines'] * lines + value, lines, board, occupancy,
+                    position, (child, child_occupancy), root)
+        
+        # Same height and hole bookkeeping as Board.place_piece
+        heights = board.heights[:]
+        cell_keys = board.cell_keys
+        zobrist = board.zobrist
+        for dy, col in masks.cells[x]:
+            row = y + dy
+            zobrist ^= cell_keys[row][col]
+            height = board.height - row
+            if height > heights[col]:
+                holes += height - 1 - heights[col]
+                heights[col] = height
+            else:
+                holes -= 1
+        
+        value = self.table.get(zobrist)
+        if value is None:
+            value = surface_value(heights, holes, self.weights)
+            self.table.put(zobrist, value)
+        return (self.weights['lines'] * lines + value, lines, board, occupancy,
+                position, None, root)
+    
+    def materialize(self, node, piece):
+        """
+        Build the board a node stands for, to expand it.
+        
+        Args:
+            node: Node tuple from score()
+            piece: Tetromino of the shape the node placed
+        
+        Returns:
+            Parent tuple (lines so far, board, occupancy, root position)
+        """
+        _, lines, board, occupancy, position, child, root = node
+        if child is None:
+            rotation, x, y = position[:3]
+            piece.rotation = rotation
+            board = board.clone()
+            board.place_piece(piece, x, y)
+            occupancy = list(occupancy)
+            for dy, mask in board.table[piece.shape_type][rotation].rows[x]:
+                occupancy[y + dy] |= mask
+            child = (board, tuple(occupancy))
+        return (lines, child[0], child[1], root)
+    
+    def stop(self, start, depth, best, partial):
+        """
+        End a search that ran out of time.
+        
+        Args:
+            start: time.perf_counter() value at the start of the search
+            depth: Layers finished
+            best: Best root position of the deepest finished layer
+            partial: Nodes scored so far on the first layer, if any
+        
+        Returns:
+            Position to play: best, or the best partial first-layer node
+        """
+        self.timeouts += 1
+        self.finish(start, depth)
+        if partial:
+            return max(partial, key=lambda node: node[0])[-1]
+        return best
+    
+    def finish(self, start, depth):
+        """Record the time and depth of a search."""
+        self.search_time += time.perf_counter() - start
+        self.depth += depth
+    
+    def stats(self):
+        """
+        Get the search statistics.
+        
+        Returns:
+            Dictionary with searches, nodes, nodes per second, mean search
+            time and depth, searches cut short by the budget, and the
+            transposition table's hit rate
+        """
+        return {
+            'searches': self.searches,
+            'nodes': self.nodes,
+            'nodes_per_second': self.nodes / self.search_time if self.search_time else 0.0,
+            'mean_search_ms': 1000 * self.search_time / self.searches if self.searches else 0.0,
+            'mean_depth': self.depth / self.searches if self.searches else 0.0,
+            'timeouts': self.timeouts,
+            'table_hit_rate': self.table.stats()['hit_rate'],
+        }
+
+
+class VectorAgent:
+    """
+    Places each piece where the board features score best.
+    
+    Every drop placement of the current piece is scored in one batch by
+    features.score_placements, with no lookahead. Only plays on
+    BOARD_WIDTH x BOARD_HEIGHT boards (act raises ValueError on others).
+    features, and with it NumPy, is imported when the first VectorAgent is
+    created, so importing this module stays cheap for the other agents.
+    """
+    
+    def __init__(self, seed=None, weights=HEURISTIC_WEIGHTS):
+        """
+        Initialize the agent.
+        
+        Args:
+            seed: Unused; the agent is deterministic
+            weights: Dictionary of weights over features.FEATURES
+        """
+        from features import weight_vector
+        self.weights = weight_vector(weights)
+        self.plan = []
+        self.plan_key = None
+    
+    def act(self, game):
+        """
+        Choose the input for the current tick.
+        
+        Args:
+            game: TetrisGame object
+        
+        Returns:
+            Action name from game.ACTIONS, or None for no input
+        
+        Raises:
+            ValueError: If the game's board isn't the default size
+        """
+        if game.game_over:
+            return None
+        
+        key = (id(game.current_piece), game.pieces_placed)
+        if key != self.plan_key:
+            from features import score_placements
+            positions, scores = score_placements(game, self.weights)
+            self.plan = position_moves(positions[scores.argmax()].tolist())
+            self.plan_key = key
+        return self.plan.pop(0) if self.plan else None
+
+
+AGENTS = {
+    'random': RandomAgent,
+    'drop': DropAgent,
+    'beam': BeamAgent,
+    'vector': VectorAgent,
+}
@@ -0,0 +1,279 @@
+# Tetris Batch Engine (NumPy)
+
+import numpy as np
+from shapes import SHAPES, SHAPE_TYPES
+from config import (
+    BOARD_WIDTH, BOARD_HEIGHT,
+    SCORE_1_LINE, SCORE_2_LINES, SCORE_3_LINES, SCORE_4_LINES,
+    INITIAL_DROP_SPEED, MIN_DROP_SPEED, SPEED_INCREASE_PER_LEVEL,
+    TICK_RATE
+)
+from game import ACTIONS
+
+# Action codes, the index of each action in game.ACTIONS
+MOVE_LEFT, MOVE_RIGHT, ROTATE, SOFT_DROP, HARD_DROP = range(len(ACTIONS))
+
+# Block offsets indexed by [shape index, rotation, block, (dx, dy)]
+BLOCKS = np.array([SHAPES[shape_type] for shape_type in SHAPE_TYPES], dtype=np.int16)
+
+# Score awarded by number of lines cleared at once, matching TetrisGame.update_score
+LINE_SCORES = np.array([0, SCORE_1_LINE, SCORE_2_LINES, SCORE_3_LINES, SCORE_4_LINES],
+                       dtype=np.int64)
+
+SPAWN_X = BOARD_WIDTH // 2 - 1
+
+
+class BatchTetris:
+    """
+    Steps many Tetris games in lockstep with NumPy array operations.
+    
+    Cells of boards hold 0 when empty, otherwise the index of the shape in
+    SHAPE_TYPES plus one. Pieces are stored as shape indices. The scoring
+    and level rules match TetrisGame so results are comparable.
+    """
+    
+    def __init__(self, num_games, seed=None):
+        """
+        Initialize a batch of games.
+        
+        Args:
+            num_games: Number of games to run in lockstep
+            seed: Optional seed for the piece generator
+        """
+        self.num_games = num_games
+        self.rng = np.random.default_rng(seed)
+        self.index = np.arange(num_games)
+        
+        self.boards = np.zeros((num_games, BOARD_HEIGHT, BOARD_WIDTH), dtype=np.uint8)
+        self.piece = np.zeros(num_games, dtype=np.int8)
+        self.next_piece = np.zeros(num_games, dtype=np.int8)
+        self.rotation = np.zeros(num_games, dtype=np.int8)
+        self.x = np.zeros(num_games, dtype=np.int16)
+        self.y = np.zeros(num_games, dtype=np.int16)
+        self.score = np.zeros(num_games, dtype=np.int64)
+        self.level = np.ones(num_games, dtype=np.int32)
+        self.lines = np.zeros(num_games, dtype=np.int32)
+        self.pieces = np.zeros(num_games, dtype=np.int32)
+        self.drop_time = np.zeros(num_games, dtype=np.float64)
+        self.drop_ticks = np.zeros(num_games, dtype=np.int32)
+        self.game_over = np.zeros(num_games, dtype=bool)
+        
+        self.reset()
+    
+    def reset(self, games=None):
+        """
+        Reset games to their initial state.
+        
+        Args:
+            games: Boolean mask or index array of games to reset (default all)
+        """
+        if games is None:
+            games = self.index
+        games = self.index[games]
+        
+        self.boards[games] = 0
+        self.piece[games] = self.random_pieces(len(games))
+        self.next_piece[games] = self.random_pieces(len(games))
+        self.rotation[games] = 0
+        self.x[games] = SPAWN_X
+        self.y[games] = 0
+        self.score[games] = 0
+        self.level[games] = 1
+        self.lines[games] = 0
+        self.pieces[games] = 0
+        self.drop_time[games] = 0
+        self.drop_ticks[games] = 0
+        self.game_over[games] = False
+    
+    def random_pieces(self, count):
+        """
+        Draw random shape indices.
+        
+        Args:
+            count: Number of pieces to draw
+        
+        Returns:
+            Array of shape indices
+        """
+        return self.rng.integers(0, len(SHAPE_TYPES), size=count, dtype=np.int8)
+    
+    def fits(self, games, rotation, x, y):
+        """
+        Check whether the current pieces of some games fit at given positions.
+        
+        Args:
+            games: Index array of games to check
+            rotation: Rotation state for each game
+            x: X coordinate for each game
+            y: Y coordinate for each game
+        
+        Returns:
+            Boolean array, True where the position is valid
+        """
+        blocks = BLOCKS[self.piece[games], rotation]
+        cols = x[:, None] + blocks[:, :, 0]
+        rows = y[:, None] + blocks[:, :, 1]
+        
+        # Check boundaries
+        inside = (cols >= 0) & (cols < BOARD_WIDTH) & (rows < BOARD_HEIGHT)
+        
+        # Check collision with existing blocks, rows above the board are empty
+        cells = self.boards[games[:, None],
+                            np.clip(rows, 0, BOARD_HEIGHT - 1),
+                            np.clip(cols, 0, BOARD_WIDTH - 1)]
+        free = (rows < 0) | (cells == 0)
+        
+        return (inside & free).all(axis=1)
+    
+    def get_drop_speed(self):
+        """
+        Get the current drop speed of every game based on level.
+        
+        Returns:
+            Array of drop speeds in seconds
+        """
+        speed = INITIAL_DROP_SPEED - (self.level - 1) * SPEED_INCREASE_PER_LEVEL
+        return np.maximum(speed, MIN_DROP_SPEED)
+    
+    def update(self, delta_time):
+        """
+        Advance gravity for every game.
+        
+        Args:
+            delta_time: Time elapsed since last update in seconds
+        """
+        self.drop_time[~self.game_over] += delta_time
+        due = self.index[(self.drop_time >= self.get_drop_speed()) & ~self.game_over]
+        self.drop_time[due] = 0
+        self.soft_drop(due)
+    
+    def tick(self):
+        """Advance every game by one fixed logic tick, like TetrisGame.tick."""
+        self.drop_ticks[~self.game_over] += 1
+        interval = np.maximum(np.round(self.get_drop_speed() * TICK_RATE), 1)
+        due = self.index[(self.drop_ticks >= interval) & ~self.game_over]
+        self.drop_ticks[due] = 0
+        self.soft_drop(due)
+    
+    def step(self, actions):
+        """
+        Apply one action per game.
+        
+        Games that are over ignore their action.
+        
+        Args:
+            actions: Integer array of action codes, one per game
+        """
+        actions = np.asarray(actions)
+        active = ~self.game_over
+        
+        for code, method in ((MOVE_LEFT, self.move_left), (MOVE_RIGHT, self.move_right),
+                             (ROTATE, self.rotate), (SOFT_DROP, self.soft_drop),
+                             (HARD_DROP, self.hard_drop)):
+            games = self.index[(actions == code) & active]
+            if len(games):
+                method(games)
+    
+    def move_left(self, games):
+        """Move the current pieces of the given games left."""
+        self.shift(games, -1)
+    
+    def move_right(self, games):
+        """Move the current pieces of the given games right."""
+        self.shift(games, 1)
+    
+    def shift(self, games, dx):
+        """
+        Move the current pieces of the given games horizontally.
+        
+        Args:
+            games: Index array of games
+            dx: Columns to move by
+        """
+        x = self.x[games] + dx
+        ok = self.fits(games, self.rotation[games], x, self.y[games])
+        self.x[games[ok]] = x[ok]
+    
+    def rotate(self, games):
+        """Rotate the current pieces of the given games clockwise."""
+        rotation = (self.rotation[games] + 1) % 4
+        ok = self.fits(games, rotation, self.x[games], self.y[games])
+        self.rotation[games[ok]] = rotation[ok]
+    
+    def soft_drop(self, games):
+        """Move the current pieces of the given games down, locking blocked ones."""
+        ok = self.fits(games, self.rotation[games], self.x[games], self.y[games] + 1)
+        self.y[games[ok]] += 1
+        self.lock(games[~ok])
+    
+    def hard_drop(self, games):
+        """Drop the current pieces of the given games to the bottom and lock them."""
+        falling = games
+        while len(falling):
+            ok = self.fits(falling, self.rotation[falling], self.x[falling],
+                           self.y[falling] + 1)
+            falling = falling[ok]
+            self.y[falling] += 1
+        self.lock(games)
+    
+    def lock(self, games):
+        """
+        Place the current pieces of the given games and spawn new ones.
+        
+        Args:
+            games: Index array of games whose pieces have landed
+        """
+        if len(games) == 0:
+            return
+        
+        blocks = BLOCKS[self.piece[games], self.rotation[games]]
+        cols = self.x[games][:, None] + blocks[:, :, 0]
+        rows = self.y[games][:, None] + blocks[:, :, 1]
+        visible = rows >= 0
+        owner = np.broadcast_to(games[:, None], rows.shape)
+        self.boards[owner[visible], rows[visible], cols[visible]] = (
+            np.broadcast_to(self.piece[games, None] + 1, rows.shape)[visible])
+        self.pieces[games] += 1
+        
+        # Blocks in the top row end the game before lines are cleared
+        topped = self.boards[games, 0].any(axis=1)
+        self.game_over[games[topped]] = True
+        games = games[~topped]
+        
+        self.clear_lines(games)
+        
+        # Spawn next piece
+        self.piece[games] = self.next_piece[games]
+        self.next_piece[games] = self.random_pieces(len(games))
+        self.rotation[games] = 0
+        self.x[games] = SPAWN_X
+        self.y[games] = 0
+        
+        # Check if new piece can be placed
+        ok = self.fits(games, self.rotation[games], self.x[games], self.y[games])
+        self.game_over[games[~ok]] = True
+    
+    def clear_lines(self, games):
+        """
+        Clear complete lines and update score, lines and level.
+        
+        Args:
+            games: Index array of games to check
+        """
+        full = (self.boards[games] != 0).all(axis=2)
+        cleared = full.sum(axis=1)
+        games, full, cleared = games[cleared > 0], full[cleared > 0], cleared[cleared > 0]
+        if len(games) == 0:
+            return
+        
+        # Stable sort moves full rows to the top, keeping the others in order
+        order = np.argsort(~full, axis=1, kind='stable')
+        boards = np.take_along_axis(self.boards[games], order[:, :, None], axis=1)
+        boards[np.arange(BOARD_HEIGHT)[None, :] < cleared[:, None]] = 0
+        self.boards[games] = boards
+        
+        self.score[games] += LINE_SCORES[np.minimum(cleared, 4)]
+        self.lines[games] += cleared
+        
+        # Increase level every 10 lines
+        self.level[games] = 1 + self.lines[games] // 10
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+# Tetris Benchmarks (engine and renderer hot paths)
+#
+# Runs seeded, reproducible workloads and writes per-operation timings:
+#     python bench.py --output bench.json
+# Compares against a stored baseline and exits non-zero on regressions:
+#     python bench.py --baseline bench.json --threshold 0.10
+
+import argparse
+import copy
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+from config import BOARD_WIDTH, BOARD_HEIGHT
+from game import TetrisGame, Tetromino, ACTIONS
+from board import Board
+from bitboard import BitBoard
+from agents import DropAgent
+from shapes import SHAPE_TYPES
+from sim import run_game
+
+# Registered benchmarks, name -> function(seed) returning a setup callable;
+# setup() builds fresh state and returns (run, ops), where run() performs
+# ops operations and is the only part that is timed. run() may return the
+# number of operations when it is only known afterwards.
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark function under a name."""
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def played_games(count, seed, max_pieces=40):
+    """
+    Build a reproducible set of games in progress.
+    
+    Args:
+        count: Number of games
+        seed: Seed for the games and the agent
+        max_pieces: Upper bound on pieces played into each game
+    
+    Returns:
+        List of TetrisGame objects with partially filled boards
+    """
+    rng = random.Random(seed)
+    games = []
+    while len(games) < count:
+        game = TetrisGame(seed=rng.getrandbits(32))
+        run_game(game, DropAgent(rng.getrandbits(32)), rng.randint(0, max_pieces))
+        if not game.game_over:
+            games.append(game)
+    return games
+
+
+@benchmark('board.is_valid_position')
+def bench_is_valid_position(seed):
+    """Collision checks of random pieces at random positions on played boards."""
+    rng = random.Random(seed)
+    boards = [game.board for game in played_games(20, seed)]
+    checks = []
+    for _ in range(20000):
+        piece = Tetromino(rng.choice(SHAPE_TYPES))
+        piece.rotation = rng.randrange(4)
+        checks.append((rng.choice(boards), piece,
+                       rng.randint(-2, BOARD_WIDTH), rng.randint(0, BOARD_HEIGHT)))
+    
+    def setup():
+        def run():
+            for board, piece, x, y in checks:
+                board.is_valid_position(piece, x, y)
+        return run, len(checks)
+    return setup
+
+
+@benchmark('board.place_piece')
+def bench_place_piece(seed):
+    """Placing pieces at their hard drop positions on played boards."""
+    drops = []
+    for game in played_games(2000, seed):
+        piece = game.current_piece
+        y = piece.y
+        while game.board.is_valid_position(piece, piece.x, y + 1):
+            y += 1
+        drops.append((game.board, piece, piece.x, y))
+    
+    def setup():
+        boards = [(board.clone(), piece, x, y) for board, piece, x, y in drops]
+        
+        def run():
+            for board, piece, x, y in boards:
+                board.place_piece(piece, x, y)
+        return run, len(boards)
+    return setup
+
+
+def make_clear_lines_benchmark(lines):
+    """Create the clear_lines benchmark for a number of complete lines."""
+    def bench_clear_lines(seed):
+        rng = random.Random(seed)
+        templates = []
+        for game in played_games(200, seed, max_pieces=20):
+            board = game.board.clone()
+            for y in rng.sample(range(BOARD_HEIGHT - 8, BOARD_HEIGHT), lines):
+                for x in range(BOARD_WIDTH):
+                    board.set_cell(x, y, 'I')
+            templates.append(board)
+        
+        def setup():
+            boards = [board.clone() for board in templates]
+            
+            def run():
+                for board in boards:
+                    board.clear_lines()
+            return run, len(boards)
+        return setup
+    
+    bench_clear_lines.__doc__ = f"Clearing {lines} complete lines on played boards."
+    return bench_clear_lines
+
+
+for _lines in range(5):
+    benchmark(f'board.clear_lines[{_lines}]')(make_clear_lines_benchmark(_lines))
+
+
+def make_lock_benchmark(backend, width, height):
+    """Create the lock benchmark for one board backend and size."""
+    def bench_lock(seed):
+        rng = random.Random(seed)
+        templates = []
+        for _ in range(200):
+            # Four rows full but for one gap under four ragged rows, so a
+            # vertical I in the gap clears four lines and moves the rest down
+            board = backend(width, height)
+            gap = rng.randrange(1, width - 2)
+            for y in range(height - 8, height):
+                for x in range(width):
+                    if x != gap and (y >= height - 4 or rng.random() < 0.5):
+                        board.set_cell(x, y, 'I')
+            templates.append((board, gap))
+        
+        def setup():
+            piece = Tetromino('I', width)
+            piece.rotation = 1
+            boards = [(board.clone(), gap - 1) for board, gap in templates]
+            
+            def run():
+                for board, x in boards:
+                    y = board.drop_distance('I', 1, x, 0)
+                    board.place_piece(piece, x, y)
+                    board.clear_lines()
+            return run, len(boards)
+        return setup
+    
+    bench_lock.__doc__ = (f"Locking a piece and clearing four lines on {width}x{height} "
+                          f"{backend.__name__} boards (cost follows the rows touched, "
+                          f"not the board size).")
+    return bench_lock
+
+
+for _backend, _prefix in ((Board, 'board'), (BitBoard, 'bitboard')):
+    for _width, _height in ((BOARD_WIDTH, BOARD_HEIGHT), (100, 1000)):
+        benchmark(f'{_prefix}.lock[{_width}x{_height}]')(
+            make_lock_benchmark(_backend, _width, _height))
+
+
+@benchmark('game.hard_drop')
+def bench_hard_drop(seed):
+    """Hard dropping the current piece of played games (lock, clear, spawn)."""
+    def setup():
+        games = played_games(200, seed)
+        
+        def run():
+            for game in games:
+                game.hard_drop()
+        return run, len(games)
+    return setup
+
+
+def make_copy_benchmark(name, copy_game):
+    """Create a game copying benchmark for one way of copying."""
+    def bench_copy(seed):
+        games = played_games(200, seed)
+        
+        def setup():
+            def run():
+                for game in games:
+                    copy_game(game)
+            return run, len(games)
+        return setup
+    
+    bench_copy.__doc__ = f"Copying played games with {name}."
+    return bench_copy
+
+
+benchmark('game.clone')(make_copy_benchmark('TetrisGame.clone', TetrisGame.clone))
+benchmark('game.deepcopy')(make_copy_benchmark('copy.deepcopy', copy.deepcopy))
+benchmark('game.snapshot_restore')(make_copy_benchmark(
+    'snapshot() and restore()', lambda game: game.restore(game.snapshot())))
+
+
+@benchmark('game.full_game[200]')
+def bench_full_game(seed):
+    """Whole games of up to 200 pieces with the drop agent, per piece placed."""
+    def setup():
+        games = [(TetrisGame(seed=seed + i), DropAgent(seed + i)) for i in range(10)]
+        
+        def run():
+            for game, agent in games:
+                run_game(game, agent, max_pieces=200)
+            return sum(game.pieces_placed for game, _ in games)
+        return run, None
+    return setup
+
+
+@benchmark('agent.beam_search')
+def bench_beam_search(seed):
+    """Full-depth BeamAgent searches from played games, per node scored."""
+    from agents import BeamAgent
+    
+    def setup():
+        games = played_games(50, seed)
+        agent = BeamAgent(time_budget=None)
+        
+        def run():
+            nodes = agent.nodes
+            for game in games:
+                agent.search(game)
+            return agent.nodes - nodes
+        return run, None
+    return setup
+
+
+def make_score_benchmark(vectorized):
+    """Create the placement scoring benchmark, batched in NumPy or one board at a time."""
+    def bench_score_placements(seed):
+        from agents import HEURISTIC_WEIGHTS, evaluate_board
+        from features import score_placements, weight_vector
+        from placements import drop_positions
+        games = played_games(100, seed)
+        weights = weight_vector(HEURISTIC_WEIGHTS)
+        
+        def setup():
+            def run_batched():
+                return sum(len(score_placements(game, weights)[0]) for game in games)
+            
+            def run_boards():
+                scores = []
+                for game in games:
+                    piece = Tetromino(game.current_piece.shape_type)
+                    for rotation, x, y, _, _ in drop_positions(game.board, piece.shape_type,
+                                                               piece.rotation, piece.x, piece.y):
+                        board = game.board.clone()
+                        piece.rotation = rotation
+                        board.place_piece(piece, x, y)
+                        lines = board.clear_lines()
+                        scores.append(evaluate_board(board) + HEURISTIC_WEIGHTS['lines'] * lines)
+                return len(scores)
+            return (run_batched if vectorized else run_boards), None
+        return setup
+    
+    bench_score_placements.__doc__ = (
+        "Scoring every drop placement of played games' current pieces, "
+        + ("in one NumPy batch per piece" if vectorized else "one copied board at a time")
+        + ", per placement.")
+    return bench_score_placements
+
+
+benchmark('agent.score_placements[numpy]')(make_score_benchmark(True))
+benchmark('agent.score_placements[boards]')(make_score_benchmark(False))
+
+
+def make_key_step_benchmark(use_env):
+    """Create the key action benchmark, through TetrisEnv or on the bare game."""
+    def bench_key_step(seed):
+        from env import TetrisEnv, NOOP
+        rng = random.Random(seed)
+        actions = [rng.randrange(NOOP + 1) for _ in range(5000)]
+        
+        def setup():
+            env = TetrisEnv('keys', seed=seed)
+            game = env.game
+            
+            def run_env():
+                for action in actions:
+                    if env.step(action)[2]:
+                        env.reset(seed)
+            
+            def run_bare_game():
+                for action in actions:
+                    if action != NOOP:
+                        game.apply(ACTIONS[action])
+                    game.tick()
+                    if game.game_over:
+                        game.reset(seed)
+            return (run_env if use_env else run_bare_game), len(actions)
+        return setup
+    
+    if use_env:
+        bench_key_step.__doc__ = "TetrisEnv.step in key mode; compare with game.key_step."
+    else:
+        bench_key_step.__doc__ = "The same key inputs and ticks applied to the bare game."
+    return bench_key_step
+
+
+benchmark('env.step[keys]')(make_key_step_benchmark(True))
+benchmark('game.key_step')(make_key_step_benchmark(False))
+
+
+@benchmark('env.step[placement]')
+def bench_env_placement(seed):
+    """TetrisEnv.step in placement mode with action_mask, per piece placed."""
+    from env import TetrisEnv
+    
+    def setup():
+        env = TetrisEnv('placement', seed=seed)
+        rng = random.Random(seed)
+        
+        def run():
+            for _ in range(500):
+                actions = env.action_mask().nonzero()[0]
+                if env.step(actions[rng.randrange(len(actions))])[2]:
+                    env.reset(seed)
+        return run, 500
+    return setup
+
+
+def make_render_benchmark(incremental):
+    """Create the draw_game benchmark for full or incremental rendering."""
+    def bench_draw_game(seed):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        import pygame
+        from utils import Renderer
+        from config import WINDOW_WIDTH, WINDOW_HEIGHT
+        
+        pygame.display.init()
+        pygame.font.init()
+        screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        rng = random.Random(seed)
+        moves = [rng.choice(('move_left', 'move_right', 'rotate', 'soft_drop'))
+                 for _ in range(200)]
+        
+        def setup():
+            game = played_games(1, seed)[0]
+            renderer = Renderer(screen, incremental=incremental)
+            renderer.draw_game(game)
+            
+            def run():
+                for move in moves:
+                    game.apply(move)
+                    renderer.draw_game(game)
+            return run, len(moves)
+        return setup
+    
+    bench_draw_game.__doc__ = "Renderer.draw_game frames under the SDL dummy driver."
+    return bench_draw_game
+
+
+benchmark('renderer.draw_game')(make_render_benchmark(False))
+benchmark('renderer.draw_game[incremental]')(make_render_benchmark(True))
+
+
+@benchmark('startup.first_frame')
+def bench_first_frame(seed):
+    """Launching the game in a fresh interpreter up to its first frame (SDL dummy driver)."""
+    from startup import measure_startup
+    
+    def setup():
+        def run():
+            measure_startup(headless=True)
+        return run, 1
+    return setup
+
+
+def run_benchmarks(names, repeat, seed):
+    """
+    Time benchmarks.
+    
+    Args:
+        names: Benchmark names to run
+        repeat: Timed runs per benchmark
+        seed: Seed for the workloads
+    
+    Returns:
+        Dictionary mapping name to per-operation timings in nanoseconds
+    """
+    results = {}
+    
+    for name in names:
+        setup = BENCHMARKS[name](seed)
+        times = []
+        for _ in range(repeat):
+            run, ops = setup()
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter_ns()
+                ops = run() or ops
+                times.append((time.perf_counter_ns() - start) / ops)
+            finally:
+                gc.enable()
+        
+        times.sort()
+        results[name] = {
+            'ns_per_op': times[len(times) // 2],
+            'min_ns_per_op': times[0],
+            'ops': ops,
+            'repeat': repeat,
+        }
+        print(f"{name:40s} {times[len(times) // 2]:12.0f} ns/op  (min {times[0]:.0f})")
+    
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Find benchmarks that got slower than a baseline.
+    
+    Args:
+        results: Current results from run_benchmarks
+        baseline: Baseline results in the same format
+        threshold: Allowed slowdown as a fraction (0.10 = 10%)
+    
+    Returns:
+        List of (name, baseline ns/op, current ns/op) for every regression
+    """
+    regressions = []
+    
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        # The fastest run is the least disturbed by other load on the machine
+        before = baseline[name]['min_ns_per_op']
+        after = result['min_ns_per_op']
+        change = (after - before) / before
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"{name:40s} {before:12.0f} -> {after:12.0f} ns/op  {change:+7.1%}  {flag}")
+        if change > threshold:
+            regressions.append((name, before, after))
+    
+    return regressions
+
+
+def main(argv=None):
+    """Entry point for the benchmark suite."""
+    parser = argparse.ArgumentParser(description="Benchmark Tetris hot paths.")
+    parser.add_argument('--output', metavar='FILE', default=None,
+                        help="write results as JSON to this file")
+    parser.add_argument('--baseline', metavar='FILE', default=None,
+                        help="compare against results stored in this file")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="slowdown fraction flagged as a regression")
+    parser.add_argument('--repeat', type=int, default=7, help="timed runs per benchmark")
+    parser.add_argument('--seed', type=int, default=0, help="workload seed")
+    parser.add_argument('--filter', default='', help="only run benchmarks containing this")
+    parser.add_argument('--list', action='store_true', help="list benchmarks and exit")
+    args = parser.parse_args(argv)
+    
+    if args.list:
+        for name, function in BENCHMARKS.items():
+            print(f"{name:40s} {function.__doc__}")
+        return 0
+    
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = run_benchmarks(names, args.repeat, args.seed)
+    
+    if args.output is not None:
+        with open(args.output, 'w') as output_file:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'seed': args.seed,
+                'results': results,
+            }, output_file, indent=2)
+    
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed by more than "
+                  f"{args.threshold:.0%}")
+            return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+# Tetris Game Board (bitboard backend)
+
+import copy
+from shapes import piece_table
+from zobrist import board_keys, piece_hash
+from config import BOARD_WIDTH, BOARD_HEIGHT
+
+
+class BitBoard:
+    """
+    Represents the Tetris game board with one integer bitmask per row.
+    
+    Bit x of rows[y] is set when cell (x, y) is occupied. The shape types
+    needed for rendering live in a separate color plane exposed as grid,
+    so the board is a drop-in replacement for Board. The grid is read-only
+    from the outside; use set_cell() to change individual cells. Column
+    heights, holes and the Zobrist hash are kept up to date as in Board,
+    and the size is likewise set per board.
+    """
+    
+    def __init__(self, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        """
+        Initialize an empty board.
+        
+        Args:
+            width: Number of columns
+            height: Number of rows
+        """
+        self.width = width
+        self.height = height
+        self.full_row = (1 << width) - 1
+        self.table = piece_table(width)
+        self.cell_keys, self.full_row_keys = board_keys(width, height)
+        self.empty_row = (None,) * width
+        self.reset()
+    
+    def __deepcopy__(self, memo):
+        """
+        Copy the board for copy.deepcopy, sharing the read-only lookup
+        tables with this board instead of copying them.
+        
+        Args:
+            memo: Dictionary of objects already copied, by id
+        
+        Returns:
+            New BitBoard object
+        """
+        for shared in (self.table, self.cell_keys, self.full_row_keys):
+            memo.setdefault(id(shared), shared)
+        board = BitBoard.__new__(BitBoard)
+        memo[id(self)] = board
+        for name, value in self.__dict__.items():
+            setattr(board, name, copy.deepcopy(value, memo))
+        return board
+    
+    def is_valid_position(self, piece, x, y):
+        """
+        Check if a piece can be placed at the given position.
+        
+        Args:
+            piece: The Tetromino piece object
+            x: X coordinate (column)
+            y: Y coordinate (row)
+        
+        Returns:
+            True if the position is valid, False otherwise
+        """
+        return self.fits(piece.shape_type, piece.rotation, x, y)
+    
+    def fits(self, shape_type, rotation, x, y):
+        """
+        Check if a shape in a rotation state fits at the given position.
+        
+        Collision is an AND of the pre-shifted row masks from the piece table
+        against the board rows.
+        
+        Args:
+            shape_type: Shape type of the piece
+            rotation: Rotation state index
+            x: X coordinate (column)
+            y: Y coordinate (row)
+        
+        Returns:
+            True if the position is valid, False otherwise
+        """
+        masks = self.table[shape_type][rotation]
+        
+        # Check boundaries
+        if x < masks.min_x or x > masks.max_x or y + masks.bottom >= self.height:
+            return False
+        
+        # Check collision with existing blocks
+        rows = self.rows
+        for dy, mask in masks.rows[x]:
+            if y + dy >= 0 and rows[y + dy] & mask:
+                return False
+        
+        return True
+    
+    def place_piece(self, piece, x, y):
+        """
+        Place a piece on the board.
+        
+        Args:
+            piece: The Tetromino piece object
+            x: X coordinate (column)
+            y: Y coordinate (row)
+        """
+        heights = self.heights
+        holes = self.holes
+        touched_rows = self.touched_rows
+        cell_keys = self.cell_keys
+        zobrist = self.zobrist
+        
+        for dy, col in self.table[piece.shape_type][piece.rotation].cells[x]:
+            row = y + dy
+            if row >= 0:
+                self.rows[row] |= 1 << col
+                self.grid[row][col] = piece.shape_type
+                touched_rows.add(row)
+                zobrist ^= cell_keys[row][col]
+                height = self.height - row
+                if height > heights[col]:
+                    holes[col] += height - 1 - heights[col]
+                    heights[col] = height
+                else:
+                    holes[col] -= 1
+        
+        self.zobrist = zobrist
+    
+    def drop_distance(self, shape_type, rotation, x, y):
+        """
+        Get how many rows a piece can fall before it lands.
+        
+        Args:
+            shape_type: Shape type of the piece
+            rotation: Rotation state index
+            x: X coordinate (column)
+            y: Y coordinate (row)
+        
+        Returns:
+            Number of rows the piece can move down (0 if it can't move)
+        """
+        heights = self.heights
+        distance = self.height
+        
+        for col, dy in self.table[shape_type][rotation].bottoms[x]:
+            room = self.height - 1 - heights[col] - (y + dy)
+            if room < 0:
+                distance = 0
+                while self.fits(shape_type, rotation, x, y + distance + 1):
+                    distance += 1
+                return distance
+            if room < distance:
+                distance = room
+        
+        return distance
+    
+    def set_cell(self, x, y, shape_type):
+        """
+        Set a single cell on the board.
+        
+        Args:
+            x: X coordinate (column)
+            y: Y coordinate (row)
+            shape_type: Shape type to store, or None to empty the cell
+        """
+        if (self.rows[y] >> x & 1) != (shape_type is not None):
+            self.zobrist ^= self.cell_keys[y][x]
+        if shape_type is None:
+            self.rows[y] &= ~(1 << x)
+        else:
+            self.rows[y] |= 1 << x
+        self.grid[y][x] = shape_type
+        self.touched_rows.add(y)
+        self.update_column(x)
+    
+    def update_column(self, x):
+        """
+        Recount the height and holes of one column from the row masks.
+        
+        Args:
+            x: X coordinate (column)
+        """
+        bit = 1 << x
+        height = 0
+        holes = 0
+        for y in range(self.height):
+            if self.rows[y] & bit:
+                if not height:
+                    height = self.height - y
+            elif height:
+                holes += 1
+        
+        self.heights[x] = height
+        self.holes[x] = holes
+    
+    def state_hash(self, current=None, next_piece=None):
+        """
+        Get the Zobrist hash of the board, optionally with the pieces.
+        
+        Args:
+            current: Shape type of the current piece to include, if any
+            next_piece: Shape type of the next piece to include, if any
+        
+        Returns:
+            64-bit hash
+        """
+        return self.zobrist ^ piece_hash(current, next_piece)
+    
+    def occupancy(self):
+        """
+        Get the occupied cells as row bitmasks.
+        
+        Returns:
+            Tuple of ints, top row first; bit x is set if column x is occupied
+        """
+        return tuple(self.rows)
+    
+    def clear_lines(self):
+        """
+        Check for and clear complete lines.
+        
+        Returns:
+            Number of lines cleared
+        """
+        rows = self.rows
+        full_row = self.full_row
+        
+        # Only rows written since the last call can have been completed
+        full = [y for y in self.touched_rows if rows[y] == full_row]
+        self.touched_rows.clear()
+        if not full:
+            return 0
+        
+        # Same single compaction pass as Board.clear_lines, on masks and colors
+        grid = self.grid
+        top = self.height - max(self.heights)
+        cleared_rows = []
+        cell_keys = self.cell_keys
+        zobrist = self.zobrist
+        
+        write = max(full)
+        for read in range(write, top - 1, -1):
+            mask = rows[read]
+            if mask == full_row:
+                cleared_rows.append(grid[read])
+                zobrist ^= self.full_row_keys[read]
+            else:
+                keys_from, keys_to = cell_keys[read], cell_keys[write]
+                while mask:
+                    x = (mask & -mask).bit_length() - 1
+                    zobrist ^= keys_from[x] ^ keys_to[x]
+                    mask &= mask - 1
+                grid[write] = grid[read]
+                rows[write] = rows[read]
+                write -= 1
+        self.zobrist = zobrist
+        
+        for row in cleared_rows:
+            row[:] = self.empty_row
+            grid[write] = row
+            rows[write] = 0
+            write -= 1
+        
+        bottom = self.height
+        for x in range(self.width):
+            bit = 1 << x
+            height = self.heights[x] - len(cleared_rows)
+            while height > 0 and not rows[bottom - height] & bit:
+                height -= 1
+                self.holes[x] -= 1
+            self.heights[x] = height
+        
+        return len(cleared_rows)
+    
+    def snapshot(self):
+        """
+        Capture the board as an immutable value.
+        
+        Returns:
+            Tuple for restore()
+        """
+        return (tuple(self.rows), tuple(map(tuple, self.grid)), tuple(self.heights),
+                tuple(self.holes), frozenset(self.touched_rows), self.zobrist)
+    
+    def restore(self, snapshot):
+        """
+        Return to a state captured by snapshot().
+        
+        Args:
+            snapshot: Value returned by BitBoard.snapshot()
+        """
+        rows, grid, heights, holes, touched_rows, self.zobrist = snapshot
+        self.rows = list(rows)
+        self.grid = list(map(list, grid))
+        self.heights = list(heights)
+        self.holes = list(holes)
+        self.touched_rows = set(touched_rows)
+    
+    def clone(self):
+        """
+        Copy the board.
+        
+        Returns:
+            New BitBoard object sharing nothing mutable with this one
+        """
+        board = BitBoard.__new__(BitBoard)
+        board.width = self.width
+        board.height = self.height
+        board.full_row = self.full_row
+        board.table = self.table
+        board.cell_keys = self.cell_keys
+        board.full_row_keys = self.full_row_keys
+        board.empty_row = self.empty_row
+        board.rows = self.rows[:]
+        board.grid = [row[:] for row in self.grid]
+        board.heights = self.heights[:]
+        board.holes = self.holes[:]
+        board.touched_rows = set(self.touched_rows)
+        board.zobrist = self.zobrist
+        return board
+    
+    def is_game_over(self):
+        """
+        Check if the game is over (blocks reached the top).
+        
+        Returns:
+            True if game is over, False otherwise
+        """
+        return self.rows[0] != 0
+    
+    def reset(self):
+        """Reset the board to empty state."""
+        self.rows = [0] * self.height
+        self.grid = [list(self.empty_row) for _ in range(self.height)]
+        self.heights = [0] * self.width
+        self.holes = [0] * self.width
+        self.touched_rows = set()
+        self.zobrist = 0
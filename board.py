@@ -1,13 +1,63 @@
 # Tetris Game Board
 
+import copy
 from config import BOARD_WIDTH, BOARD_HEIGHT
+from shapes import piece_table
+from zobrist import board_keys, piece_hash
+
 
 class Board:
-    """Represents the Tetris game board."""
+    """
+    Represents the Tetris game board.
+    
+    Besides the grid, the board keeps a summary of its surface: heights[x]
+    is the height of the highest block in column x (0 when empty) and
+    holes[x] the number of empty cells below it. row_counts[y] is the
+    number of occupied cells in row y, and zobrist the Zobrist hash of the
+    occupied cells (see zobrist.py). All of these are kept up to date
+    by place_piece, set_cell and clear_lines; write cells through those
+    rather than through the grid.
+    
+    The size is set per board. Placing, dropping and clearing only visit
+    the rows a piece touches and the stack above cleared rows, so their
+    cost doesn't grow with the board's area.
+    """
     
-    def __init__(self):
-        """Initialize an empty board."""
-        self.grid = [[None for _ in range(BOARD_WIDTH)] for _ in range(BOARD_HEIGHT)]
+    def __init__(self, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        """
+        Initialize an empty board.
+        
+        Args:
+            width: Number of columns
+            height: Number of rows
+        """
+        self.width = width
+        self.height = height
+        # Lookup tables shared by every board of the same size
+        self.table = piece_table(width)
+        self.cell_keys, self.full_row_keys = board_keys(width, height)
+        # Contents of an empty row, copied into recycled row lists
+        self.empty_row = (None,) * width
+        self.reset()
+    
+    def __deepcopy__(self, memo):
+        """
+        Copy the board for copy.deepcopy, sharing the read-only lookup
+        tables with this board instead of copying them.
+        
+        Args:
+            memo: Dictionary of objects already copied, by id
+        
+        Returns:
+            New Board object
+        """
+        for shared in (self.table, self.cell_keys, self.full_row_keys):
+            memo.setdefault(id(shared), shared)
+        board = Board.__new__(Board)
+        memo[id(self)] = board
+        for name, value in self.__dict__.items():
+            setattr(board, name, copy.deepcopy(value, memo))
+        return board
     
     def is_valid_position(self, piece, x, y):
         """
@@ -21,16 +71,34 @@ class Board:
         Returns:
             True if the position is valid, False otherwise
         """
-        for dx, dy in piece.get_blocks():
-            new_x = x + dx
-            new_y = y + dy
-            
-            # Check boundaries
-            if new_x < 0 or new_x >= BOARD_WIDTH or new_y >= BOARD_HEIGHT:
-                return False
-            
-            # Check collision with existing blocks
-            if new_y >= 0 and self.grid[new_y][new_x] is not None:
+        return self.fits(piece.shape_type, piece.rotation, x, y)
+    
+    def fits(self, shape_type, rotation, x, y):
+        """
+        Check if a shape in a rotation state fits at the given position.
+        
+        Uses the precomputed piece table, so no per-block arithmetic is
+        needed beyond offsetting rows by y.
+        
+        Args:
+            shape_type: Shape type of the piece
+            rotation: Rotation state index
+            x: X coordinate (column)
+            y: Y coordinate (row)
+        
+        Returns:
+            True if the position is valid, False otherwise
+        """
+        masks = self.table[shape_type][rotation]
+        
+        # Check boundaries
+        if x < masks.min_x or x > masks.max_x or y + masks.bottom >= self.height:
+            return False
+        
+        # Check collision with existing blocks
+        grid = self.grid
+        for dy, col in masks.cells[x]:
+            if y + dy >= 0 and grid[y + dy][col] is not None:
                 return False
         
         return True
@@ -44,12 +112,124 @@ class Board:
             x: X coordinate (column)
             y: Y coordinate (row)
         """
-        for dx, dy in piece.get_blocks():
-            new_x = x + dx
-            new_y = y + dy
-            
-            if new_y >= 0:
-                self.grid[new_y][new_x] = piece.shape_type
+        heights = self.heights
+        holes = self.holes
+        row_counts = self.row_counts
+        touched_rows = self.touched_rows
+        cell_keys = self.cell_keys
+        zobrist = self.zobrist
+        
+        # Cells come lowest first, so a block stacked on another block of
+        # the same piece sees the height that block already raised
+        for dy, col in self.table[piece.shape_type][piece.rotation].cells[x]:
+            row = y + dy
+            if row >= 0:
+                self.grid[row][col] = piece.shape_type
+                row_counts[row] += 1
+                touched_rows.add(row)
+                zobrist ^= cell_keys[row][col]
+                height = self.height - row
+                if height > heights[col]:
+                    holes[col] += height - 1 - heights[col]
+                    heights[col] = height
+                else:
+                    # Tucked under an overhang, filling a hole
+                    holes[col] -= 1
+        
+        self.zobrist = zobrist
+    
+    def drop_distance(self, shape_type, rotation, x, y):
+        """
+        Get how many rows a piece can fall before it lands.
+        
+        When every column of the piece is above that column's surface, the
+        distance follows from the piece's bottom profile and the column
+        heights alone. A piece tucked under an overhang falls row by row.
+        
+        Args:
+            shape_type: Shape type of the piece
+            rotation: Rotation state index
+            x: X coordinate (column)
+            y: Y coordinate (row)
+        
+        Returns:
+            Number of rows the piece can move down (0 if it can't move)
+        """
+        heights = self.heights
+        distance = self.height
+        
+        for col, dy in self.table[shape_type][rotation].bottoms[x]:
+            room = self.height - 1 - heights[col] - (y + dy)
+            if room < 0:
+                distance = 0
+                while self.fits(shape_type, rotation, x, y + distance + 1):
+                    distance += 1
+                return distance
+            if room < distance:
+                distance = room
+        
+        return distance
+    
+    def set_cell(self, x, y, shape_type):
+        """
+        Set a single cell on the board.
+        
+        Args:
+            x: X coordinate (column)
+            y: Y coordinate (row)
+            shape_type: Shape type to store, or None to empty the cell
+        """
+        if (self.grid[y][x] is None) != (shape_type is None):
+            self.row_counts[y] += 1 if shape_type is not None else -1
+            self.touched_rows.add(y)
+            self.zobrist ^= self.cell_keys[y][x]
+        self.grid[y][x] = shape_type
+        self.update_column(x)
+    
+    def update_column(self, x):
+        """
+        Recount the height and holes of one column from the grid.
+        
+        Args:
+            x: X coordinate (column)
+        """
+        height = 0
+        holes = 0
+        for y in range(self.height):
+            if self.grid[y][x] is not None:
+                if not height:
+                    height = self.height - y
+            elif height:
+                holes += 1
+        
+        self.heights[x] = height
+        self.holes[x] = holes
+    
+    def state_hash(self, current=None, next_piece=None):
+        """
+        Get the Zobrist hash of the board, optionally with the pieces.
+        
+        Args:
+            current: Shape type of the current piece to include, if any
+            next_piece: Shape type of the next piece to include, if any
+        
+        Returns:
+            64-bit hash
+        """
+        return self.zobrist ^ piece_hash(current, next_piece)
+    
+    def occupancy(self):
+        """
+        Get the occupied cells as row bitmasks.
+        
+        Returns:
+            Tuple of ints, top row first; bit x is set if column x is occupied
+        """
+        # Empty rows, most of a typical board, need no scan
+        return tuple(
+            sum(1 << x for x, cell in enumerate(row) if cell is not None) if count else 0
+            for row, count in zip(self.grid, self.row_counts)
+        )
     
     def clear_lines(self):
         """
@@ -58,19 +238,104 @@ class Board:
         Returns:
             Number of lines cleared
         """
-        lines_to_clear = []
+        row_counts = self.row_counts
+        width = self.width
+        
+        # Only rows written since the last call can have been completed
+        full = [y for y in self.touched_rows if row_counts[y] == width]
+        self.touched_rows.clear()
+        if not full:
+            return 0
+        
+        # Rows above the highest block are empty and need not move
+        grid = self.grid
+        top = self.height - max(self.heights)
+        cleared_rows = []
+        cell_keys = self.cell_keys
+        zobrist = self.zobrist
+        
+        # Single pass from the lowest complete row up: every kept row moves
+        # down past the complete rows below it, and its blocks' keys with it
+        write = max(full)
+        for read in range(write, top - 1, -1):
+            row = grid[read]
+            if row_counts[read] == width:
+                cleared_rows.append(row)
+                zobrist ^= self.full_row_keys[read]
+            else:
+                keys_from, keys_to = cell_keys[read], cell_keys[write]
+                for x, cell in enumerate(row):
+                    if cell is not None:
+                        zobrist ^= keys_from[x] ^ keys_to[x]
+                grid[write] = row
+                row_counts[write] = row_counts[read]
+                write -= 1
+        self.zobrist = zobrist
         
-        # Find complete lines
-        for y in range(BOARD_HEIGHT):
-            if all(self.grid[y][x] is not None for x in range(BOARD_WIDTH)):
-                lines_to_clear.append(y)
+        # The cleared row lists are emptied and reused as the new top rows
+        for row in cleared_rows:
+            row[:] = self.empty_row
+            grid[write] = row
+            row_counts[write] = 0
+            write -= 1
         
-        # Remove complete lines
-        for y in sorted(lines_to_clear, reverse=True):
-            del self.grid[y]
-            self.grid.insert(0, [None for _ in range(BOARD_WIDTH)])
+        # Every cleared row had a block in every column, at or below each
+        # column's top; holes only change where a cleared top uncovers them
+        bottom = self.height
+        for x in range(width):
+            height = self.heights[x] - len(cleared_rows)
+            while height > 0 and grid[bottom - height][x] is None:
+                height -= 1
+                self.holes[x] -= 1
+            self.heights[x] = height
         
-        return len(lines_to_clear)
+        return len(cleared_rows)
+    
+    def snapshot(self):
+        """
+        Capture the board as an immutable value.
+        
+        Returns:
+            Tuple for restore()
+        """
+        return (tuple(map(tuple, self.grid)), tuple(self.heights), tuple(self.holes),
+                tuple(self.row_counts), frozenset(self.touched_rows), self.zobrist)
+    
+    def restore(self, snapshot):
+        """
+        Return to a state captured by snapshot().
+        
+        Args:
+            snapshot: Value returned by Board.snapshot()
+        """
+        grid, heights, holes, row_counts, touched_rows, self.zobrist = snapshot
+        self.grid = list(map(list, grid))
+        self.heights = list(heights)
+        self.holes = list(holes)
+        self.row_counts = list(row_counts)
+        self.touched_rows = set(touched_rows)
+    
+    def clone(self):
+        """
+        Copy the board.
+        
+        Returns:
+            New Board object sharing nothing mutable with this one
+        """
+        board = Board.__new__(Board)
+        board.width = self.width
+        board.height = self.height
+        board.table = self.table
+        board.cell_keys = self.cell_keys
+        board.full_row_keys = self.full_row_keys
+        board.empty_row = self.empty_row
+        board.grid = [row[:] for row in self.grid]
+        board.heights = self.heights[:]
+        board.holes = self.holes[:]
+        board.row_counts = self.row_counts[:]
+        board.touched_rows = set(self.touched_rows)
+        board.zobrist = self.zobrist
+        return board
     
     def is_game_over(self):
         """
@@ -79,11 +344,15 @@ class Board:
         Returns:
             True if game is over, False otherwise
         """
-        for x in range(BOARD_WIDTH):
-            if self.grid[0][x] is not None:
-                return True
-        return False
+        return self.row_counts[0] != 0
     
     def reset(self):
         """Reset the board to empty state."""
-        self.grid = [[None for _ in range(BOARD_WIDTH)] for _ in range(BOARD_HEIGHT)]
+        self.grid = [list(self.empty_row) for _ in range(self.height)]
+        self.heights = [0] * self.width
+        self.holes = [0] * self.width
+        self.row_counts = [0] * self.height
+        # Rows written since the last clear_lines, the only ones that can
+        # have become complete
+        self.touched_rows = set()
+        self.zobrist = 0
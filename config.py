@@ -3,7 +3,33 @@
 # Window settings
 WINDOW_WIDTH = 400
 WINDOW_HEIGHT = 500
-FPS = 60
+FPS = 60  # frames drawn per second
+
+# Game logic runs in fixed ticks, independent of the frame rate
+TICK_RATE = 60  # ticks per second
+MAX_CATCH_UP_TICKS = 8  # most ticks run in one frame after a hitch
+
+# Longest wait for an event while idle (paused, game over or unfocused)
+IDLE_TIMEOUT_MS = 1000
+
+# Repaint only changed regions each frame instead of the whole window
+DIRTY_RECT_RENDERING = True
+
+# Maximum number of rendered text surfaces kept by the renderer
+TEXT_CACHE_SIZE = 64
+
+# Outline where the falling piece will land
+GHOST_PIECE = True
+
+# Longest launch to first frame (startup.py) before it counts as a regression
+STARTUP_BUDGET = 0.75  # seconds
+
+# Frame profiler (main.py --profile)
+PROFILE_WINDOW = 600          # frames kept for rolling percentiles
+PROFILE_TRACE_FRAMES = 36000  # frames kept for the trace dump (10 min at 60 FPS)
+PROFILE_HUD_INTERVAL = 30     # frames between HUD text refreshes
+PROFILE_HUD_X = 262
+PROFILE_HUD_Y = 365
 
 # Game board settings
 BOARD_WIDTH = 10
@@ -28,6 +54,15 @@ COLORS = {
     'L': (240, 160, 0),      # Orange
 }
 
+# Maximum number of (board, piece) searches kept by the placement cache
+PLACEMENT_CACHE_SIZE = 4096
+
+# Seed of the Zobrist keys used to hash board states
+ZOBRIST_SEED = 0x7E7215
+
+# Number of entries in a transposition table (rounded up to a power of two)
+TRANSPOSITION_TABLE_SIZE = 1 << 16
+
 # Game speed settings
 INITIAL_DROP_SPEED = 0.5  # seconds
 MIN_DROP_SPEED = 0.1
@@ -50,3 +85,25 @@ SCORE_X = 280
 SCORE_Y = 250
 LEVEL_X = 280
 LEVEL_Y = 320
+
+# Game server (server.py)
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 7777
+SERVER_SEND_INTERVAL = 3  # ticks between state frames to each client
+SERVER_INPUTS_PER_TICK = 4  # most queued inputs applied to a game per tick
+SERVER_MAX_PENDING_INPUTS = 64  # stop reading from a client with this many queued
+SERVER_WRITE_BUFFER = 64 * 1024  # bytes queued to a client before frames are skipped
+SERVER_STALL_TIMEOUT = 10.0  # seconds a client may leave frames unread before it is dropped
+SERVER_STATS_INTERVAL = 5.0  # seconds between server statistics lines
+
+# Delta state streams (delta.py)
+DELTA_KEYFRAME_INTERVAL = 120  # frames between keyframes on a stream
+DELTA_HISTORY = 32  # frames kept for use as delta bases
+DELTA_RATE_WINDOW = 5.0  # seconds of traffic averaged for bytes per second
+
+# Vector environment (vecenv.py)
+VECENV_TIMEOUT = 60.0  # seconds to wait for the worker processes on each step
+
+# Beam search agent (agents.py)
+BEAM_WIDTH = 6  # boards expanded from one search layer to the next
+BEAM_TIME_BUDGET = 0.002  # seconds of search per piece
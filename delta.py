@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+# Tetris Delta State Streams (remote rendering and spectating)
+#
+# A DeltaEncoder turns successive states of one game into frames that only
+# carry what changed since the last frame the viewer acknowledged: changed
+# cells, the current piece and the HUD fields (score, lines, level, next
+# piece, game over). Every DELTA_KEYFRAME_INTERVAL frames, and whenever no
+# acknowledged frame is recent enough to diff against, it sends a keyframe
+# holding the whole state. Frames may be lost or dropped; the viewer only
+# acknowledges the ones it decoded.
+#
+# A DeltaDecoder applies frames to a GameMirror, which Renderer.draw_game
+# draws like a TetrisGame.
+#
+# Frame layout (varints as in replay.py):
+#     varint frame number, flags byte, varint distance back to the base
+#     frame (delta frames only), then the sections named by the flags:
+#     PIECE  shape code, rotation, x, y (one byte each, x and y signed)
+#     HUD    varint score, varint lines, varint level,
+#            byte next shape code << 1 | game over
+#     CELLS  varint count, then varint (cell index << 3 | cell code) each
+#     BOARD  every cell code, two per byte
+#
+# Measure stream sizes on simulated games:
+#     python delta.py --games 20 --loss 0.05
+
+import argparse
+import random
+import struct
+import sys
+import time
+from collections import deque
+from agents import AGENTS
+from board import Board
+from game import TetrisGame, Tetromino
+from replay import encode_varint, decode_varint
+from server import CELL_CODES, CELL_VALUES, encode_state
+from config import (
+    BOARD_WIDTH, BOARD_HEIGHT, TICK_RATE,
+    DELTA_KEYFRAME_INTERVAL, DELTA_HISTORY, DELTA_RATE_WINDOW,
+)
+
+# Flags byte: which sections follow the header
+KEYFRAME = 1
+PIECE = 2
+HUD = 4
+CELLS = 8
+BOARD = 16
+
+# Current piece section
+PIECE_STRUCT = struct.Struct('<BBbb')
+
+# Number of cells on the board
+CELL_COUNT = BOARD_WIDTH * BOARD_HEIGHT
+
+# State of a board with no blocks, the base of every keyframe
+EMPTY_CELLS = bytes(CELL_COUNT)
+
+
+def capture_state(game):
+    """
+    Get the part of a game's state that a stream carries.
+    
+    Args:
+        game: TetrisGame object
+    
+    Returns:
+        Tuple of (cell codes as bytes, piece tuple, HUD tuple)
+    
+    Raises:
+        ValueError: If the board isn't BOARD_WIDTH x BOARD_HEIGHT, the
+                    size the stream format is laid out for
+    """
+    board = game.board
+    if (board.width, board.height) != (BOARD_WIDTH, BOARD_HEIGHT):
+        raise ValueError(f"delta streams need a {BOARD_WIDTH}x{BOARD_HEIGHT} board, "
+                         f"not {board.width}x{board.height}")
+    piece = game.current_piece
+    return (
+        bytes([CELL_CODES[cell] for row in board.grid for cell in row]),
+        (CELL_CODES[piece.shape_type], piece.rotation, piece.x, piece.y),
+        (game.score, game.lines_cleared, game.level,
+         CELL_CODES[game.next_piece.shape_type], game.game_over),
+    )
+
+
+def pack_board(cells):
+    """Pack cell codes two per byte."""
+    if len(cells) % 2:
+        cells += b'\x00'
+    return bytes([cells[i] << 4 | cells[i + 1] for i in range(0, len(cells), 2)])
+
+
+def unpack_board(data, pos):
+    """
+    Unpack cell codes stored by pack_board.
+    
+    Returns:
+        Tuple of (cell codes as a bytearray, offset after the board)
+    """
+    end = pos + (CELL_COUNT + 1) // 2
+    cells = bytearray()
+    for byte in data[pos:end]:
+        cells.append(byte >> 4)
+        cells.append(byte & 15)
+    del cells[CELL_COUNT:]
+    return cells, end
+
+
+class DeltaEncoder:
+    """Encodes one game's state stream for one viewer."""
+    
+    def __init__(self, keyframe_interval=DELTA_KEYFRAME_INTERVAL, history=DELTA_HISTORY,
+                 clock=time.monotonic):
+        """
+        Initialize the encoder.
+        
+        Args:
+            keyframe_interval: Frames between keyframes
+            history: Number of sent frames kept as possible delta bases;
+                     an acknowledgement older than this forces a keyframe
+            clock: Function returning the current time in seconds
+        """
+        self.keyframe_interval = keyframe_interval
+        self.history = history
+        self.clock = clock
+        self.frame = 0
+        self.last_keyframe = None
+        self.acked = None
+        self.sent = {}
+        
+        # Statistics
+        self.frames = 0
+        self.keyframes = 0
+        self.bytes = 0
+        self.window = deque()
+        self.window_bytes = 0
+    
+    def encode(self, game):
+        """
+        Encode the game's current state as the next frame.
+        
+        Args:
+            game: TetrisGame object
+        
+        Returns:
+            Frame bytes
+        
+        Raises:
+            ValueError: If the game's board isn't the default size
+        """
+        state = capture_state(game)
+        self.frame += 1
+        frame = self.frame
+        cells, piece, hud = state
+        
+        base = self.sent.get(self.acked)
+        keyframe = (base is None or self.last_keyframe is None
+                    or frame - self.last_keyframe >= self.keyframe_interval)
+        
+        out = bytearray()
+        encode_varint(frame, out)
+        if keyframe:
+            out.append(KEYFRAME | PIECE | HUD | BOARD)
+            out += PIECE_STRUCT.pack(*piece)
+            self.pack_hud(hud, out)
+            out += pack_board(cells)
+            self.last_keyframe = frame
+            self.keyframes += 1
+        else:
+            base_cells, base_piece, base_hud = base
+            flags_at = len(out)
+            out.append(0)
+            encode_varint(frame - self.acked, out)
+            flags = 0
+            if piece != base_piece:
+                flags |= PIECE
+                out += PIECE_STRUCT.pack(*piece)
+            if hud != base_hud:
+                flags |= HUD
+                self.pack_hud(hud, out)
+            if cells != base_cells:
+                changes = self.pack_changes(base_cells, cells)
+                # A line clear moves most of the board; then the packed
+                # board is smaller than the list of changes
+                if len(changes) < (CELL_COUNT + 1) // 2:
+                    flags |= CELLS
+                    out += changes
+                else:
+                    flags |= BOARD
+                    out += pack_board(cells)
+            out[flags_at] = flags
+        
+        self.sent[frame] = state
+        if len(self.sent) > self.history:
+            del self.sent[min(self.sent)]
+        
+        self.count(len(out))
+        return bytes(out)
+    
+    @staticmethod
+    def pack_hud(hud, out):
+        """Append the HUD section."""
+        score, lines, level, next_code, game_over = hud
+        encode_varint(score, out)
+        encode_varint(lines, out)
+        encode_varint(level, out)
+        out.append(next_code << 1 | game_over)
+    
+    @staticmethod
+    def pack_changes(base_cells, cells):
+        """
+        Build the CELLS section from two boards' cell codes.
+        
+        Returns:
+            bytearray holding the count and the changed cells
+        """
+        changes = bytearray()
+        count = 0
+        # Rows are compared whole first; most of them are unchanged
+        for start in range(0, CELL_COUNT, BOARD_WIDTH):
+            end = start + BOARD_WIDTH
+            if cells[start:end] != base_cells[start:end]:
+                for index in range(start, end):
+                    if cells[index] != base_cells[index]:
+                        encode_varint(index << 3 | cells[index], changes)
+                        count += 1
+        out = bytearray()
+        encode_varint(count, out)
+        return out + changes
+    
+    def ack(self, frame):
+        """
+        Record that the viewer decoded a frame, so later frames can be
+        encoded against it.
+        
+        Args:
+            frame: Frame number acknowledged by the viewer
+        """
+        if frame in self.sent and (self.acked is None or frame > self.acked):
+            self.acked = frame
+            # Frames before the acknowledged one will never be bases again
+            for old in [f for f in self.sent if f < frame]:
+                del self.sent[old]
+    
+    def count(self, size):
+        """Add a frame to the statistics."""
+        now = self.clock()
+        self.frames += 1
+        self.bytes += size
+        self.window.append((now, size))
+        self.window_bytes += size
+        while now - self.window[0][0] > DELTA_RATE_WINDOW:
+            self.window_bytes -= self.window.popleft()[1]
+    
+    def stats(self):
+        """
+        Get the stream statistics, for sizing spectator fan-out.
+        
+        Returns:
+            Dictionary with frames, keyframes, total bytes, average bytes
+            per frame, and bytes per second over the last
+            DELTA_RATE_WINDOW seconds
+        """
+        span = self.window[-1][0] - self.window[0][0] if self.window else 0.0
+        # The window covers one frame interval more than its timestamps span
+        frames = len(self.window)
+        seconds = span * frames / (frames - 1) if frames > 1 else 0.0
+        return {
+            'frames': self.frames,
+            'keyframes': self.keyframes,
+            'bytes': self.bytes,
+            'bytes_per_frame': self.bytes / self.frames if self.frames else 0.0,
+            'bytes_per_second': self.window_bytes / seconds if seconds else 0.0,
+        }
+
+
+class GameMirror:
+    """
+    Local copy of a remote game, built from a state stream.
+    
+    Has the attributes Renderer.draw_game reads from a TetrisGame. The
+    board is a real Board, so the ghost piece can be computed.
+    pieces_placed changes whenever the board does, which is all the
+    incremental renderer uses it for.
+    """
+    
+    def __init__(self):
+        """Initialize an empty mirror."""
+        self.board = Board()
+        self.current_piece = Tetromino(CELL_VALUES[1])
+        self.next_piece = Tetromino(CELL_VALUES[1])
+        self.score = 0
+        self.lines_cleared = 0
+        self.level = 1
+        self.game_over = False
+        self.pieces_placed = 0
+        self.cells = bytearray(EMPTY_CELLS)
+    
+    def apply(self, state):
+        """
+        Show a decoded state, touching only the board cells that differ.
+        
+        Args:
+            state: Tuple of (cell codes, piece tuple, HUD tuple)
+        """
+        cells, piece, hud = state
+        if cells != self.cells:
+            shown = self.cells
+            for index in range(CELL_COUNT):
+                if cells[index] != shown[index]:
+                    y, x = divmod(index, BOARD_WIDTH)
+                    self.board.set_cell(x, y, CELL_VALUES[cells[index]])
+                    shown[index] = cells[index]
+            self.pieces_placed += 1
+        
+        current = self.current_piece
+        shape, current.rotation, current.x, current.y = piece
+        current.shape_type = CELL_VALUES[shape]
+        self.score, self.lines_cleared, self.level, next_code, self.game_over = hud
+        self.next_piece.shape_type = CELL_VALUES[next_code]
+
+
+class DeltaDecoder:
+    """Decodes one state stream into a GameMirror."""
+    
+    def __init__(self, history=DELTA_HISTORY):
+        """
+        Initialize the decoder.
+        
+        Args:
+            history: Number of decoded frames kept as possible delta bases;
+                     should match the encoder's
+        """
+        self.history = history
+        self.mirror = GameMirror()
+        self.latest = 0
+        self.states = {}
+        self.skipped = 0
+    
+    def decode(self, data):
+        """
+        Apply a frame to the mirror.
+        
+        Args:
+            data: Frame bytes from DeltaEncoder.encode
+        
+        Returns:
+            The frame number to acknowledge, or None if the frame was
+            skipped (older than the mirror, or its base is unknown)
+        """
+        frame, pos = decode_varint(data, 0)
+        flags = data[pos]
+        pos += 1
+        if frame <= self.latest:
+            self.skipped += 1
+            return None
+        
+        if flags & KEYFRAME:
+            cells, piece, hud = EMPTY_CELLS, None, None
+        else:
+            distance, pos = decode_varint(data, pos)
+            base = self.states.get(frame - distance)
+            if base is None:
+                self.skipped += 1
+                return None
+            cells, piece, hud = base
+        
+        if flags & PIECE:
+            piece = PIECE_STRUCT.unpack_from(data, pos)
+            pos += PIECE_STRUCT.size
+        if flags & HUD:
+            score, pos = decode_varint(data, pos)
+            lines, pos = decode_varint(data, pos)
+            level, pos = decode_varint(data, pos)
+            hud = (score, lines, level, data[pos] >> 1, bool(data[pos] & 1))
+            pos += 1
+        if flags & CELLS:
+            cells = bytearray(cells)
+            count, pos = decode_varint(data, pos)
+            for _ in range(count):
+                change, pos = decode_varint(data, pos)
+                cells[change >> 3] = change & 7
+            cells = bytes(cells)
+        elif flags & BOARD:
+            cells, pos = unpack_board(data, pos)
+            cells = bytes(cells)
+        
+        state = (cells, piece, hud)
+        self.states[frame] = state
+        while len(self.states) > self.history:
+            del self.states[min(self.states)]
+        self.latest = frame
+        self.mirror.apply(state)
+        return frame
+
+
+def measure(games, agent_name, ticks, send_interval, loss, seed):
+    """
+    Stream simulated games through lossy channels and compare stream sizes.
+    
+    Frames and acknowledgements are each lost with probability loss.
+    
+    Returns:
+        Dictionary with frames, keyframes, skipped frames, delta and full
+        state bytes per second per stream at TICK_RATE / send_interval frames
+        per second
+    """
+    rng = random.Random(seed)
+    frames = keyframes = skipped = delta_bytes = full_bytes = 0
+    
+    for index in range(games):
+        game_seed = None if seed is None else seed + index
+        game = TetrisGame(seed=game_seed)
+        agent = AGENTS[agent_name](seed=game_seed)
+        encoder = DeltaEncoder()
+        decoder = DeltaDecoder()
+        
+        for tick in range(1, ticks + 1):
+            if game.game_over:
+                game.reset()
+            action = agent.act(game)
+            if action is not None:
+                game.apply(action)
+            game.tick()
+            if tick % send_interval:
+                continue
+            
+            data = encoder.encode(game)
+            full_bytes += len(encode_state(game, tick))
+            if rng.random() >= loss:
+                acked = decoder.decode(data)
+                if acked is not None and rng.random() >= loss:
+                    encoder.ack(acked)
+        
+        frames += encoder.frames
+        keyframes += encoder.keyframes
+        skipped += decoder.skipped
+        delta_bytes += encoder.bytes
+    
+    frame_rate = TICK_RATE / send_interval
+    return {
+        'frames': frames,
+        'keyframes': keyframes,
+        'skipped': skipped,
+        'delta_bytes_per_second': delta_bytes / frames * frame_rate,
+        'full_bytes_per_second': full_bytes / frames * frame_rate,
+    }
+
+
+def main(argv=None):
+    """Entry point for the stream size measurement."""
+    parser = argparse.ArgumentParser(description="Measure delta state stream sizes.")
+    parser.add_argument('--games', type=int, default=10, help="games to stream")
+    parser.add_argument('--agent', choices=sorted(AGENTS), default='drop',
+                        help="computer player to use")
+    parser.add_argument('--ticks', type=int, default=3600, help="ticks to play per game")
+    parser.add_argument('--send-interval', type=int, default=1,
+                        help="ticks between frames")
+    parser.add_argument('--loss', type=float, default=0.0,
+                        help="probability of losing each frame and each acknowledgement")
+    parser.add_argument('--seed', type=int, default=None, help="seed for the games")
+    args = parser.parse_args(argv)
+    
+    result = measure(args.games, args.agent, args.ticks, args.send_interval,
+                     args.loss, args.seed)
+    print(f"{result['frames']} frames ({result['keyframes']} keyframes, "
+          f"{result['skipped']} skipped by the viewer)")
+    print(f"delta stream: {result['delta_bytes_per_second']:.0f} bytes/s per viewer")
+    print(f"full state:   {result['full_bytes_per_second']:.0f} bytes/s per viewer")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+# Tetris Reinforcement Learning Environment
+#
+# Gym-style reset()/step() API over TetrisGame, without depending on gym.
+# Observations are written into NumPy arrays allocated once per
+# environment; reset() and step() return the same arrays every time, so
+# copy them if they need to outlive the next step.
+
+import numpy as np
+from bitboard import BitBoard
+from features import ROW_CELLS
+from game import TetrisGame, ACTIONS
+from shapes import SHAPES, SHAPE_TYPES, PIECE_TABLE
+from config import BOARD_WIDTH, BOARD_HEIGHT
+
+# Most rotation states of any shape; placement actions cover this many
+ROTATIONS = max(len(rotations) for rotations in SHAPES.values())
+
+# Key action that presses nothing, after the ones in game.ACTIONS
+NOOP = len(ACTIONS)
+
+# Number of actions in each action mode: keys are ACTIONS plus NOOP, and
+# placement action rotation * BOARD_WIDTH + column puts the piece in that
+# rotation with its leftmost block in that column, then hard drops it
+ACTION_COUNTS = {
+    'keys': len(ACTIONS) + 1,
+    'placement': ROTATIONS * BOARD_WIDTH,
+}
+
+# Scalar features, after the column heights and holes
+SCALAR_FEATURES = ('level', 'lines')
+
+# Shape and dtype of each observation array:
+#   board     1 where a cell is occupied, top row first
+#   current   one-hot shape of the current piece, in SHAPE_TYPES order
+#   next      one-hot shape of the next piece
+#   piece     rotation, x and y of the current piece
+#   features  column heights, column holes, then SCALAR_FEATURES
+OBSERVATION_SPEC = {
+    'board': ((BOARD_HEIGHT, BOARD_WIDTH), np.uint8),
+    'current': ((len(SHAPE_TYPES),), np.uint8),
+    'next': ((len(SHAPE_TYPES),), np.uint8),
+    'piece': ((3,), np.int16),
+    'features': ((2 * BOARD_WIDTH + len(SCALAR_FEATURES),), np.float32),
+}
+
+# Index of each shape type in the one-hot piece arrays
+SHAPE_INDEX = {shape_type: i for i, shape_type in enumerate(SHAPE_TYPES)}
+
+
+def allocate_observation():
+    """
+    Allocate a zeroed set of observation arrays.
+    
+    Returns:
+        Dictionary of arrays shaped as in OBSERVATION_SPEC
+    """
+    return {name: np.zeros(shape, dtype) for name, (shape, dtype) in OBSERVATION_SPEC.items()}
+
+
+class TetrisEnv:
+    """
+    Single-game environment with a gym-style API.
+    
+    In 'keys' mode each step presses one key (or NOOP) and runs one logic
+    tick, so gravity applies. In 'placement' mode each step places the
+    current piece with a whole input sequence; action_mask() tells which
+    placements are reachable by rotating at the spawn position, then
+    shifting, then hard dropping.
+    
+    The reward is the score gained by the step.
+    """
+    
+    def __init__(self, mode='placement', seed=None, randomizer='uniform', max_steps=None,
+                 observation=None):
+        """
+        Initialize the environment.
+        
+        Args:
+            mode: 'placement' or 'keys'
+            seed: Seed for the first game; later games continue from it
+            randomizer: Key of the piece randomizer in RANDOMIZERS
+            max_steps: Optional number of steps after which an episode is
+                       truncated
+            observation: Optional dictionary of arrays to write observations
+                         into (as from allocate_observation), such as views
+                         of shared memory
+        """
+        if mode not in ACTION_COUNTS:
+            raise ValueError(f"unknown action mode: {mode!r}")
+        self.mode = mode
+        self.action_count = ACTION_COUNTS[mode]
+        self.max_steps = max_steps
+        self.game = TetrisGame(board=BitBoard(), seed=seed, randomizer=randomizer)
+        self.rng = np.random.default_rng(seed)
+        self.observation = observation if observation is not None else allocate_observation()
+        self.mask = np.zeros(ACTION_COUNTS['placement'], dtype=bool)
+        self.info = {}
+        self.steps = 0
+        
+        # What the observation arrays currently show, so unchanged parts
+        # aren't rewritten
+        self.shown_board = None
+        self.shown_current = None
+        self.shown_next = None
+        self.write_observation()
+    
+    def reset(self, seed=None):
+        """
+        Start a new episode.
+        
+        Args:
+            seed: Seed for the new game (drawn from the environment's own
+                  sequence if None)
+        
+        Returns:
+            Tuple of (observation, info)
+        """
+        if seed is None:
+            seed = int(self.rng.integers(1 << 63))
+        self.game.reset(seed)
+        self.steps = 0
+        self.shown_board = self.shown_current = self.shown_next = None
+        self.write_observation()
+        return self.observation, self.info
+    
+    def step(self, action):
+        """
+        Perform one action.
+        
+        Args:
+            action: Action index, below action_count
+        
+        Returns:
+            Tuple of (observation, reward, terminated, truncated, info)
+        """
+        game = self.game
+        score = game.score
+        
+        if self.mode == 'keys':
+            if action != NOOP:
+                game.apply(ACTIONS[action])
+            game.tick()
+        else:
+            self.place(action)
+        
+        self.steps += 1
+        self.write_observation()
+        truncated = self.max_steps is not None and self.steps >= self.max_steps
+        return self.observation, game.score - score, game.game_over, truncated, self.info
+    
+    def place(self, action):
+        """
+        Play a placement action with the game's own inputs.
+        
+        Args:
+            action: Placement action index
+        
+        Raises:
+            ValueError: If the placement can't be reached
+        """
+        moves = self.placement_moves(action)
+        if moves is None:
+            raise ValueError(f"placement action {action} is not reachable")
+        game = self.game
+        for move in moves:
+            game.apply(move)
+    
+    def placement_moves(self, action):
+        """
+        Get the inputs that play a placement action.
+        
+        Args:
+            action: Placement action index
+        
+        Returns:
+            List of action names ending with 'hard_drop', or None if the
+            piece can't get there
+        """
+        rotation, column = divmod(int(action), BOARD_WIDTH)
+        reach = self.reachable_columns(rotation)
+        if reach is None or not reach[0] <= column <= reach[1]:
+            return None
+        
+        piece = self.game.current_piece
+        table = PIECE_TABLE[piece.shape_type]
+        shift = column - table[rotation].left - piece.x
+        return (['rotate'] * ((rotation - piece.rotation) % len(table))
+                + ['move_right' if shift > 0 else 'move_left'] * abs(shift)
+                + ['hard_drop'])
+    
+    def reachable_columns(self, rotation):
+        """
+        Get the columns the current piece can be shifted to in a rotation.
+        
+        Args:
+            rotation: Target rotation state, reached by rotating in place
+        
+        Returns:
+            Tuple of the lowest and highest leftmost-block column, or None
+            if the rotation can't be reached
+        """
+        game = self.game
+        piece = game.current_piece
+        shape_type, x, y = piece.shape_type, piece.x, piece.y
+        table = PIECE_TABLE[shape_type]
+        if game.game_over or rotation >= len(table):
+            return None
+        
+        fits = game.board.fits
+        state = piece.rotation
+        while state != rotation:
+            state = (state + 1) % len(table)
+            if not fits(shape_type, state, x, y):
+                return None
+        
+        low = high = x
+        while fits(shape_type, rotation, low - 1, y):
+            low -= 1
+        while fits(shape_type, rotation, high + 1, y):
+            high += 1
+        left = table[rotation].left
+        return low + left, high + left
+    
+    def action_mask(self):
+        """
+        Get which placement actions are currently reachable.
+        
+        Returns:
+            Boolean array of length ACTION_COUNTS['placement'], reused
+            between calls
+        """
+        mask = self.mask
+        mask[:] = False
+        for rotation in range(ROTATIONS):
+            reach = self.reachable_columns(rotation)
+            if reach is not None:
+                start = rotation * BOARD_WIDTH
+                mask[start + reach[0]:start + reach[1] + 1] = True
+        return mask
+    
+    def write_observation(self):
+        """Bring the observation arrays up to date with the game."""
+        game = self.game
+        board = game.board
+        observation = self.observation
+        
+        # The board only changes when a piece locks; its hash says when
+        if board.zobrist != self.shown_board:
+            np.take(ROW_CELLS, board.occupancy(), axis=0, out=observation['board'])
+            observation['features'][:] = (board.heights + board.holes
+                                          + [game.level, game.lines_cleared])
+            self.shown_board = board.zobrist
+        
+        piece = game.current_piece
+        if piece.shape_type != self.shown_current:
+            current = observation['current']
+            current[:] = 0
+            current[SHAPE_INDEX[piece.shape_type]] = 1
+            self.shown_current = piece.shape_type
+        if game.next_piece.shape_type != self.shown_next:
+            next_piece = observation['next']
+            next_piece[:] = 0
+            next_piece[SHAPE_INDEX[game.next_piece.shape_type]] = 1
+            self.shown_next = game.next_piece.shape_type
+        
+        position = observation['piece']
+        position[0] = piece.rotation
+        position[1] = piece.x
+        position[2] = piece.y
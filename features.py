@@ -0,0 +1,293 @@
+# Tetris Board Features (vectorized)
+#
+# Computes heuristic features for a whole batch of boards at once. A batch
+# is one NumPy array of row bitmasks shaped (count, BOARD_HEIGHT), top row
+# first, bit x set where column x is occupied (as Board.occupancy()), so
+# scoring every placement of a piece is a handful of array passes instead
+# of a Python loop over each board's grid.
+
+from collections import namedtuple
+import numpy as np
+from shapes import SHAPES, PIECE_TABLE
+from config import BOARD_WIDTH, BOARD_HEIGHT
+
+# Feature columns returned by board_features, in order:
+#   height     sum of the column heights
+#   holes      empty cells below the top block of their column
+#   bumpiness  sum of height differences between neighbouring columns
+#   wells      sum of well depths: how far each column is below the lower
+#              of its neighbours (the walls count as full height)
+#   lines      rows that were complete before they were cleared
+FEATURES = ('height', 'holes', 'bumpiness', 'wells', 'lines')
+
+# Row mask with every column occupied
+FULL_ROW = (1 << BOARD_WIDTH) - 1
+
+# Board plane row for every row mask: ROW_CELLS[mask][x] is bit x of mask
+ROW_CELLS = ((np.arange(1 << BOARD_WIDTH)[:, None] >> np.arange(BOARD_WIDTH)) & 1).astype(np.uint8)
+
+# Occupied cells in every row mask
+ROW_POPCOUNT = ROW_CELLS.sum(axis=1)
+
+# Every row mask with bit x moved to a COLUMN_BITS-wide field of its own,
+# so summing spread masks over rows counts each column's cells at once
+COLUMN_BITS = (BOARD_HEIGHT + 1).bit_length()
+COLUMN_SHIFTS = COLUMN_BITS * np.arange(BOARD_WIDTH)
+ROW_SPREAD = (ROW_CELLS.astype(np.int64) << COLUMN_SHIFTS).sum(axis=1)
+
+# Full cells around the board in candidate_boards, enough for any piece
+# cell of a placement in DROP_COLUMNS
+BOARD_PADDING = 4
+PADDED_WIDTH = BOARD_WIDTH + 2 * BOARD_PADDING
+
+# Origin columns a piece's placements are computed for (wider than any
+# piece can reach; out-of-bounds ones never fit)
+DROP_COLUMNS = np.arange(-BOARD_PADDING + 1, BOARD_WIDTH)
+
+# Per-shape index arrays for candidate_boards:
+#   top      topmost cell offset of each rotation
+#   masks    row masks the piece covers in each column, for rows y to
+#            y + 3, shaped (rotation, column, 4)
+#   cell_id  placements covering the same cells share an id, shaped
+#            (rotation, column)
+#   cells    flat index into the padded board of every cell of every
+#            placement at every y, shaped (rotation, column, y, cell)
+DropGrid = namedtuple('DropGrid', ['top', 'masks', 'cell_id', 'cells'])
+
+
+def board_rows(board):
+    """
+    Get a board's row bitmasks as an array.
+    
+    Args:
+        board: Board object (any backend with occupancy())
+    
+    Returns:
+        int64 array of BOARD_HEIGHT row masks, top row first
+    """
+    return np.array(board.occupancy(), dtype=np.int64)
+
+
+def build_drop_grid(shape_type):
+    """
+    Build the board-independent index arrays for one shape's placements.
+    
+    Every rotation is paired with every origin column in DROP_COLUMNS, in
+    or out of bounds, so the placements of a piece form an array shaped
+    (rotations, len(DROP_COLUMNS)).
+    
+    Args:
+        shape_type: Shape type of the piece
+    
+    Returns:
+        DropGrid for the shape
+    """
+    table = PIECE_TABLE[shape_type]
+    if any(len(masks.cells[masks.min_x]) != 4 for masks in table):
+        raise ValueError(f"shape {shape_type!r} doesn't have four cells")
+    dy = np.array([[dy for dy, _ in masks.cells[masks.min_x]] for masks in table])
+    dx = np.array([[col - masks.min_x for _, col in masks.cells[masks.min_x]]
+                   for masks in table])
+    top = np.array([masks.top for masks in table])
+    
+    masks = np.zeros((len(table), len(DROP_COLUMNS), 4), dtype=np.int64)
+    ids = {}
+    cell_id = np.empty((len(table), len(DROP_COLUMNS)), dtype=np.int64)
+    for r, rotation in enumerate(table):
+        for i, x in enumerate(DROP_COLUMNS):
+            if rotation.min_x <= x <= rotation.max_x:
+                for row, mask in rotation.rows[x]:
+                    masks[r, i, row] = mask
+            # Rotations covering the same cells from the same column get one id
+            cell_id[r, i] = ids.setdefault(frozenset(zip(dy[r], dx[r] + x)), len(ids))
+    
+    # Every y from 0 to BOARD_HEIGHT, where any piece is on the floor
+    rows = np.arange(BOARD_HEIGHT + 1)[None, None, :, None] + dy[:, None, None, :]
+    cols = DROP_COLUMNS[None, :, None, None] + dx[:, None, None, :] + BOARD_PADDING
+    cells = np.ascontiguousarray(rows * PADDED_WIDTH + cols)
+    return DropGrid(top, masks, cell_id, cells)
+
+
+def candidate_boards(board, piece):
+    """
+    Build the board after every drop placement of a piece.
+    
+    Finds the same placements as placements.drop_positions (rotate in
+    place, shift, hard drop, one per distinct set of cells), but for all
+    rotations and columns at once.
+    
+    Args:
+        board: Board object to place on
+        piece: Tetromino object in its current position
+    
+    Returns:
+        Tuple of (int array shaped (count, 5) of rotation, x, lock y,
+        rotations pressed and signed columns shifted, as the position
+        tuples of drop_positions; row mask array of the resulting boards
+        shaped (count, BOARD_HEIGHT); boolean array marking placements
+        that end the game); completed rows are left in place for
+        clear_rows
+    
+    Raises:
+        ValueError: If the board isn't BOARD_WIDTH x BOARD_HEIGHT, the
+                    size the lookup tables are built for
+    """
+    if (board.width, board.height) != (BOARD_WIDTH, BOARD_HEIGHT):
+        raise ValueError(f"vectorized features need a {BOARD_WIDTH}x{BOARD_HEIGHT} board, "
+                         f"not {board.width}x{board.height}")
+    grid = DROP_GRIDS[piece.shape_type]
+    rows = board_rows(board)
+    padded = np.ones((BOARD_HEIGHT + BOARD_PADDING, PADDED_WIDTH), dtype=np.uint8)
+    padded[:BOARD_HEIGHT, BOARD_PADDING:-BOARD_PADDING] = ROW_CELLS[rows]
+    
+    # A placement is blocked if any of its four cells is occupied; reading
+    # the four uint8 cells as one uint32 is much faster than any(axis=3)
+    blocked = np.take(padded, grid.cells).view(np.uint32)[..., 0] != 0
+    
+    # Rotating in place stops at the first rotation that doesn't fit
+    x0 = piece.x - DROP_COLUMNS[0]
+    fits = ~blocked[:, :, piece.y]
+    rotations = len(grid.top)
+    path = (piece.rotation + np.arange(rotations)) % rotations
+    reachable = np.empty(rotations, dtype=bool)
+    reachable[path] = np.logical_and.accumulate(fits[path, x0])
+    
+    # Shifting stops at the first column that doesn't fit on either side
+    reach = np.empty_like(fits)
+    reach[:, :x0 + 1] = np.logical_and.accumulate(fits[:, x0::-1], axis=1)[:, ::-1]
+    reach[:, x0:] = np.logical_and.accumulate(fits[:, x0:], axis=1)
+    reach &= reachable[:, None]
+    
+    # In rotation order from the current one; duplicates keep the first
+    turns, column = np.nonzero(reach[path])
+    rotation = path[turns]
+    _, first = np.unique(grid.cell_id[rotation, column], return_index=True)
+    first.sort()
+    turns, column, rotation = turns[first], column[first], rotation[first]
+    
+    # The piece locks one row above the first blocked row under it
+    lock = piece.y + blocked[rotation, column, piece.y + 1:].argmax(axis=1)
+    x = column + DROP_COLUMNS[0]
+    positions = np.stack((rotation, x, lock, turns, x - piece.x), axis=1)
+    
+    # Four spare rows take the piece rows past the bottom, which are empty
+    count = len(positions)
+    boards = np.empty((count, BOARD_HEIGHT + 4), dtype=np.int64)
+    boards[:, :BOARD_HEIGHT] = rows
+    boards[np.arange(count)[:, None], lock[:, None] + np.arange(4)] |= grid.masks[rotation, column]
+    return positions, boards[:, :BOARD_HEIGHT], lock + grid.top[rotation] <= 0
+
+
+def clear_rows(boards):
+    """
+    Clear the complete rows of a batch of boards.
+    
+    Args:
+        boards: Row mask array shaped (count, BOARD_HEIGHT)
+    
+    Returns:
+        Tuple of (new array with complete rows removed and the rows above
+        moved down, number of rows cleared on each board)
+    """
+    complete = boards == FULL_ROW
+    lines = complete.sum(axis=1)
+    if not lines.any():
+        return boards, lines
+    
+    # Each kept row moves down by the number of complete rows below it
+    below = np.cumsum(complete[:, ::-1], axis=1)[:, ::-1] - complete
+    n, row = np.nonzero(~complete)
+    cleared = np.zeros_like(boards)
+    cleared[n, row + below[n, row]] = boards[n, row]
+    return cleared, lines
+
+
+def board_features(boards, lines=None):
+    """
+    Compute the FEATURES of a batch of boards.
+    
+    Args:
+        boards: Row mask array shaped (count, BOARD_HEIGHT), complete
+                rows already cleared
+        lines: Optional rows cleared on each board (default: zeros)
+    
+    Returns:
+        float64 array shaped (count, len(FEATURES))
+    """
+    count = len(boards)
+    # A column's height is the number of rows at or below its top block:
+    # the rows where the column is set in the OR of the rows above
+    covered = np.bitwise_or.accumulate(boards, axis=1)
+    heights = (ROW_SPREAD[covered].sum(axis=1)[:, None] >> COLUMN_SHIFTS) & ((1 << COLUMN_BITS) - 1)
+    
+    walls = np.full((count, 1), BOARD_HEIGHT)
+    padded = np.concatenate((walls, heights, walls), axis=1)
+    wells = np.minimum(padded[:, :-2], padded[:, 2:]) - heights
+    
+    features = np.empty((count, len(FEATURES)))
+    features[:, 0] = heights.sum(axis=1)
+    features[:, 1] = features[:, 0] - ROW_POPCOUNT[boards].sum(axis=1)
+    features[:, 2] = np.abs(np.diff(heights, axis=1)).sum(axis=1)
+    features[:, 3] = np.maximum(wells, 0).sum(axis=1)
+    features[:, 4] = 0 if lines is None else lines
+    return features
+
+
+def weight_vector(weights):
+    """
+    Turn a weights dictionary into a vector over FEATURES.
+    
+    Args:
+        weights: Dictionary mapping feature name to weight; features
+                 left out get weight 0
+    
+    Returns:
+        float64 array of length len(FEATURES)
+    
+    Raises:
+        ValueError: If a weight names an unknown feature
+    """
+    unknown = set(weights) - set(FEATURES)
+    if unknown:
+        raise ValueError(f"unknown features: {sorted(unknown)}")
+    return np.array([weights.get(name, 0.0) for name in FEATURES])
+
+
+def score_boards(boards, weights, lines=None):
+    """
+    Score a batch of boards.
+    
+    Args:
+        boards: Row mask array shaped (count, BOARD_HEIGHT), complete
+                rows already cleared
+        weights: Dictionary of feature weights, or a vector from weight_vector
+        lines: Optional rows cleared on each board
+    
+    Returns:
+        float64 array of scores, higher is better
+    """
+    if isinstance(weights, dict):
+        weights = weight_vector(weights)
+    return board_features(boards, lines) @ weights
+
+
+def score_placements(game, weights):
+    """
+    Score every drop placement of a game's current piece.
+    
+    Args:
+        game: TetrisGame object
+        weights: Dictionary of feature weights, or a vector from weight_vector
+    
+    Returns:
+        Tuple of (position array from candidate_boards, float64 array of
+        their scores); placements that end the game score -inf
+    """
+    positions, boards, locked_out = candidate_boards(game.board, game.current_piece)
+    boards, lines = clear_rows(boards)
+    scores = score_boards(boards, weights, lines)
+    scores[locked_out] = -np.inf
+    return positions, scores
+
+
+DROP_GRIDS = {shape_type: build_drop_grid(shape_type) for shape_type in SHAPES}
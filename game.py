@@ -1,28 +1,38 @@
 # Tetris Game Logic
 
 import random
-from shapes import SHAPES
+from shapes import SHAPES, PIECE_TABLE
 from config import (
     BOARD_WIDTH, BOARD_HEIGHT,
     SCORE_1_LINE, SCORE_2_LINES, SCORE_3_LINES, SCORE_4_LINES,
-    INITIAL_DROP_SPEED, MIN_DROP_SPEED, SPEED_INCREASE_PER_LEVEL
+    INITIAL_DROP_SPEED, MIN_DROP_SPEED, SPEED_INCREASE_PER_LEVEL,
+    TICK_RATE, MAX_CATCH_UP_TICKS
 )
 from board import Board
+from randomizers import RANDOMIZERS
+
+# Player actions, named after the TetrisGame methods that perform them
+ACTIONS = ('move_left', 'move_right', 'rotate', 'soft_drop', 'hard_drop')
+
+# Simulated seconds per fixed logic tick
+TICK = 1.0 / TICK_RATE
 
 
 class Tetromino:
     """Represents a Tetris piece (Tetromino)."""
     
-    def __init__(self, shape_type):
+    def __init__(self, shape_type, board_width=BOARD_WIDTH):
         """
         Initialize a Tetromino piece.
         
         Args:
             shape_type: String representing the shape ('I', 'O', 'T', 'S', 'Z', 'J', 'L')
+            board_width: Width of the board the piece spawns on
         """
         self.shape_type = shape_type
+        self.spawn_x = board_width // 2 - 1
         self.rotation = 0
-        self.x = BOARD_WIDTH // 2 - 1
+        self.x = self.spawn_x
         self.y = 0
     
     def get_blocks(self):
@@ -56,26 +66,114 @@ class Tetromino:
     
     def reset_position(self):
         """Reset the piece to starting position."""
-        self.x = BOARD_WIDTH // 2 - 1
+        self.x = self.spawn_x
         self.y = 0
         self.rotation = 0
+    
+    def copy(self):
+        """
+        Copy the piece.
+        
+        Returns:
+            New Tetromino object with the same shape, rotation and position
+        """
+        piece = Tetromino.__new__(Tetromino)
+        piece.shape_type = self.shape_type
+        piece.spawn_x = self.spawn_x
+        piece.rotation = self.rotation
+        piece.x = self.x
+        piece.y = self.y
+        return piece
+
+
+class FixedTimestep:
+    """
+    Turns variable frame times into a whole number of fixed logic ticks.
+    
+    Time left over between ticks carries into the next frame. After a
+    hitch at most max_ticks ticks are run in one frame; the time beyond
+    that is dropped so the game slows down instead of freezing to catch up.
+    """
+    
+    def __init__(self, tick_rate=TICK_RATE, max_ticks=MAX_CATCH_UP_TICKS):
+        """
+        Initialize the timestep.
+        
+        Args:
+            tick_rate: Logic ticks per second
+            max_ticks: Most ticks returned by a single advance()
+        """
+        self.tick_rate = tick_rate
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0  # in ticks
+        self.dropped_ticks = 0
+    
+    def advance(self, delta_time):
+        """
+        Add elapsed real time and get the number of ticks now due.
+        
+        Args:
+            delta_time: Real time elapsed since the last call in seconds
+        
+        Returns:
+            Number of logic ticks to run this frame
+        """
+        self.accumulator += delta_time * self.tick_rate
+        ticks = int(self.accumulator)
+        self.accumulator -= ticks
+        
+        if ticks > self.max_ticks:
+            self.dropped_ticks += ticks - self.max_ticks
+            ticks = self.max_ticks
+        
+        return ticks
 
 
 class TetrisGame:
     """Main Tetris game logic."""
     
-    def __init__(self):
-        """Initialize the Tetris game."""
-        self.board = Board()
+    def __init__(self, board=None, seed=None, randomizer='uniform',
+                 width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        """
+        Initialize the Tetris game.
+        
+        Args:
+            board: Board object to play on (defaults to a new Board); any
+                   object with the Board API, such as a BitBoard, works
+            seed: Seed for the piece sequence (drawn at random if None)
+            randomizer: Key of the piece randomizer in RANDOMIZERS
+            width: Board width in columns, when no board is given
+            height: Board height in rows, when no board is given
+        """
+        self.board = board if board is not None else Board(width, height)
+        self.randomizer_name = randomizer
+        self.seed_pieces(seed)
+        self.recorder = None
+        self.elapsed = 0
         self.current_piece = self.create_new_piece()
         self.next_piece = self.create_new_piece()
         self.score = 0
         self.level = 1
         self.lines_cleared = 0
+        self.pieces_placed = 0
         self.drop_time = 0
+        self.ticks = 0
+        self.drop_ticks = 0
         self.game_over = False
         self.drop_speed = INITIAL_DROP_SPEED
     
+    def seed_pieces(self, seed=None):
+        """
+        Start a new seeded piece sequence.
+        
+        Args:
+            seed: Seed for the piece sequence (drawn at random if None)
+        """
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.randomizer = RANDOMIZERS[self.randomizer_name](seed)
+    
     def create_new_piece(self):
         """
         Create a new random Tetromino piece.
@@ -83,8 +181,7 @@ class TetrisGame:
         Returns:
             A new Tetromino object
         """
-        shape_types = list(SHAPES.keys())
-        return Tetromino(random.choice(shape_types))
+        return Tetromino(self.randomizer.next_shape(), self.board.width)
     
     def get_drop_speed(self):
         """
@@ -96,9 +193,39 @@ class TetrisGame:
         speed = INITIAL_DROP_SPEED - (self.level - 1) * SPEED_INCREASE_PER_LEVEL
         return max(speed, MIN_DROP_SPEED)
     
+    def get_drop_interval(self):
+        """
+        Get the current drop speed in whole logic ticks.
+        
+        Returns:
+            Number of ticks between gravity drops (at least 1)
+        """
+        return max(1, round(self.get_drop_speed() * TICK_RATE))
+    
+    def tick(self):
+        """
+        Advance the game by one fixed logic tick of TICK seconds.
+        
+        Gravity is counted in whole ticks, so a sequence of ticks and
+        actions always plays out identically.
+        """
+        if self.game_over:
+            return
+        
+        self.ticks += 1
+        self.elapsed += TICK
+        self.drop_ticks += 1
+        
+        if self.drop_ticks >= self.get_drop_interval():
+            self.drop_ticks = 0
+            self.apply('soft_drop')
+    
     def update(self, delta_time):
         """
-        Update game state.
+        Update game state by a variable time step.
+        
+        Drops at most one row per call; loops that can run behind should
+        drive tick() through a FixedTimestep instead.
         
         Args:
             delta_time: Time elapsed since last update in seconds
@@ -106,26 +233,37 @@ class TetrisGame:
         if self.game_over:
             return
         
+        self.elapsed += delta_time
         self.drop_time += delta_time
         drop_speed = self.get_drop_speed()
         
         if self.drop_time >= drop_speed:
             self.drop_time = 0
-            self.soft_drop()
+            self.apply('soft_drop')
+    
+    def apply(self, action):
+        """
+        Perform a player action, recording it if a recorder is attached.
+        
+        Args:
+            action: Action name from ACTIONS
+        """
+        if self.recorder is not None:
+            self.recorder.record(self, action)
+        
+        getattr(self, action)()
     
     def soft_drop(self):
         """Move the current piece down by one cell."""
         if self.game_over:
             return
         
-        self.current_piece.move_down()
+        piece = self.current_piece
         
-        if not self.board.is_valid_position(self.current_piece, 
-                                           self.current_piece.x, 
-                                           self.current_piece.y):
+        if self.board.fits(piece.shape_type, piece.rotation, piece.x, piece.y + 1):
+            piece.move_down()
+        else:
             # Piece can't move down, place it
-            self.current_piece.move_down()
-            self.current_piece.y -= 1
             self.place_current_piece()
     
     def hard_drop(self):
@@ -133,11 +271,8 @@ class TetrisGame:
         if self.game_over:
             return
         
-        while self.board.is_valid_position(self.current_piece, 
-                                          self.current_piece.x, 
-                                          self.current_piece.y + 1):
-            self.current_piece.move_down()
-        
+        piece = self.current_piece
+        piece.y += self.board.drop_distance(piece.shape_type, piece.rotation, piece.x, piece.y)
         self.place_current_piece()
     
     def move_left(self):
@@ -145,42 +280,38 @@ class TetrisGame:
         if self.game_over:
             return
         
-        self.current_piece.move_left()
+        piece = self.current_piece
         
-        if not self.board.is_valid_position(self.current_piece, 
-                                           self.current_piece.x, 
-                                           self.current_piece.y):
-            self.current_piece.move_right()
+        if self.board.fits(piece.shape_type, piece.rotation, piece.x - 1, piece.y):
+            piece.move_left()
     
     def move_right(self):
         """Move the current piece right."""
         if self.game_over:
             return
         
-        self.current_piece.move_right()
+        piece = self.current_piece
         
-        if not self.board.is_valid_position(self.current_piece, 
-                                           self.current_piece.x, 
-                                           self.current_piece.y):
-            self.current_piece.move_left()
+        if self.board.fits(piece.shape_type, piece.rotation, piece.x + 1, piece.y):
+            piece.move_right()
     
     def rotate(self):
         """Rotate the current piece."""
         if self.game_over:
             return
         
-        self.current_piece.rotate()
+        piece = self.current_piece
+        rotation = (piece.rotation + 1) % len(PIECE_TABLE[piece.shape_type])
         
-        if not self.board.is_valid_position(self.current_piece, 
-                                           self.current_piece.x, 
-                                           self.current_piece.y):
-            self.current_piece.rotate_back()
+        if self.board.fits(piece.shape_type, rotation, piece.x, piece.y):
+            piece.rotate()
     
     def place_current_piece(self):
         """Place the current piece on the board and spawn a new one."""
         self.board.place_piece(self.current_piece, 
                               self.current_piece.x, 
                               self.current_piece.y)
+        self.pieces_placed += 1
         
         # Check for game over
         if self.board.is_game_over():
@@ -225,13 +356,104 @@ class TetrisGame:
         # Increase level every 10 lines
         self.level = 1 + (self.lines_cleared // 10)
     
-    def reset(self):
-        """Reset the game to initial state."""
+    def state_hash(self, include_pieces=True):
+        """
+        Get the Zobrist hash of the game state.
+        
+        Args:
+            include_pieces: If True, the current and next piece types are
+                            part of the hash, not just the board
+        
+        Returns:
+            64-bit hash
+        """
+        if not include_pieces:
+            return self.board.zobrist
+        return self.board.state_hash(self.current_piece.shape_type, self.next_piece.shape_type)
+    
+    def snapshot(self):
+        """
+        Capture the full game state as an immutable value.
+        
+        Covers the board, both pieces, score, level, lines, timers and the
+        piece generator, so a restored game continues identically. The
+        replay recorder is not part of the state.
+        
+        Returns:
+            Tuple for restore()
+        """
+        piece = self.current_piece
+        return (
+            self.board.snapshot(),
+            (piece.shape_type, piece.rotation, piece.x, piece.y),
+            self.next_piece.shape_type,
+            self.score, self.level, self.lines_cleared, self.pieces_placed,
+            self.drop_time, self.ticks, self.drop_ticks, self.elapsed, self.game_over,
+            self.seed, self.randomizer_name, self.randomizer.get_state(),
+        )
+    
+    def restore(self, snapshot):
+        """
+        Return to a state captured by snapshot().
+        
+        Args:
+            snapshot: Value returned by snapshot() on a game with the same
+                      kind of board
+        """
+        (board, (shape_type, rotation, x, y), next_shape,
+         self.score, self.level, self.lines_cleared, self.pieces_placed,
+         self.drop_time, self.ticks, self.drop_ticks, self.elapsed, self.game_over,
+         seed, randomizer_name, randomizer_state) = snapshot
+        
+        self.board.restore(board)
+        self.current_piece = Tetromino(shape_type, self.board.width)
+        self.current_piece.rotation = rotation
+        self.current_piece.x = x
+        self.current_piece.y = y
+        self.next_piece = Tetromino(next_shape, self.board.width)
+        
+        if randomizer_name != self.randomizer_name:
+            self.randomizer_name = randomizer_name
+            self.randomizer = RANDOMIZERS[randomizer_name](seed)
+        self.seed = seed
+        self.randomizer.set_state(randomizer_state)
+    
+    def clone(self):
+        """
+        Copy the game for search; much cheaper than copy.deepcopy.
+        
+        The copy shares nothing mutable with this game and has no replay
+        recorder attached.
+        
+        Returns:
+            New TetrisGame object that plays on identically
+        """
+        game = TetrisGame.__new__(TetrisGame)
+        game.__dict__.update(self.__dict__)
+        game.board = self.board.clone()
+        game.current_piece = self.current_piece.copy()
+        game.next_piece = self.next_piece.copy()
+        game.randomizer = self.randomizer.clone()
+        game.recorder = None
+        return game
+    
+    def reset(self, seed=None):
+        """
+        Reset the game to initial state.
+        
+        Args:
+            seed: Seed for the new piece sequence (drawn at random if None)
+        """
         self.board.reset()
+        self.seed_pieces(seed)
+        self.elapsed = 0
         self.current_piece = self.create_new_piece()
         self.next_piece = self.create_new_piece()
         self.score = 0
         self.level = 1
         self.lines_cleared = 0
+        self.pieces_placed = 0
         self.drop_time = 0
+        self.ticks = 0
+        self.drop_ticks = 0
         self.game_over = False
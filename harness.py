@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# Tetris Evaluation Harness (multiprocess self-play)
+#
+# Shards seeded games across a process pool and streams results back as
+# they finish:
+#     python harness.py --games 10000 --agent drop --workers 64 --progress run.jsonl
+#
+# Every finished game is appended to the progress file with the run's
+# configuration, so rerunning the same command after an interruption only
+# plays the missing seeds. Results recorded with another agent, randomizer,
+# piece limit or timeout are ignored, and those seeds are played again.
+
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool, TimeoutError
+from game import TetrisGame
+from agents import AGENTS
+from randomizers import RANDOMIZERS
+from sim import run_game, game_result
+
+# Extra seconds a worker may take beyond its games' timeouts before the
+# pool is considered stalled
+STALL_GRACE = 30.0
+
+
+def play_task(task):
+    """
+    Play one seeded game in a worker process.
+    
+    Args:
+        task: Tuple of (agent_name, seed, randomizer, max_pieces, timeout)
+    
+    Returns:
+        Result dictionary from sim.game_result, plus the wall-clock time
+        taken and whether the game was cut short by the timeout
+    """
+    agent_name, seed, randomizer, max_pieces, timeout = task
+    start = time.perf_counter()
+    deadline = start + timeout if timeout is not None else None
+    
+    game = TetrisGame(seed=seed, randomizer=randomizer)
+    completed = run_game(game, AGENTS[agent_name](seed), max_pieces, deadline)
+    
+    result = game_result(game)
+    result['time'] = time.perf_counter() - start
+    result['timed_out'] = not completed
+    return result
+
+
+def play_tasks(tasks):
+    """
+    Play a chunk of seeded games in a worker process.
+    
+    Args:
+        tasks: List of task tuples for play_task
+    
+    Returns:
+        List of result dictionaries
+    """
+    return [play_task(task) for task in tasks]
+
+
+def run_config(agent_name, randomizer, max_pieces, timeout):
+    """
+    Describe the settings that decide a game's result, for progress files.
+    
+    Args:
+        agent_name: Key of the agent in AGENTS
+        randomizer: Key of the piece randomizer in RANDOMIZERS
+        max_pieces: Optional per-game limit on pieces placed
+        timeout: Optional per-game wall-clock limit in seconds
+    
+    Returns:
+        JSON-serializable dictionary
+    """
+    return {'agent': agent_name, 'randomizer': randomizer,
+            'max_pieces': max_pieces, 'timeout': timeout}
+
+
+def load_progress(path, config=None):
+    """
+    Read the results already recorded in a progress file.
+    
+    Args:
+        path: Progress file path (JSON lines), may not exist yet
+        config: Optional dictionary from run_config; results recorded
+                under any other configuration are skipped
+    
+    Returns:
+        Dictionary mapping seed to result dictionary
+    """
+    results = {}
+    if path is None or not os.path.exists(path):
+        return results
+    
+    with open(path) as progress_file:
+        for line in progress_file:
+            # A run killed mid-write can leave a partial last line
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if config is not None and result.get('config') != config:
+                continue
+            results[result['seed']] = result
+    
+    return results
+
+
+def evaluate(agent_name, seeds, workers=None, randomizer='uniform', max_pieces=None,
+             timeout=None, progress_path=None):
+    """
+    Play seeded games across a process pool, yielding results as they finish.
+    
+    Seeds already present in the progress file under the same agent,
+    randomizer, max_pieces and timeout are yielded first without being
+    replayed; new results are appended to it, tagged with that
+    configuration, as they arrive.
+    
+    Args:
+        agent_name: Key of the agent in AGENTS
+        seeds: Iterable of game seeds
+        workers: Number of worker processes (default: all cores)
+        randomizer: Key of the piece randomizer in RANDOMIZERS
+        max_pieces: Optional per-game limit on pieces placed
+        timeout: Optional per-game wall-clock limit in seconds
+        progress_path: Optional JSON lines file for resumable progress
+    
+    Yields:
+        Result dictionaries from play_task, in completion order; results
+        read back from the progress file have 'resumed' set
+    
+    Raises:
+        RuntimeError: If no game finishes within timeout + STALL_GRACE seconds
+    """
+    config = run_config(agent_name, randomizer, max_pieces, timeout)
+    done = load_progress(progress_path, config)
+    seeds = list(seeds)
+    for seed in seeds:
+        if seed in done:
+            done[seed]['resumed'] = True
+            yield done[seed]
+    
+    tasks = [(agent_name, seed, randomizer, max_pieces, timeout)
+             for seed in seeds if seed not in done]
+    if not tasks:
+        return
+    
+    workers = workers or os.cpu_count()
+    # Several chunks per worker keep every core busy until the end
+    chunksize = max(1, len(tasks) // (workers * 8))
+    # Results of a chunk arrive together once the whole chunk is played
+    stall_timeout = timeout * chunksize + STALL_GRACE if timeout is not None else None
+    progress_file = open(progress_path, 'a') if progress_path is not None else None
+    
+    chunks = [tasks[i:i + chunksize] for i in range(0, len(tasks), chunksize)]
+    
+    pool = Pool(workers)
+    try:
+        finished = pool.imap_unordered(play_tasks, chunks)
+        for _ in chunks:
+            try:
+                results = finished.next(stall_timeout)
+            except TimeoutError:
+                raise RuntimeError("no game finished in %.0fs, workers stalled"
+                                   % stall_timeout)
+            
+            for result in results:
+                result['config'] = config
+                if progress_file is not None:
+                    progress_file.write(json.dumps(result) + '\n')
+                    progress_file.flush()
+                yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        if progress_file is not None:
+            progress_file.close()
+
+
+def percentile(values, fraction):
+    """
+    Get a percentile of a list of numbers (nearest rank).
+    
+    Args:
+        values: Sorted list of numbers
+        fraction: Percentile as a fraction between 0 and 1
+    
+    Returns:
+        The value at that percentile
+    """
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+def summarize(results, elapsed):
+    """
+    Aggregate per-game results.
+    
+    Args:
+        results: List of result dictionaries
+        elapsed: Wall-clock seconds the evaluation took
+    
+    Returns:
+        Dictionary of statistics for score, lines, pieces and level, plus
+        game and piece throughput of the games played (not resumed)
+    """
+    played = [result for result in results if not result.get('resumed')]
+    summary = {'games': len(results),
+               'timed_out': sum(1 for result in results if result.get('timed_out'))}
+    
+    for key in ('score', 'lines', 'pieces', 'level'):
+        values = sorted(result[key] for result in results)
+        summary[key] = {
+            'mean': sum(values) / len(values),
+            'p50': percentile(values, 0.50),
+            'p90': percentile(values, 0.90),
+            'p99': percentile(values, 0.99),
+            'max': values[-1],
+        }
+    
+    summary['games_per_second'] = len(played) / elapsed
+    summary['pieces_per_second'] = sum(result['pieces'] for result in played) / elapsed
+    return summary
+
+
+def main(argv=None):
+    """Entry point for the evaluation harness."""
+    parser = argparse.ArgumentParser(description="Evaluate an agent over many seeded games.")
+    parser.add_argument('--games', type=int, default=1000, help="number of games to play")
+    parser.add_argument('--seed', type=int, default=0, help="first seed; games use seed + i")
+    parser.add_argument('--agent', choices=sorted(AGENTS), default='drop',
+                        help="computer player to evaluate")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument('--randomizer', choices=sorted(RANDOMIZERS), default='uniform',
+                        help="piece randomizer to use")
+    parser.add_argument('--max-pieces', type=int, default=None,
+                        help="stop each game after this many pieces")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="per-game wall-clock limit in seconds")
+    parser.add_argument('--progress', metavar='FILE', default=None,
+                        help="JSON lines file to resume from and append results to")
+    parser.add_argument('--quiet', action='store_true', help="don't print every game")
+    args = parser.parse_args(argv)
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+    
+    seeds = range(args.seed, args.seed + args.games)
+    results = []
+    start = time.perf_counter()
+    
+    for result in evaluate(args.agent, seeds, args.workers, args.randomizer,
+                           args.max_pieces, args.timeout, args.progress):
+        results.append(result)
+        if not args.quiet:
+            print(f"[{len(results)}/{args.games}] seed {result['seed']}: "
+                  f"score {result['score']}, lines {result['lines']}, "
+                  f"pieces {result['pieces']}, level {result['level']}"
+                  + (" (timed out)" if result.get('timed_out') else ""))
+    
+    summary = summarize(results, time.perf_counter() - start)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# Tetris Game Server - Load Tester
+#
+# Opens many client connections to server.py and plays random inputs on
+# all of them from one event loop:
+#     python loadtest.py --clients 2000 --duration 30 --spawn
+# A share of the clients can be made slow (--slow) to exercise the
+# server's backpressure handling.
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from config import SERVER_HOST, SERVER_PORT
+from game import ACTIONS
+from server import RESTART, FRAME_LENGTH, STATE_HEADER
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Connections opened at once while ramping up
+CONNECT_BATCH = 100
+
+# Seconds a slow client reads for, then sleeps for, in turn
+SLOW_READ_PERIOD = 0.5
+SLOW_PAUSE_PERIOD = 2.0
+
+
+class LoadClient(asyncio.Protocol):
+    """One simulated player: counts the frames it receives."""
+    
+    def __init__(self):
+        """Initialize the client."""
+        self.transport = None
+        self.buffer = bytearray()
+        self.frames = 0
+        self.bytes = 0
+        self.game_over = False
+        self.closed = False
+    
+    def connection_made(self, transport):
+        """Keep the transport for sending inputs."""
+        self.transport = transport
+    
+    def connection_lost(self, exc):
+        """Note that the server closed the connection."""
+        self.closed = True
+    
+    def data_received(self, data):
+        """Split the stream into frames and check each one's game over flag."""
+        self.bytes += len(data)
+        buffer = self.buffer
+        buffer += data
+        offset = 0
+        while len(buffer) - offset >= FRAME_LENGTH.size:
+            (length,) = FRAME_LENGTH.unpack_from(buffer, offset)
+            end = offset + FRAME_LENGTH.size + length
+            if end > len(buffer):
+                break
+            # game_over is the fifth header field, after tick, score, lines, level
+            self.game_over = bool(STATE_HEADER.unpack_from(buffer, offset + FRAME_LENGTH.size)[4])
+            self.frames += 1
+            offset = end
+        del buffer[:offset]
+    
+    def send_input(self, rng):
+        """Send a random action, or a restart once the game is over."""
+        if self.game_over:
+            self.transport.write(bytes((RESTART,)))
+            self.game_over = False
+        else:
+            self.transport.write(bytes((rng.randrange(len(ACTIONS)),)))
+
+
+def raise_file_limit(count):
+    """Raise the open file limit so count connections fit, where allowed."""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = count + 64
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        if hard != resource.RLIM_INFINITY:
+            wanted = min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+
+async def connect(host, port, count):
+    """
+    Open client connections in batches.
+    
+    Returns:
+        List of connected LoadClient objects (failed connections are left out)
+    """
+    loop = asyncio.get_running_loop()
+    clients = []
+    for start in range(0, count, CONNECT_BATCH):
+        batch = min(CONNECT_BATCH, count - start)
+        results = await asyncio.gather(
+            *(loop.create_connection(LoadClient, host, port) for _ in range(batch)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if not isinstance(result, Exception):
+                transport, protocol = result
+                clients.append(protocol)
+    return clients
+
+
+async def run_load(host, port, clients, duration, input_rate, slow, seed):
+    """
+    Drive clients against a running server.
+    
+    Args:
+        host: Server address
+        port: Server port
+        clients: Number of connections to open
+        duration: Seconds to send inputs for
+        input_rate: Inputs per second sent by each client
+        slow: Fraction of clients that only read now and then
+        seed: Seed for the random inputs
+    
+    Returns:
+        Dictionary with connected, disconnected, frames, bytes, inputs and seconds
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    players = await connect(host, port, clients)
+    connect_time = time.perf_counter() - start
+    print(f"{len(players)}/{clients} clients connected in {connect_time:.1f}s", flush=True)
+    
+    slow_players = players[:int(len(players) * slow)]
+    inputs = 0
+    interval = 1.0 / input_rate
+    start = time.perf_counter()
+    next_toggle = start + SLOW_READ_PERIOD
+    reading = True
+    
+    # One driver loop sends every client's inputs, as the server steps
+    # every game from one loop
+    while time.perf_counter() - start < duration:
+        await asyncio.sleep(interval)
+        for player in players:
+            if not player.closed:
+                player.send_input(rng)
+                inputs += 1
+        
+        now = time.perf_counter()
+        if slow_players and now >= next_toggle:
+            reading = not reading
+            for player in slow_players:
+                if not player.closed:
+                    if reading:
+                        player.transport.resume_reading()
+                    else:
+                        player.transport.pause_reading()
+            next_toggle = now + (SLOW_READ_PERIOD if reading else SLOW_PAUSE_PERIOD)
+    
+    elapsed = time.perf_counter() - start
+    result = {
+        'connected': len(players),
+        'disconnected': sum(player.closed for player in players),
+        'frames': sum(player.frames for player in players),
+        'bytes': sum(player.bytes for player in players),
+        'inputs': inputs,
+        'seconds': elapsed,
+    }
+    for player in players:
+        player.transport.abort()
+    return result
+
+
+def main(argv=None):
+    """Entry point for the load tester."""
+    parser = argparse.ArgumentParser(description="Load test the Tetris game server.")
+    parser.add_argument('--host', default=SERVER_HOST, help="server address")
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help="server port")
+    parser.add_argument('--clients', type=int, default=1000, help="connections to open")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds to play")
+    parser.add_argument('--input-rate', type=float, default=10.0,
+                        help="inputs per second from each client")
+    parser.add_argument('--slow', type=float, default=0.0,
+                        help="fraction of clients that read only now and then")
+    parser.add_argument('--seed', type=int, default=None, help="seed for the inputs")
+    parser.add_argument('--spawn', action='store_true',
+                        help="start server.py as a subprocess for the test")
+    args = parser.parse_args(argv)
+    if args.spawn and args.port == 0:
+        # The clients need to know the port before the server has bound it
+        parser.error("--spawn needs a fixed --port, not 0")
+    
+    raise_file_limit(args.clients)
+    
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([
+            sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py'),
+            '--host', args.host, '--port', str(args.port),
+            '--duration', str(args.duration + 30),
+        ])
+        time.sleep(1.0)
+    
+    try:
+        result = asyncio.run(run_load(args.host, args.port, args.clients, args.duration,
+                                      args.input_rate, args.slow, args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    
+    seconds = result['seconds']
+    print(f"{result['connected']} clients, {result['disconnected']} disconnected by the server")
+    print(f"{result['frames'] / seconds:.0f} frames/s, "
+          f"{result['bytes'] / seconds / 1e6:.2f} MB/s in, "
+          f"{result['inputs'] / seconds:.0f} inputs/s out")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
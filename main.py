@@ -1,76 +1,335 @@
 #!/usr/bin/env python3
 # Tetris Game - Main Entry Point
 
+import argparse
+import os
 import pygame
 import sys
-from config import WINDOW_WIDTH, WINDOW_HEIGHT, FPS
-from game import TetrisGame
+from config import (
+    WINDOW_WIDTH, WINDOW_HEIGHT, FPS, DIRTY_RECT_RENDERING,
+    BOARD_WIDTH, BOARD_HEIGHT, CELL_SIZE,
+    PROFILE_HUD_INTERVAL, PROFILE_HUD_X, PROFILE_HUD_Y, IDLE_TIMEOUT_MS,
+)
+from game import TetrisGame, FixedTimestep
 from utils import Renderer
 
 
 class TetrisApp:
     """Main application class for Tetris game."""
     
-    def __init__(self):
-        """Initialize the Tetris application."""
-        pygame.init()
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    def __init__(self, record_dir=None, profile_path=None, fps=FPS, autoplay=False,
+                 board_width=BOARD_WIDTH, board_height=BOARD_HEIGHT, cell_size=CELL_SIZE):
+        """
+        Initialize the Tetris application.
+        
+        Args:
+            record_dir: Optional directory to save a replay of every game to
+            profile_path: Optional file to write a per-frame timing trace to
+                          (.json or .csv); enables the profiler and F3 HUD
+            fps: Frames drawn per second; the game logic always runs at
+                 TICK_RATE ticks per second regardless
+            autoplay: Start with the beam search agent playing (toggled
+                      with A)
+            board_width: Board width in columns
+            board_height: Board height in rows
+            cell_size: Size of a board cell in pixels
+        """
+        # Only the subsystems the game uses; pygame.init() would also start
+        # audio and joysticks, which can take a while to probe
+        pygame.display.init()
+        pygame.font.init()
+        # The window grows or shrinks with the board around the default layout
+        self.screen = pygame.display.set_mode((
+            WINDOW_WIDTH + board_width * cell_size - BOARD_WIDTH * CELL_SIZE,
+            WINDOW_HEIGHT + max(board_height * cell_size - BOARD_HEIGHT * CELL_SIZE, 0),
+        ))
         pygame.display.set_caption("TETRIS")
         self.clock = pygame.time.Clock()
+        self.fps = fps
         self.running = True
         
-        self.game = TetrisGame()
-        self.renderer = Renderer(self.screen)
+        # Idle states, in which the loop sleeps instead of ticking and drawing
+        self.paused = False
+        self.focused = True
+        self.minimized = False
+        self.needs_redraw = True
+        
+        self.game = TetrisGame(width=board_width, height=board_height)
+        self.timestep = FixedTimestep()
+        self.renderer = Renderer(self.screen, incremental=DIRTY_RECT_RENDERING,
+                                 board_width=board_width, board_height=board_height,
+                                 cell_size=cell_size)
+        
+        self.record_dir = record_dir
+        self.recorder = None
+        self.start_recording()
+        
+        # The profiler is off unless asked for, so the loop only pays for
+        # a None check per phase
+        self.profile_path = profile_path
+        self.profiler = None
+        if profile_path is not None:
+            from profiler import FrameProfiler
+            self.profiler = FrameProfiler(fps)
+        self.show_profile = False
+        self.profile_panel = None
+        self.profile_rect = None
+        
+        # The agent searches within its time budget once per piece, well
+        # inside a frame, so autoplay runs at the normal tick rate
+        self.agent = self.create_agent() if autoplay else None
+    
+    def create_agent(self):
+        """
+        Create the autoplay agent.
+        
+        The agents module (with its search tables) is only imported once
+        autoplay is turned on, to keep it off the startup path.
+        
+        Returns:
+            BeamAgent object
+        """
+        from agents import BeamAgent
+        return BeamAgent()
+    
+    def start_recording(self):
+        """Start recording the current game, if recording is enabled."""
+        if self.record_dir is not None:
+            from replay import ReplayRecorder
+            self.recorder = ReplayRecorder(self.game)
+    
+    def save_recording(self):
+        """Write the current game's replay to the record directory."""
+        if self.recorder is None:
+            return
+        
+        path = os.path.join(self.record_dir, f"{self.game.seed}.replay")
+        with open(path, 'wb') as replay_file:
+            replay_file.write(self.recorder.finish(self.game))
+        self.recorder = None
+    
+    def is_idle(self):
+        """
+        Check whether the game is waiting on the player or the window.
+        
+        Returns:
+            True if paused, game over, unfocused or minimized
+        """
+        return self.paused or self.game.game_over or not self.focused or self.minimized
+    
+    def set_paused(self, paused):
+        """
+        Pause or resume the game.
+        
+        Args:
+            paused: True to show the pause screen and stop the game
+        """
+        self.paused = paused
+        self.needs_redraw = True
+        if not paused:
+            self.renderer.invalidate()
     
     def handle_events(self):
-        """Handle user input and window events."""
+        """Handle all pending user input and window events."""
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.running = False
+            self.handle_event(event)
+    
+    def handle_event(self, event):
+        """
+        Handle one user input or window event.
+        
+        Args:
+            event: Pygame event
+        """
+        if event.type == pygame.QUIT:
+            self.running = False
+        
+        elif event.type in (pygame.WINDOWFOCUSLOST, pygame.WINDOWFOCUSGAINED):
+            self.focused = event.type == pygame.WINDOWFOCUSGAINED
+        
+        elif event.type in (pygame.WINDOWMINIMIZED, pygame.WINDOWRESTORED):
+            self.minimized = event.type == pygame.WINDOWMINIMIZED
+            self.renderer.invalidate()
+            self.needs_redraw = True
+        
+        elif event.type == pygame.WINDOWEXPOSED:
+            self.renderer.invalidate()
+            self.needs_redraw = True
+        
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_F3 and self.profiler is not None:
+                self.show_profile = not self.show_profile
+                self.needs_redraw = True
+            
+            elif event.key == pygame.K_p and not self.game.game_over:
+                self.set_paused(not self.paused)
+            
+            elif self.paused:
+                return
+            
+            elif event.key == pygame.K_a:
+                self.agent = None if self.agent is not None else self.create_agent()
+            
+            elif event.key == pygame.K_LEFT:
+                self.game.apply('move_left')
             
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT:
-                    self.game.move_left()
-                
-                elif event.key == pygame.K_RIGHT:
-                    self.game.move_right()
-                
-                elif event.key == pygame.K_DOWN:
-                    self.game.soft_drop()
-                
-                elif event.key == pygame.K_SPACE:
-                    if self.game.game_over:
-                        self.game.reset()
-                    else:
-                        self.game.hard_drop()
-                
-                elif event.key == pygame.K_UP:
-                    self.game.rotate()
+            elif event.key == pygame.K_RIGHT:
+                self.game.apply('move_right')
+            
+            elif event.key == pygame.K_DOWN:
+                self.game.apply('soft_drop')
+            
+            elif event.key == pygame.K_SPACE:
+                if self.game.game_over:
+                    self.save_recording()
+                    self.game.reset()
+                    self.start_recording()
+                else:
+                    self.game.apply('hard_drop')
+            
+            elif event.key == pygame.K_UP:
+                self.game.apply('rotate')
     
     def update(self):
-        """Update game state."""
-        delta_time = self.clock.tick(FPS) / 1000.0
-        self.game.update(delta_time)
+        """Run the logic ticks that came due since the last frame."""
+        delta_time = self.clock.tick(self.fps) / 1000.0
+        if self.profiler is not None:
+            self.profiler.mark('wait')
+        
+        if self.is_idle():
+            return
+        for _ in range(self.timestep.advance(delta_time)):
+            if self.agent is not None:
+                action = self.agent.act(self.game)
+                if action is not None:
+                    self.game.apply(action)
+            self.game.tick()
+    
+    def wait_for_events(self):
+        """Sleep until an event arrives (or IDLE_TIMEOUT_MS passes), then handle it."""
+        event = pygame.event.wait(IDLE_TIMEOUT_MS)
+        if event.type != pygame.NOEVENT:
+            self.handle_event(event)
+        self.handle_events()
+        
+        if not self.is_idle():
+            # Time spent idle must not reach the game as elapsed time
+            self.clock.tick()
+    
+    def draw_profile(self):
+        """
+        Draw or remove the profiler HUD over the game.
+        
+        Returns:
+            List of screen rectangles that changed
+        """
+        if not self.show_profile:
+            if self.profile_rect is None:
+                return []
+            rect, self.profile_rect, self.profile_panel = self.profile_rect, None, None
+            return [self.renderer.restore(rect)]
+        
+        if self.profile_panel is None or self.profiler.frames % PROFILE_HUD_INTERVAL == 0:
+            self.profile_panel = self.renderer.create_text_panel(self.profiler.summary_lines())
+            if self.profile_rect is not None:
+                self.renderer.restore(self.profile_rect)
+        
+        # Incremental frames may have repainted part of the panel's area
+        rect = self.renderer.draw_overlay(self.profile_panel,
+                                           PROFILE_HUD_X + self.renderer.hud_offset,
+                                           PROFILE_HUD_Y)
+        rects = [rect] if self.profile_rect is None else [rect.union(self.profile_rect)]
+        self.profile_rect = rect
+        return rects
     
     def render(self):
         """Render the game."""
-        self.renderer.draw_game(self.game)
-        pygame.display.flip()
+        rects = self.renderer.draw_game(self.game)
+        if self.paused:
+            # The pause screen covers the whole window, profiler HUD included
+            rects = [self.renderer.draw_paused()]
+            self.profile_rect = None
+        self.needs_redraw = False
+        
+        if self.profiler is not None:
+            rects = rects + self.draw_profile()
+            self.profiler.mark('render')
+        
+        if self.renderer.incremental:
+            pygame.display.update(rects)
+        else:
+            pygame.display.flip()
+    
+    def frame(self):
+        """Handle input, run the due logic ticks and draw one frame."""
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.begin_frame()
+        self.handle_events()
+        if profiler is not None:
+            profiler.mark('events')
+        self.update()
+        if profiler is not None:
+            profiler.mark('update')
+        self.render()
+        if profiler is not None:
+            profiler.mark('flip')
+            profiler.end_frame()
     
     def run(self):
         """Main game loop."""
+        profiler = self.profiler
+        
         while self.running:
-            self.handle_events()
-            self.update()
-            self.render()
+            # Idle frames would redraw the same picture, so block on events
+            if self.is_idle() and not self.needs_redraw:
+                self.wait_for_events()
+                continue
+            self.frame()
         
+        self.save_recording()
+        if profiler is not None:
+            profiler.dump(self.profile_path)
         pygame.quit()
         sys.exit()
 
 
 def main():
     """Entry point for the Tetris game."""
-    app = TetrisApp()
+    parser = argparse.ArgumentParser(description="Play Tetris.")
+    parser.add_argument('--record', metavar='DIR', default=None,
+                        help="save a replay of every game to this directory")
+    parser.add_argument('--profile', metavar='FILE', default=None,
+                        help="time every frame, show the HUD with F3 and write the "
+                             "trace to FILE (.json or .csv) on exit")
+    parser.add_argument('--fps', type=int, default=FPS,
+                        help="frames drawn per second (the game logic rate is fixed)")
+    parser.add_argument('--autoplay', action='store_true',
+                        help="let the beam search agent play (toggle with A)")
+    parser.add_argument('--board', metavar='WxH', default=f"{BOARD_WIDTH}x{BOARD_HEIGHT}",
+                        help="board size in columns and rows (default: %(default)s)")
+    parser.add_argument('--cell-size', type=int, default=CELL_SIZE,
+                        help="size of a board cell in pixels (default: %(default)s)")
+    args = parser.parse_args()
+    if args.fps < 1:
+        parser.error("--fps must be at least 1")
+    try:
+        board_width, board_height = (int(size) for size in args.board.lower().split('x'))
+    except ValueError:
+        parser.error(f"--board must look like {BOARD_WIDTH}x{BOARD_HEIGHT}")
+    if board_width < 4 or board_height < 4:
+        parser.error("--board must be at least 4x4")
+    if args.cell_size < 1:
+        parser.error("--cell-size must be at least 1")
+    if args.record is not None:
+        # Replays don't store the board size; they play back on the default board
+        if (board_width, board_height) != (BOARD_WIDTH, BOARD_HEIGHT):
+            parser.error("--record needs the default board size")
+        os.makedirs(args.record, exist_ok=True)
+    
+    app = TetrisApp(record_dir=args.record, profile_path=args.profile, fps=args.fps,
+                    autoplay=args.autoplay, board_width=board_width,
+                    board_height=board_height, cell_size=args.cell_size)
     app.run()
 
 
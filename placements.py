@@ -0,0 +1,173 @@
+# Tetris Placement Search (reachable lock positions)
+
+from collections import deque, namedtuple
+from functools import lru_cache
+from shapes import piece_table
+from config import BOARD_WIDTH, PLACEMENT_CACHE_SIZE
+
+# A lock position together with a shortest input sequence reaching it;
+# moves are action names from game.ACTIONS, ending with 'hard_drop'
+Placement = namedtuple('Placement', ['rotation', 'x', 'y', 'moves'])
+
+
+def find_placements(board, piece):
+    """
+    Find every distinct position where a piece can lock.
+    
+    Searches over (rotation, x, y) from the piece's current state with the
+    game's movement and rotation rules. Results are memoized by board
+    occupancy and piece state in a bounded cache.
+    
+    Args:
+        board: Board object (any backend with occupancy())
+        piece: Tetromino object to place
+    
+    Returns:
+        Tuple of Placement objects, ordered by the length of their moves
+    """
+    return search_placements(board.occupancy(), piece.shape_type,
+                             piece.rotation, piece.x, piece.y, board.width)
+
+
+@lru_cache(maxsize=PLACEMENT_CACHE_SIZE)
+def search_placements(rows, shape_type, rotation, x, y, width=BOARD_WIDTH):
+    """
+    Breadth-first search of the reachable piece states.
+    
+    Args:
+        rows: Tuple of row occupancy bitmasks, top row first
+        shape_type: Shape type of the piece
+        rotation: Starting rotation state
+        x: Starting x coordinate
+        y: Starting y coordinate
+        width: Board width in columns (the height is len(rows))
+    
+    Returns:
+        Tuple of Placement objects, ordered by the length of their moves
+    """
+    table = piece_table(width)[shape_type]
+    height = len(rows)
+    
+    def fits(state):
+        rotation, x, y = state
+        masks = table[rotation]
+        if x < masks.min_x or x > masks.max_x or y + masks.bottom >= height:
+            return False
+        for dy, mask in masks.rows[x]:
+            if y + dy >= 0 and rows[y + dy] & mask:
+                return False
+        return True
+    
+    start = (rotation, x, y)
+    if not fits(start):
+        return ()
+    
+    # Shortest input sequences to every reachable state
+    parents = {start: None}
+    order = []
+    queue = deque([start])
+    while queue:
+        state = queue.popleft()
+        order.append(state)
+        rotation, x, y = state
+        for move, target in (('move_left', (rotation, x - 1, y)),
+                             ('move_right', (rotation, x + 1, y)),
+                             ('rotate', ((rotation + 1) % len(table), x, y)),
+                             ('soft_drop', (rotation, x, y + 1))):
+            if target not in parents and fits(target):
+                parents[target] = (state, move)
+                queue.append(target)
+    
+    # Where a hard drop from each state locks; states lower down go first
+    landing = {}
+    for state in sorted(order, key=lambda state: -state[2]):
+        rotation, x, y = state
+        landing[state] = landing.get((rotation, x, y + 1), state)
+    
+    # Visiting states in search order gives the shortest path to each lock;
+    # rotations that cover the same cells count as the same position
+    placements = []
+    seen = set()
+    for state in order:
+        lock = landing[state]
+        rotation, x, y = lock
+        cells = tuple((y + dy, mask) for dy, mask in table[rotation].rows[x])
+        if cells in seen:
+            continue
+        seen.add(cells)
+        
+        moves = ['hard_drop']
+        while parents[state] is not None:
+            state, move = parents[state]
+            moves.append(move)
+        placements.append(Placement(rotation, x, y, tuple(reversed(moves))))
+    
+    return tuple(placements)
+
+
+def drop_positions(board, shape_type, rotation, x, y):
+    """
+    Find the positions a piece can lock in by rotating in place, then
+    shifting, then hard dropping.
+    
+    Cheaper than find_placements, at the cost of tucks and spins, and not
+    memoized, for searches that visit many different boards. Inputs aren't
+    built; the turn and shift counts give them.
+    
+    Args:
+        board: Board object (any backend with fits() and drop_distance())
+        shape_type: Shape type of the piece
+        rotation: Current rotation state of the piece
+        x: Current x coordinate of the piece
+        y: Current y coordinate of the piece
+    
+    Returns:
+        List of (rotation, x, y, rotations pressed, signed columns shifted)
+        tuples, one per distinct set of cells covered
+    """
+    table = board.table[shape_type]
+    fits = board.fits
+    drop_distance = board.drop_distance
+    positions = []
+    seen = set()
+    
+    for turns in range(len(table)):
+        if turns:
+            rotation = (rotation + 1) % len(table)
+            if not fits(shape_type, rotation, x, y):
+                break
+        rows = table[rotation].rows
+        
+        # Columns reachable by shifting, nearest first on each side
+        targets = [x]
+        for step in (-1, 1):
+            target = x + step
+            while fits(shape_type, rotation, target, y):
+                targets.append(target)
+                target += step
+        
+        for target in targets:
+            lock = y + drop_distance(shape_type, rotation, target, y)
+            cells = tuple((lock + dy, mask) for dy, mask in rows[target])
+            if cells in seen:
+                continue
+            seen.add(cells)
+            positions.append((rotation, target, lock, turns, target - x))
+    
+    return positions
+
+
+def position_moves(position):
+    """
+    Get the inputs that play a position from drop_positions.
+    
+    Args:
+        position: Position tuple from drop_positions
+    
+    Returns:
+        List of action names ending with 'hard_drop'
+    """
+    shift = position[4]
+    return (['rotate'] * position[3]
+            + ['move_right' if shift > 0 else 'move_left'] * abs(shift)
+            + ['hard_drop'])
@@ -0,0 +1,141 @@
+# Tetris Frame Profiler (per-phase frame timing)
+
+import csv
+import json
+from collections import deque
+from time import perf_counter_ns
+from config import FPS, PROFILE_WINDOW, PROFILE_TRACE_FRAMES
+
+# Frame phases in the order TetrisApp runs them
+PHASES = ('events', 'wait', 'update', 'render', 'flip')
+
+
+def percentiles(samples):
+    """
+    Summarize timing samples.
+    
+    Args:
+        samples: Iterable of durations in nanoseconds
+    
+    Returns:
+        Dictionary with p50, p95, p99 and max in nanoseconds (0 if empty)
+    """
+    values = sorted(samples)
+    if not values:
+        return {'p50': 0, 'p95': 0, 'p99': 0, 'max': 0}
+    
+    last = len(values) - 1
+    return {
+        'p50': values[last * 50 // 100],
+        'p95': values[last * 95 // 100],
+        'p99': values[last * 99 // 100],
+        'max': values[last],
+    }
+
+
+class FrameProfiler:
+    """
+    Times each phase of every frame with perf_counter_ns.
+    
+    Keeps a rolling window of samples per phase for percentiles, counts
+    frames whose work (everything but waiting for the frame clock) went
+    over the FPS budget, and keeps a bounded per-frame trace for dumping.
+    """
+    
+    def __init__(self, fps=FPS):
+        """
+        Initialize the profiler.
+        
+        Args:
+            fps: Target frame rate the budget is derived from
+        """
+        self.budget_ns = 1_000_000_000 // fps
+        self.samples = {phase: deque(maxlen=PROFILE_WINDOW) for phase in PHASES}
+        self.frame_samples = deque(maxlen=PROFILE_WINDOW)
+        self.trace = deque(maxlen=PROFILE_TRACE_FRAMES)
+        self.frames = 0
+        self.dropped = 0
+        self.current = {}
+        self.frame_start = 0
+        self.last = 0
+    
+    def begin_frame(self):
+        """Start timing a new frame."""
+        self.frame_start = self.last = perf_counter_ns()
+        self.current = {}
+    
+    def mark(self, phase):
+        """
+        End the current phase; its time runs from the previous mark.
+        
+        Args:
+            phase: Name of the phase that just finished, from PHASES
+        """
+        now = perf_counter_ns()
+        self.current[phase] = now - self.last
+        self.last = now
+    
+    def end_frame(self):
+        """Finish the frame and record its phase timings."""
+        total = self.last - self.frame_start
+        work = total - self.current.get('wait', 0)
+        dropped = work > self.budget_ns
+        
+        self.frames += 1
+        self.dropped += dropped
+        self.frame_samples.append(work)
+        for phase, duration in self.current.items():
+            self.samples[phase].append(duration)
+        self.trace.append(tuple(self.current.get(phase, 0) for phase in PHASES)
+                          + (total, int(dropped)))
+    
+    def stats(self):
+        """
+        Get rolling percentiles for every phase and the frame's work time.
+        
+        Returns:
+            Dictionary mapping phase name (and 'frame') to percentiles
+        """
+        stats = {phase: percentiles(samples) for phase, samples in self.samples.items()}
+        stats['frame'] = percentiles(self.frame_samples)
+        return stats
+    
+    def summary_lines(self):
+        """
+        Format the rolling statistics for the on-screen HUD.
+        
+        Returns:
+            List of short text lines, times in milliseconds
+        """
+        lines = [f"dropped {self.dropped}/{self.frames}", "ms      p50   p99"]
+        for name, values in self.stats().items():
+            lines.append(f"{name:6s} {values['p50'] / 1e6:5.2f} {values['p99'] / 1e6:5.2f}")
+        return lines
+    
+    def dump(self, path):
+        """
+        Write the per-frame trace to a file.
+        
+        A .json path gets the summary statistics plus the trace; any other
+        path gets the trace as CSV.
+        
+        Args:
+            path: Output file path
+        """
+        columns = [f"{phase}_ns" for phase in PHASES] + ['total_ns', 'dropped']
+        
+        if path.endswith('.json'):
+            with open(path, 'w') as trace_file:
+                json.dump({
+                    'budget_ns': self.budget_ns,
+                    'frames': self.frames,
+                    'dropped': self.dropped,
+                    'stats': self.stats(),
+                    'columns': columns,
+                    'trace': list(self.trace),
+                }, trace_file)
+        else:
+            with open(path, 'w', newline='') as trace_file:
+                writer = csv.writer(trace_file)
+                writer.writerow(columns)
+                writer.writerows(self.trace)
@@ -0,0 +1,136 @@
+# Tetris Piece Randomizers (seeded piece generators)
+
+import random
+from shapes import SHAPE_TYPES
+
+
+def copy_rng(rng):
+    """
+    Copy a random.Random generator with its exact state.
+    
+    Skips seeding the new generator, since its state is overwritten anyway.
+    
+    Args:
+        rng: random.Random object
+    
+    Returns:
+        New random.Random object that produces the same stream
+    """
+    copy = random.Random.__new__(random.Random)
+    copy.setstate(rng.getstate())
+    return copy
+
+
+class UniformRandomizer:
+    """Picks every piece independently and uniformly at random."""
+    
+    def __init__(self, seed):
+        """
+        Initialize the randomizer.
+        
+        Args:
+            seed: Seed for the randomizer's own random stream
+        """
+        self.rng = random.Random(seed)
+    
+    def next_shape(self):
+        """
+        Get the next shape type.
+        
+        Returns:
+            Shape type string
+        """
+        return self.rng.choice(SHAPE_TYPES)
+    
+    def get_state(self):
+        """
+        Get the full generator state.
+        
+        Returns:
+            Immutable state for set_state
+        """
+        return self.rng.getstate()
+    
+    def set_state(self, state):
+        """
+        Continue from a state returned by get_state.
+        
+        Args:
+            state: Generator state
+        """
+        self.rng.setstate(state)
+    
+    def clone(self):
+        """
+        Copy the randomizer; the copy deals the same pieces from here on.
+        
+        Returns:
+            New UniformRandomizer object
+        """
+        clone = UniformRandomizer.__new__(UniformRandomizer)
+        clone.rng = copy_rng(self.rng)
+        return clone
+
+
+class BagRandomizer:
+    """Deals pieces from shuffled bags holding one of each shape (7-bag)."""
+    
+    def __init__(self, seed):
+        """
+        Initialize the randomizer.
+        
+        Args:
+            seed: Seed for the randomizer's own random stream
+        """
+        self.rng = random.Random(seed)
+        self.bag = []
+    
+    def next_shape(self):
+        """
+        Get the next shape type.
+        
+        Returns:
+            Shape type string
+        """
+        if not self.bag:
+            self.bag = list(SHAPE_TYPES)
+            self.rng.shuffle(self.bag)
+        return self.bag.pop()
+    
+    def get_state(self):
+        """
+        Get the full generator state, including the rest of the bag.
+        
+        Returns:
+            Immutable state for set_state
+        """
+        return (self.rng.getstate(), tuple(self.bag))
+    
+    def set_state(self, state):
+        """
+        Continue from a state returned by get_state.
+        
+        Args:
+            state: Generator state
+        """
+        rng_state, bag = state
+        self.rng.setstate(rng_state)
+        self.bag = list(bag)
+    
+    def clone(self):
+        """
+        Copy the randomizer; the copy deals the same pieces from here on.
+        
+        Returns:
+            New BagRandomizer object
+        """
+        clone = BagRandomizer.__new__(BagRandomizer)
+        clone.rng = copy_rng(self.rng)
+        clone.bag = self.bag[:]
+        return clone
+
+
+RANDOMIZERS = {
+    'uniform': UniformRandomizer,
+    'bag': BagRandomizer,
+}
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# Tetris Replays (compact binary recording and headless playback)
+#
+# A replay holds the game's seed and randomizer followed by every input as a
+# varint of (milliseconds since the previous input << 3 | action code), so
+# most inputs take one or two bytes. Gravity drops are recorded as soft
+# drops, which makes playback independent of frame timing. A finished
+# replay ends with an END code and the final score, lines and pieces.
+#
+# Check recordings from the command line:
+#     python replay.py game.replay [more.replay ...]
+
+import struct
+import sys
+import time
+from game import TetrisGame, ACTIONS
+from randomizers import RANDOMIZERS
+
+MAGIC = b'TRPL'
+VERSION = 1
+
+# Action code marking the end of the input stream
+END = 7
+
+# Header: magic, version, randomizer index, seed
+HEADER = struct.Struct('<4sBBQ')
+
+# Largest seed the header can hold (seeds are unsigned 64-bit)
+MAX_SEED = (1 << 64) - 1
+
+
+def encode_varint(value, out):
+    """
+    Append an unsigned integer in LEB128 varint encoding.
+    
+    Args:
+        value: Non-negative integer
+        out: bytearray to append to
+    """
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, pos):
+    """
+    Read an unsigned LEB128 varint.
+    
+    Args:
+        data: Bytes to read from
+        pos: Offset of the varint
+    
+    Returns:
+        Tuple of (value, offset after the varint)
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class ReplayRecorder:
+    """Records the inputs of one game into the compact replay format."""
+    
+    def __init__(self, game):
+        """
+        Start recording a game and attach to it.
+        
+        Args:
+            game: Freshly started or reset TetrisGame object
+        
+        Raises:
+            ValueError: If the game's seed is outside 0 to MAX_SEED
+        """
+        if not 0 <= game.seed <= MAX_SEED:
+            raise ValueError(f"can't record seed {game.seed}: replays hold seeds "
+                             f"from 0 to {MAX_SEED}")
+        self.data = bytearray(HEADER.pack(
+            MAGIC, VERSION, list(RANDOMIZERS).index(game.randomizer_name), game.seed
+        ))
+        self.last_ms = 0
+        self.finished = False
+        game.recorder = self
+    
+    def record(self, game, action):
+        """
+        Append one input, timestamped with the game's simulated time.
+        
+        Args:
+            game: TetrisGame object the input is applied to
+            action: Action name from ACTIONS
+        """
+        now_ms = int(game.elapsed * 1000)
+        encode_varint(((now_ms - self.last_ms) << 3) | ACTIONS.index(action), self.data)
+        self.last_ms = now_ms
+    
+    def finish(self, game):
+        """
+        Stop recording and append the final result.
+        
+        Args:
+            game: TetrisGame object being recorded
+        
+        Returns:
+            The complete replay as bytes
+        """
+        if not self.finished:
+            encode_varint(END, self.data)
+            for value in (game.score, game.lines_cleared, game.pieces_placed):
+                encode_varint(value, self.data)
+            self.finished = True
+            game.recorder = None
+        
+        return bytes(self.data)
+
+
+def load_replay(data):
+    """
+    Decode a replay.
+    
+    Args:
+        data: Replay bytes
+    
+    Returns:
+        Dictionary with seed, randomizer, inputs (list of (ms, action)) and
+        result ((score, lines, pieces) or None for an unfinished recording)
+    
+    Raises:
+        ValueError: If the data is not a replay this version can read
+    """
+    magic, version, randomizer, seed = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a version %d Tetris replay" % VERSION)
+    
+    inputs = []
+    result = None
+    time_ms = 0
+    pos = HEADER.size
+    while pos < len(data):
+        value, pos = decode_varint(data, pos)
+        if value & 7 == END:
+            result = []
+            for _ in range(3):
+                number, pos = decode_varint(data, pos)
+                result.append(number)
+            result = tuple(result)
+            break
+        time_ms += value >> 3
+        inputs.append((time_ms, ACTIONS[value & 7]))
+    
+    return {
+        'seed': seed,
+        'randomizer': list(RANDOMIZERS)[randomizer],
+        'inputs': inputs,
+        'result': result,
+    }
+
+
+def play_replay(data):
+    """
+    Re-simulate a replay headlessly at maximum speed.
+    
+    Args:
+        data: Replay bytes
+    
+    Returns:
+        Tuple of (finished TetrisGame object, decoded replay dictionary)
+    """
+    replay = load_replay(data)
+    game = TetrisGame(seed=replay['seed'], randomizer=replay['randomizer'])
+    
+    for _, action in replay['inputs']:
+        game.apply(action)
+    
+    return game, replay
+
+
+def verify_replay(data):
+    """
+    Check that re-simulating a replay reproduces its recorded result.
+    
+    Args:
+        data: Replay bytes
+    
+    Returns:
+        True if score, lines and pieces match the recording
+    """
+    game, replay = play_replay(data)
+    return replay['result'] == (game.score, game.lines_cleared, game.pieces_placed)
+
+
+def main(argv=None):
+    """Verify replay files given on the command line."""
+    paths = sys.argv[1:] if argv is None else argv
+    failures = 0
+    
+    for path in paths:
+        with open(path, 'rb') as replay_file:
+            data = replay_file.read()
+        
+        start = time.perf_counter()
+        game, replay = play_replay(data)
+        elapsed = time.perf_counter() - start
+        
+        ok = replay['result'] == (game.score, game.lines_cleared, game.pieces_placed)
+        failures += not ok
+        print(f"{path}: {'OK' if ok else 'MISMATCH'} score {game.score} "
+              f"(recorded {replay['result']}), {len(replay['inputs'])} inputs "
+              f"in {elapsed * 1000:.1f}ms")
+    
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
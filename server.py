@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# Tetris Game Server (asyncio, many games on one shared tick loop)
+#
+# Hosts one TetrisGame per TCP connection and advances all of them from a
+# single tick loop, without a task or timer per game:
+#     python server.py --port 7777
+# Clients send one byte per input, the action's index in game.ACTIONS or
+# RESTART, and receive length-prefixed state frames (see encode_state).
+# loadtest.py drives thousands of connections against it.
+
+import argparse
+import asyncio
+import random
+import struct
+import sys
+import time
+from config import (
+    TICK_RATE,
+    SERVER_HOST, SERVER_PORT, SERVER_SEND_INTERVAL, SERVER_INPUTS_PER_TICK,
+    SERVER_MAX_PENDING_INPUTS, SERVER_WRITE_BUFFER, SERVER_STALL_TIMEOUT,
+    SERVER_STATS_INTERVAL,
+)
+from game import TetrisGame, FixedTimestep, ACTIONS
+from shapes import SHAPE_TYPES
+
+# Input byte that starts a new game once the current one is over
+RESTART = len(ACTIONS)
+
+# Every frame starts with the length of its payload
+FRAME_LENGTH = struct.Struct('<H')
+
+# State payload: tick, score, lines, level, game over, current piece
+# (shape, rotation, x, y) and next shape, followed by one byte per cell.
+# Score, lines and level have no cap in play, so their fields are wide
+# enough for any game a bot can play; the tick wraps around at 2**32
+STATE_HEADER = struct.Struct('<IQIIBBBbbB')
+
+# Byte stored for each cell value: 0 when empty, else shape index plus one
+CELL_CODES = {None: 0}
+CELL_CODES.update((shape_type, i + 1) for i, shape_type in enumerate(SHAPE_TYPES))
+
+# Cell value for each byte, the inverse of CELL_CODES
+CELL_VALUES = (None,) + SHAPE_TYPES
+
+
+def encode_state(game, tick):
+    """
+    Encode the full visible state of a game as one frame.
+    
+    Args:
+        game: TetrisGame object
+        tick: Server tick the state belongs to
+    
+    Returns:
+        Frame bytes: payload length, STATE_HEADER fields and the grid
+    """
+    piece = game.current_piece
+    payload = STATE_HEADER.pack(
+        tick & 0xFFFFFFFF, game.score, game.lines_cleared, game.level, game.game_over,
+        CELL_CODES[piece.shape_type], piece.rotation, piece.x, piece.y,
+        CELL_CODES[game.next_piece.shape_type],
+    ) + bytes([CELL_CODES[cell] for row in game.board.grid for cell in row])
+    return FRAME_LENGTH.pack(len(payload)) + payload
+
+
+def decode_state(payload):
+    """
+    Decode the payload of a state frame.
+    
+    Args:
+        payload: Frame bytes after the length prefix
+    
+    Returns:
+        Dictionary with tick, score, lines, level, game_over, piece
+        ((shape, rotation, x, y)), next_piece and cells (flat list of cell
+        values, row by row)
+    """
+    (tick, score, lines, level, game_over,
+     shape, rotation, x, y, next_shape) = STATE_HEADER.unpack_from(payload)
+    return {
+        'tick': tick,
+        'score': score,
+        'lines': lines,
+        'level': level,
+        'game_over': bool(game_over),
+        'piece': (CELL_VALUES[shape], rotation, x, y),
+        'next_piece': CELL_VALUES[next_shape],
+        'cells': [CELL_VALUES[code] for code in payload[STATE_HEADER.size:]],
+    }
+
+
+class Session(asyncio.Protocol):
+    """One client connection and the game it plays."""
+    
+    def __init__(self, server):
+        """
+        Initialize the session.
+        
+        Args:
+            server: GameServer the session belongs to
+        """
+        self.server = server
+        self.transport = None
+        self.game = None
+        self.inputs = bytearray()
+        self.reading = True
+        self.write_paused_at = None
+        self.sent_game_over = False
+        self.frames_sent = 0
+        self.frames_skipped = 0
+    
+    def connection_made(self, transport):
+        """Start a game for the new connection."""
+        self.transport = transport
+        transport.set_write_buffer_limits(high=self.server.write_buffer)
+        self.game = TetrisGame(seed=self.server.seeds.getrandbits(32))
+        self.server.sessions.add(self)
+    
+    def connection_lost(self, exc):
+        """Forget the session's game."""
+        self.server.sessions.discard(self)
+    
+    def data_received(self, data):
+        """Queue inputs until the next tick applies them."""
+        self.inputs += data
+        
+        # Input backpressure: a client sending faster than its game can
+        # use the inputs stops being read until the queue drains
+        if self.reading and len(self.inputs) > SERVER_MAX_PENDING_INPUTS:
+            self.transport.pause_reading()
+            self.reading = False
+    
+    def pause_writing(self):
+        """Called by the transport when the client stops keeping up."""
+        self.write_paused_at = time.monotonic()
+    
+    def resume_writing(self):
+        """Called by the transport once the client has caught up."""
+        self.write_paused_at = None
+    
+    def drop(self):
+        """Disconnect the client and take its game off the tick loop at once."""
+        # connection_lost only runs on a later loop pass; until then the
+        # session must not be stepped again
+        self.inputs.clear()
+        self.server.sessions.discard(self)
+        self.transport.abort()
+    
+    def step(self, send):
+        """
+        Run one tick: apply queued inputs, advance the game, push its state.
+        
+        Args:
+            send: True if a state frame is due this tick
+        """
+        game = self.game
+        inputs = self.inputs
+        
+        if inputs:
+            count = min(len(inputs), SERVER_INPUTS_PER_TICK)
+            for code in inputs[:count]:
+                if code < RESTART:
+                    game.apply(ACTIONS[code])
+                elif code == RESTART:
+                    if game.game_over:
+                        game.reset(self.server.seeds.getrandbits(32))
+                        self.sent_game_over = False
+                else:
+                    self.server.protocol_errors += 1
+                    self.drop()
+                    return
+            del inputs[:count]
+            if not self.reading and len(inputs) <= SERVER_MAX_PENDING_INPUTS // 2:
+                self.transport.resume_reading()
+                self.reading = True
+        
+        game.tick()
+        
+        # A finished game doesn't change, so its last frame is sent once
+        if send and not self.sent_game_over:
+            self.send_state()
+    
+    def send_state(self):
+        """Write the game's state, unless the client is behind on reading."""
+        # Output backpressure: frames carry the full state, so a slow
+        # client simply skips frames and gets the latest one once it has
+        # caught up; one that stops reading altogether is dropped
+        if self.write_paused_at is not None:
+            self.frames_skipped += 1
+            if time.monotonic() - self.write_paused_at > self.server.stall_timeout:
+                self.server.stalled += 1
+                self.drop()
+            return
+        
+        frame = encode_state(self.game, self.server.tick)
+        self.transport.write(frame)
+        self.frames_sent += 1
+        self.server.bytes_sent += len(frame)
+        self.sent_game_over = self.game.game_over
+
+
+class GameServer:
+    """Owns every session's game and advances them all on one tick loop."""
+    
+    def __init__(self, send_interval=SERVER_SEND_INTERVAL, write_buffer=SERVER_WRITE_BUFFER,
+                 stall_timeout=SERVER_STALL_TIMEOUT, seed=None):
+        """
+        Initialize the server.
+        
+        Args:
+            send_interval: Ticks between state frames to each client
+            write_buffer: Bytes queued to a client before frames are skipped
+            stall_timeout: Seconds a client may go without reading before
+                           it is disconnected
+            seed: Optional seed for the games' seeds
+        """
+        self.send_interval = send_interval
+        self.write_buffer = write_buffer
+        self.stall_timeout = stall_timeout
+        self.seeds = random.Random(seed)
+        self.sessions = set()
+        self.listener = None
+        self.tick = 0
+        
+        # Statistics
+        self.bytes_sent = 0
+        self.stalled = 0
+        self.protocol_errors = 0
+        self.busy_time = 0.0
+        self.timestep = FixedTimestep()
+    
+    async def start(self, host=SERVER_HOST, port=SERVER_PORT):
+        """
+        Start accepting connections.
+        
+        Args:
+            host: Address to listen on
+            port: TCP port (0 picks a free one)
+        
+        Returns:
+            The port actually listened on
+        """
+        loop = asyncio.get_running_loop()
+        self.listener = await loop.create_server(lambda: Session(self), host, port,
+                                                 backlog=1024)
+        return self.listener.sockets[0].getsockname()[1]
+    
+    def step(self):
+        """Advance every game by one tick and push frames that are due."""
+        start = time.perf_counter()
+        self.tick += 1
+        send = self.tick % self.send_interval == 0
+        
+        for session in list(self.sessions):
+            session.step(send)
+        
+        self.busy_time += time.perf_counter() - start
+    
+    async def run(self, duration=None, stats_interval=SERVER_STATS_INTERVAL):
+        """
+        Run the shared tick loop.
+        
+        Sleeps until the next tick is due, then runs every tick that came
+        due, so the games keep real time as long as the server keeps up.
+        
+        Args:
+            duration: Optional number of seconds to run for
+            stats_interval: Seconds between statistics lines (None: quiet)
+        """
+        timestep = self.timestep
+        start = last = time.monotonic()
+        next_stats = start + stats_interval if stats_interval else None
+        window = (start, self.tick, self.busy_time, self.bytes_sent)
+        
+        while duration is None or last - start < duration:
+            await asyncio.sleep((1 - timestep.accumulator) / TICK_RATE)
+            
+            now = time.monotonic()
+            for _ in range(timestep.advance(now - last)):
+                self.step()
+            last = now
+            
+            if next_stats is not None and now >= next_stats:
+                print(self.format_stats(self.stats(window, now)), flush=True)
+                window = (now, self.tick, self.busy_time, self.bytes_sent)
+                next_stats = now + stats_interval
+    
+    def stats(self, window, now):
+        """
+        Get the server statistics over a time window.
+        
+        Args:
+            window: Tuple of (time, tick, busy time, bytes sent) at its start
+            now: time.monotonic() value at its end
+        
+        Returns:
+            Dictionary of statistics; load is the fraction of the window
+            spent running ticks, and capacity the number of games one core
+            could run at the full tick rate at the measured cost per game
+        """
+        since, tick, busy_time, bytes_sent = window
+        elapsed = max(now - since, 1e-9)
+        load = (self.busy_time - busy_time) / elapsed
+        ticks_per_second = (self.tick - tick) / elapsed
+        return {
+            'sessions': len(self.sessions),
+            'ticks_per_second': ticks_per_second,
+            'load': load,
+            'capacity': (int(len(self.sessions) * ticks_per_second / (load * TICK_RATE))
+                         if load else None),
+            'bytes_per_second': (self.bytes_sent - bytes_sent) / elapsed,
+            'frames_skipped': sum(session.frames_skipped for session in self.sessions),
+            'dropped_ticks': self.timestep.dropped_ticks,
+            'stalled': self.stalled,
+            'protocol_errors': self.protocol_errors,
+        }
+    
+    @staticmethod
+    def format_stats(stats):
+        """Format statistics as one line."""
+        return (f"{stats['sessions']} games, {stats['ticks_per_second']:.1f} ticks/s, "
+                f"load {stats['load']:.1%} (capacity ~{stats['capacity']} games/core), "
+                f"{stats['bytes_per_second'] / 1e6:.2f} MB/s out, "
+                f"{stats['frames_skipped']} frames skipped, "
+                f"{stats['dropped_ticks']} ticks dropped, {stats['stalled']} stalled clients")
+    
+    def close(self):
+        """Stop accepting connections and disconnect every client."""
+        if self.listener is not None:
+            self.listener.close()
+        for session in list(self.sessions):
+            session.transport.abort()
+
+
+async def serve(host, port, duration, stats_interval, send_interval, seed):
+    """Run a server until interrupted or for a fixed duration."""
+    server = GameServer(send_interval=send_interval, seed=seed)
+    port = await server.start(host, port)
+    print(f"Serving on {host}:{port}", flush=True)
+    start = time.monotonic()
+    window = (start, server.tick, server.busy_time, server.bytes_sent)
+    try:
+        await server.run(duration, stats_interval)
+    finally:
+        print("final: " + server.format_stats(server.stats(window, time.monotonic())), flush=True)
+        server.close()
+
+
+def main(argv=None):
+    """Entry point for the game server."""
+    parser = argparse.ArgumentParser(description="Host Tetris games over TCP.")
+    parser.add_argument('--host', default=SERVER_HOST, help="address to listen on")
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help="TCP port")
+    parser.add_argument('--duration', type=float, default=None,
+                        help="stop after this many seconds")
+    parser.add_argument('--stats-interval', type=float, default=SERVER_STATS_INTERVAL,
+                        help="seconds between statistics lines")
+    parser.add_argument('--send-interval', type=int, default=SERVER_SEND_INTERVAL,
+                        help="ticks between state frames to each client")
+    parser.add_argument('--seed', type=int, default=None, help="seed for the games' seeds")
+    args = parser.parse_args(argv)
+    
+    try:
+        asyncio.run(serve(args.host, args.port, args.duration, args.stats_interval,
+                          args.send_interval, args.seed))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
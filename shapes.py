@@ -1,5 +1,8 @@
 # Tetris Shapes (Tetrominoes)
 
+from functools import lru_cache
+from config import BOARD_WIDTH
+
 # Each shape is represented as a list of rotation states
 # Each rotation state is a list of (x, y) coordinates relative to the piece's origin
 
@@ -48,6 +51,9 @@ SHAPES = {
     ],
 }
 
+# Shape types in a fixed order, used for random choice and integer encoding
+SHAPE_TYPES = tuple(SHAPES)
+
 SHAPE_COLORS = {
     'I': 'I',
     'O': 'O',
@@ -57,3 +63,77 @@ SHAPE_COLORS = {
     'J': 'J',
     'L': 'L',
 }
+
+
+class RotationMasks:
+    """Precomputed collision data for one rotation state of one shape."""
+    
+    def __init__(self, blocks, board_width):
+        """
+        Build the lookup tables for a rotation state.
+        
+        Args:
+            blocks: List of (dx, dy) block offsets for the rotation state
+            board_width: Number of columns on the board
+        """
+        # Bounding box of the blocks relative to the piece origin
+        self.left = min(dx for dx, _ in blocks)
+        self.right = max(dx for dx, _ in blocks)
+        self.top = min(dy for _, dy in blocks)
+        self.bottom = max(dy for _, dy in blocks)
+        
+        # Legal range for the piece's x coordinate
+        self.min_x = -self.left
+        self.max_x = board_width - 1 - self.right
+        
+        # Lowest block offset in each column the piece covers
+        profile = {}
+        for dx, dy in blocks:
+            profile[dx] = max(dy, profile.get(dx, dy))
+        
+        # Row masks, absolute cells (lowest first) and absolute bottom
+        # profile as (column, dy), pre-shifted for every legal x
+        self.rows = {}
+        self.cells = {}
+        self.bottoms = {}
+        for x in range(self.min_x, self.max_x + 1):
+            masks = {}
+            for dx, dy in blocks:
+                masks[dy] = masks.get(dy, 0) | (1 << (x + dx))
+            self.rows[x] = tuple(sorted(masks.items()))
+            self.cells[x] = tuple(sorted(((dy, x + dx) for dx, dy in blocks), reverse=True))
+            self.bottoms[x] = tuple((x + dx, dy) for dx, dy in sorted(profile.items()))
+
+
+def build_piece_table(board_width):
+    """
+    Build the collision lookup table for a board width.
+    
+    Args:
+        board_width: Number of columns on the board
+    
+    Returns:
+        Dictionary mapping each shape type to a list of RotationMasks,
+        indexed by rotation
+    """
+    return {
+        shape_type: [RotationMasks(blocks, board_width) for blocks in rotations]
+        for shape_type, rotations in SHAPES.items()
+    }
+
+
+@lru_cache(maxsize=None)
+def piece_table(board_width):
+    """
+    Get the collision lookup table for a board width, built once per width.
+    
+    Args:
+        board_width: Number of columns on the board
+    
+    Returns:
+        Shared table from build_piece_table (do not modify)
+    """
+    return build_piece_table(board_width)
+
+
+PIECE_TABLE = piece_table(BOARD_WIDTH)
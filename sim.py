@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# Tetris Game - Headless Simulation Runner
+#
+# Drives TetrisGame directly on simulated time, without importing pygame:
+#     python sim.py --games 100 --seed 1 --agent drop
+
+import argparse
+import os
+import sys
+import time
+from game import TetrisGame
+from agents import AGENTS
+from randomizers import RANDOMIZERS
+from replay import ReplayRecorder, MAX_SEED
+
+# Ticks between wall-clock checks when a game has a deadline
+DEADLINE_CHECK_TICKS = 256
+
+
+def run_game(game, agent, max_pieces=None, deadline=None):
+    """
+    Play one game to the end on simulated time, one logic tick per action.
+    
+    Args:
+        game: Freshly started TetrisGame object
+        agent: Agent object choosing an action every tick
+        max_pieces: Optional limit on pieces placed before stopping
+        deadline: Optional time.perf_counter() value to stop playing at
+    
+    Returns:
+        True if the game ran to completion, False if it hit the deadline
+    """
+    ticks = 0
+    
+    while not game.game_over:
+        if max_pieces is not None and game.pieces_placed >= max_pieces:
+            break
+        
+        # Checking the clock every tick would cost more than the tick itself
+        ticks += 1
+        if deadline is not None and ticks % DEADLINE_CHECK_TICKS == 0:
+            if time.perf_counter() >= deadline:
+                return False
+        
+        action = agent.act(game)
+        if action is not None:
+            game.apply(action)
+        
+        game.tick()
+    
+    return True
+
+
+def game_result(game):
+    """
+    Summarize a finished game.
+    
+    Args:
+        game: TetrisGame object
+    
+    Returns:
+        Dictionary with the game's seed, score, lines, pieces and level
+    """
+    return {
+        'seed': game.seed,
+        'score': game.score,
+        'lines': game.lines_cleared,
+        'pieces': game.pieces_placed,
+        'level': game.level,
+    }
+
+
+def simulate(games, seed, agent_name, max_pieces=None, randomizer='uniform',
+             record_dir=None):
+    """
+    Play a series of seeded games in this process.
+    
+    Args:
+        games: Number of games to play
+        seed: Base seed; game i uses seed + i
+        agent_name: Key of the agent in AGENTS
+        max_pieces: Optional per-game limit on pieces placed
+        randomizer: Key of the piece randomizer in RANDOMIZERS
+        record_dir: Optional directory to write a replay of each game to
+    
+    Returns:
+        List of per-game result dictionaries
+    """
+    results = []
+    
+    for i in range(games):
+        game = TetrisGame(seed=seed + i, randomizer=randomizer)
+        recorder = ReplayRecorder(game) if record_dir is not None else None
+        run_game(game, AGENTS[agent_name](seed + i), max_pieces)
+        
+        if recorder is not None:
+            path = os.path.join(record_dir, f"{seed + i}.replay")
+            with open(path, 'wb') as replay_file:
+                replay_file.write(recorder.finish(game))
+        
+        results.append(game_result(game))
+    
+    return results
+
+
+def main(argv=None):
+    """Entry point for the headless simulation runner."""
+    parser = argparse.ArgumentParser(description="Run Tetris games headless.")
+    parser.add_argument('--games', type=int, default=10, help="number of games to play")
+    parser.add_argument('--seed', type=int, default=0, help="base random seed")
+    parser.add_argument('--agent', choices=sorted(AGENTS), default='drop',
+                        help="computer player to use")
+    parser.add_argument('--max-pieces', type=int, default=None,
+                        help="stop each game after this many pieces")
+    parser.add_argument('--randomizer', choices=sorted(RANDOMIZERS), default='uniform',
+                        help="piece randomizer to use")
+    parser.add_argument('--record', metavar='DIR', default=None,
+                        help="write a replay of every game to this directory")
+    args = parser.parse_args(argv)
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+    if args.record is not None:
+        if not 0 <= args.seed <= MAX_SEED - (args.games - 1):
+            parser.error(f"--record needs seeds from 0 to {MAX_SEED}; "
+                         f"these games use {args.seed} to {args.seed + args.games - 1}")
+        os.makedirs(args.record, exist_ok=True)
+    
+    start = time.perf_counter()
+    results = simulate(args.games, args.seed, args.agent, args.max_pieces,
+                       args.randomizer, args.record)
+    elapsed = time.perf_counter() - start
+    
+    pieces = sum(result['pieces'] for result in results)
+    scores = [result['score'] for result in results]
+    print(f"{len(results)} games, {pieces} pieces in {elapsed:.3f}s")
+    print(f"mean score {sum(scores) / len(scores):.1f}, best {max(scores)}")
+    print(f"{len(results) / elapsed:.1f} games/s, {pieces / elapsed:.1f} pieces/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
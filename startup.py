@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# Tetris Startup Timing (time to first frame)
+#
+# Launches the game in a fresh interpreter, draws its first frame and
+# reports how long that took from launch, split into interpreter start,
+# imports, setup and drawing, with the import time of each package from
+# python -X importtime. Exits non-zero when the median time to the first
+# frame is over STARTUP_BUDGET:
+#     python startup.py --runs 5
+#     python startup.py --headless --budget 0.5
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from config import STARTUP_BUDGET
+
+# Run in the launched interpreter: the steps `python main.py` takes up to
+# its first frame, printing the seconds each took once the frame is drawn
+CHILD_SCRIPT = """\
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.TetrisApp()
+created = time.perf_counter()
+app.frame()
+drawn = time.perf_counter()
+print(imported - start, created - imported, drawn - created, flush=True)
+"""
+
+
+def parse_import_times(lines):
+    """
+    Total the self import time of each top-level package.
+    
+    Args:
+        lines: Lines written to stderr by python -X importtime
+    
+    Returns:
+        Dictionary mapping package name to seconds, slowest first
+    """
+    totals = {}
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the column header
+        package = fields[2].strip().split('.')[0]
+        totals[package] = totals.get(package, 0) + int(fields[0]) / 1e6
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def measure_startup(headless=False):
+    """
+    Launch the game once and time it up to its first frame.
+    
+    The game is killed as soon as the frame is drawn, so shutting down is
+    not part of the measurement.
+    
+    Args:
+        headless: If True, draw with the SDL dummy video driver
+    
+    Returns:
+        Dictionary of seconds: 'first_frame' from launch to the first
+        frame, split into 'interpreter' (start-up before the game's code),
+        'imports', 'init' (TetrisApp()) and 'draw'; and 'modules', the
+        self import time of each package from parse_import_times
+    
+    Raises:
+        RuntimeError: If the game exits without drawing a frame
+    """
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    if headless:
+        env['SDL_VIDEODRIVER'] = 'dummy'
+    
+    # stderr goes to a file: a full pipe would stall the game mid-import
+    with tempfile.TemporaryFile('w+') as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+            stdout=subprocess.PIPE, stderr=stderr, text=True,
+        )
+        line = process.stdout.readline()
+        first_frame = time.perf_counter() - start
+        process.kill()
+        process.wait()
+        process.stdout.close()
+        stderr.seek(0)
+        errors = stderr.read()
+    
+    if not line:
+        raise RuntimeError(f"game exited before its first frame:\n{errors}")
+    imports, init, draw = (float(value) for value in line.split())
+    return {
+        'first_frame': first_frame,
+        'interpreter': first_frame - imports - init - draw,
+        'imports': imports,
+        'init': init,
+        'draw': draw,
+        'modules': parse_import_times(errors.splitlines()),
+    }
+
+
+def main(argv=None):
+    """Entry point for the startup timing."""
+    parser = argparse.ArgumentParser(description="Time the game's launch to its first frame.")
+    parser.add_argument('--runs', type=int, default=5, help="launches to time")
+    parser.add_argument('--headless', action='store_true',
+                        help="use the SDL dummy video driver (no window)")
+    parser.add_argument('--budget', type=float, default=STARTUP_BUDGET,
+                        help="seconds allowed to the first frame (default: %(default)s)")
+    parser.add_argument('--top', type=int, default=10,
+                        help="packages listed by import time")
+    args = parser.parse_args(argv)
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+    
+    reports = sorted((measure_startup(args.headless) for _ in range(args.runs)),
+                     key=lambda report: report['first_frame'])
+    median = reports[len(reports) // 2]
+    
+    for phase in ('interpreter', 'imports', 'init', 'draw'):
+        print(f"{phase:<12} {median[phase] * 1e3:8.1f} ms")
+    first_frame = statistics.median(report['first_frame'] for report in reports)
+    print(f"{'first frame':<12} {first_frame * 1e3:8.1f} ms  "
+          f"(budget {args.budget * 1e3:.0f} ms, {args.runs} runs)")
+    
+    print("\nSlowest imports (self time by package):")
+    for package, seconds in list(median['modules'].items())[:args.top]:
+        print(f"  {package:<24} {seconds * 1e3:8.1f} ms")
+    
+    if first_frame > args.budget:
+        print(f"\nOver budget by {(first_frame - args.budget) * 1e3:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,27 @@
 #!/usr/bin/env python3
 # Test script for Tetris game mechanics
 
-from game import TetrisGame, Tetromino
+import asyncio
+import copy
+import os
+import random
+import subprocess
+import sys
+import numpy as np
+from game import TetrisGame, Tetromino, ACTIONS
 from board import Board
+from bitboard import BitBoard
+from batch import BatchTetris
+from randomizers import BagRandomizer
+from replay import ReplayRecorder, load_replay, verify_replay
+from server import GameServer, RESTART, FRAME_LENGTH, encode_state, decode_state
+from delta import DeltaEncoder, DeltaDecoder
+from env import TetrisEnv, NOOP, ROTATIONS, allocate_observation
+from vecenv import VectorEnv
+from placements import find_placements, drop_positions
+from transposition import TranspositionTable
+from zobrist import grid_hash
+from shapes import SHAPES, SHAPE_TYPES, PIECE_TABLE
 from config import BOARD_WIDTH, BOARD_HEIGHT
 
 
@@ -68,7 +87,7 @@ def test_line_clearing():
     
     # Fill a line
     for x in range(BOARD_WIDTH):
-        board.grid[BOARD_HEIGHT - 1][x] = 'I'
+        board.set_cell(x, BOARD_HEIGHT - 1, 'I')
     
     # Clear lines
     lines_cleared = board.clear_lines()
@@ -154,6 +173,1100 @@ def test_game_reset():
     print("✓ Game reset works")
 
 
+def test_bitboard_line_clearing():
+    """Test line clearing on the bitboard backend."""
+    print("Testing bitboard line clearing...")
+    board = BitBoard()
+    
+    # Fill two lines with a block sitting on top of them
+    for x in range(BOARD_WIDTH):
+        board.set_cell(x, BOARD_HEIGHT - 1, 'I')
+        board.set_cell(x, BOARD_HEIGHT - 2, 'O')
+    board.set_cell(3, BOARD_HEIGHT - 3, 'T')
+    
+    assert board.clear_lines() == 2
+    assert board.grid[BOARD_HEIGHT - 1][3] == 'T'
+    assert board.rows[BOARD_HEIGHT - 1] == 1 << 3
+    assert sum(1 for row in board.grid for cell in row if cell is not None) == 1
+    print("✓ Bitboard line clearing works")
+
+
+def test_bitboard_matches_board():
+    """Test that the bitboard backend plays identically to Board."""
+    print("Testing bitboard against list board...")
+    actions = ['move_left', 'move_right', 'rotate', 'soft_drop', 'hard_drop']
+    
+    list_game = TetrisGame(seed=1234)
+    bit_game = TetrisGame(BitBoard(), seed=1234)
+    
+    script = random.Random(99)
+    for _ in range(2000):
+        action = script.choice(actions)
+        getattr(list_game, action)()
+        getattr(bit_game, action)()
+        if list_game.game_over:
+            break
+    
+    assert list_game.board.grid == bit_game.board.grid
+    assert list_game.score == bit_game.score
+    assert list_game.game_over == bit_game.game_over
+    print("✓ Bitboard matches list board")
+
+
+def test_piece_table():
+    """Test the precomputed collision tables against the shape definitions."""
+    print("Testing piece lookup tables...")
+    for shape_type, rotations in SHAPES.items():
+        for rotation, blocks in enumerate(rotations):
+            masks = PIECE_TABLE[shape_type][rotation]
+            for x in range(-4, BOARD_WIDTH + 4):
+                in_bounds = all(0 <= x + dx < BOARD_WIDTH for dx, _ in blocks)
+                assert in_bounds == (masks.min_x <= x <= masks.max_x)
+                if in_bounds:
+                    cells = {(x + dx, dy) for dx, dy in blocks}
+                    assert cells == {(col, dy) for dy, col in masks.cells[x]}
+                    assert sum(bin(mask).count('1') for _, mask in masks.rows[x]) == 4
+    print("✓ Piece lookup tables work")
+
+
+def test_soft_drop_locks_piece():
+    """Test that soft dropping onto the floor locks the piece in place."""
+    print("Testing soft drop locking...")
+    game = TetrisGame()
+    first_piece = game.current_piece
+    
+    for _ in range(BOARD_HEIGHT + 1):
+        game.soft_drop()
+    
+    assert game.current_piece is not first_piece
+    placed = [(x, y) for y, row in enumerate(game.board.grid)
+              for x, cell in enumerate(row) if cell is not None]
+    assert len(placed) == 4
+    assert max(y for _, y in placed) == BOARD_HEIGHT - 1
+    print("✓ Soft drop locking works")
+
+
+def test_batch_matches_game():
+    """Test that the batch engine plays identically to TetrisGame."""
+    print("Testing batch engine against scalar game...")
+    game = TetrisGame(seed=7)
+    batch = BatchTetris(3, seed=7)
+    
+    # Leave a well in the first column so a vertical I scores a Tetris
+    for y in range(BOARD_HEIGHT - 4, BOARD_HEIGHT):
+        for x in range(1, BOARD_WIDTH):
+            game.board.set_cell(x, y, 'O')
+            batch.boards[0, y, x] = SHAPE_TYPES.index('O') + 1
+    game.current_piece = Tetromino('I')
+    batch.piece[0] = SHAPE_TYPES.index('I')
+    batch.next_piece[0] = SHAPE_TYPES.index(game.next_piece.shape_type)
+    
+    script = random.Random(3)
+    actions = [2] + [0] * BOARD_WIDTH + [4]
+    actions += [script.choice([0, 1, 2, 2, 3, 4]) for _ in range(3000)]
+    for action in actions:
+        getattr(game, ACTIONS[action])()
+        batch.step([action, action, 4])
+        batch.update(0.05)
+        game.update(0.05)
+        batch.next_piece[0] = SHAPE_TYPES.index(game.next_piece.shape_type)
+        if game.game_over:
+            break
+    
+    grid = [[SHAPE_TYPES.index(cell) + 1 if cell else 0 for cell in row]
+            for row in game.board.grid]
+    assert game.score >= 800
+    assert batch.boards[0].tolist() == grid
+    assert batch.score[0] == game.score
+    assert batch.lines[0] == game.lines_cleared
+    assert batch.level[0] == game.level
+    assert batch.game_over[0] == game.game_over
+    assert batch.game_over[2]
+    print("✓ Batch engine matches scalar game")
+
+
+def test_headless_simulation():
+    """Test that simulations are reproducible and never import pygame."""
+    print("Testing headless simulation...")
+    code = ("import sys, sim; "
+            "print(sim.simulate(5, 42, 'drop')); "
+            "print('pygame' in sys.modules)")
+    runs = [subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                           check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            .stdout.splitlines()
+            for _ in range(2)]
+    assert runs[0] == runs[1]
+    assert runs[0][1] == 'False'
+    print("✓ Headless simulation works")
+
+
+def test_incremental_rendering():
+    """Test that incremental rendering produces the same frames as full redraws."""
+    print("Testing incremental rendering...")
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from utils import Renderer
+    from config import WINDOW_WIDTH, WINDOW_HEIGHT
+    
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    full_screen = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    incremental = Renderer(screen, incremental=True)
+    full = Renderer(full_screen)
+    
+    game = TetrisGame(seed=5)
+    script = random.Random(5)
+    for frame in range(400):
+        if game.game_over and frame % 50 == 49:
+            game.reset()
+        elif frame % 5 == 4:
+            game.hard_drop()
+        else:
+            getattr(game, script.choice(ACTIONS[:4]))()
+        rects = incremental.draw_game(game)
+        full.draw_game(game)
+        assert all(screen.get_rect().contains(rect) for rect in rects)
+        if frame % 7 == 0:
+            assert (pygame.image.tostring(screen, 'RGB')
+                    == pygame.image.tostring(full_screen, 'RGB'))
+    
+    # Nothing changed, so nothing is repainted
+    assert incremental.draw_game(game) == []
+    pygame.quit()
+    print("✓ Incremental rendering works")
+
+
+def test_render_caches():
+    """Test that the renderer reuses cached text and block surfaces."""
+    print("Testing render caches...")
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from utils import Renderer
+    from config import WINDOW_WIDTH, WINDOW_HEIGHT, TEXT_CACHE_SIZE
+    
+    pygame.display.init()
+    pygame.font.init()
+    renderer = Renderer(pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT)))
+    
+    label = renderer.render_text(renderer.font_medium, "SCORE", (255, 255, 255))
+    for value in range(TEXT_CACHE_SIZE * 2):
+        renderer.render_text(renderer.font_small, str(value), (200, 200, 200))
+        renderer.render_text(renderer.font_medium, "SCORE", (255, 255, 255))
+    
+    assert len(renderer.text_cache) == TEXT_CACHE_SIZE
+    assert renderer.render_text(renderer.font_medium, "SCORE", (255, 255, 255)) is label
+    assert set(renderer.block_sprites) == set(SHAPES)
+    pygame.quit()
+    print("✓ Render caches work")
+
+
+def test_placements():
+    """Test the reachable placement search."""
+    print("Testing placement search...")
+    game = TetrisGame(seed=11)
+    placements = find_placements(game.board, game.current_piece)
+    assert find_placements(game.board, game.current_piece) is placements
+    
+    # Every placement's moves lock the piece exactly where it says
+    for placement in placements:
+        replay = TetrisGame(seed=11)
+        for move in placement.moves:
+            getattr(replay, move)()
+        locked = Tetromino(game.current_piece.shape_type)
+        locked.rotation = placement.rotation
+        expected = Board()
+        expected.place_piece(locked, placement.x, placement.y)
+        assert replay.board.grid == expected.grid
+    
+    # An O piece can be tucked under an overhang
+    board = Board()
+    for x in range(4):
+        board.set_cell(x, BOARD_HEIGHT - 3, 'I')
+    tucks = [placement for placement in find_placements(board, Tetromino('O'))
+             if placement.x == 0 and placement.y == BOARD_HEIGHT - 2]
+    assert len(tucks) == 1
+    assert 'soft_drop' in tucks[0].moves and 'move_left' in tucks[0].moves
+    print("✓ Placement search works")
+
+
+def test_seeded_pieces():
+    """Test that seeded games deal reproducible pieces."""
+    print("Testing seeded piece generation...")
+    first = TetrisGame(seed=3)
+    second = TetrisGame(seed=3)
+    assert ([first.create_new_piece().shape_type for _ in range(50)]
+            == [second.create_new_piece().shape_type for _ in range(50)])
+    
+    bag = BagRandomizer(3)
+    for _ in range(5):
+        assert sorted(bag.next_shape() for _ in range(7)) == sorted(SHAPES)
+    print("✓ Seeded piece generation works")
+
+
+def test_replay_round_trip():
+    """Test recording a game and replaying it headlessly."""
+    print("Testing replay recording...")
+    game = TetrisGame(seed=21, randomizer='bag')
+    recorder = ReplayRecorder(game)
+    script = random.Random(21)
+    while not game.game_over:
+        game.apply(script.choice(ACTIONS))
+        game.update(1 / 60)
+    data = recorder.finish(game)
+    
+    replay = load_replay(data)
+    assert replay['seed'] == 21 and replay['randomizer'] == 'bag'
+    assert replay['result'] == (game.score, game.lines_cleared, game.pieces_placed)
+    assert len(data) < 20 + 2 * len(replay['inputs'])
+    assert verify_replay(data)
+    
+    # A different seed plays out differently
+    tampered = bytearray(data)
+    tampered[6] ^= 1
+    assert not verify_replay(bytes(tampered))
+    
+    # Seeds the header can't hold are refused up front
+    for seed in (-1, 1 << 64):
+        try:
+            ReplayRecorder(TetrisGame(seed=seed))
+            assert False, f"recorded seed {seed}"
+        except ValueError:
+            pass
+    print("✓ Replay recording works")
+
+
+def test_evaluation_harness():
+    """Test that the process pool harness matches in-process simulation."""
+    print("Testing evaluation harness...")
+    import tempfile
+    from harness import evaluate, summarize
+    from sim import simulate
+    
+    expected = simulate(8, 100, 'drop')
+    with tempfile.TemporaryDirectory() as directory:
+        progress = os.path.join(directory, 'progress.jsonl')
+        first = list(evaluate('drop', range(100, 104), workers=2, progress_path=progress))
+        results = list(evaluate('drop', range(100, 108), workers=2, progress_path=progress))
+        # Another configuration replays its games instead of reusing these
+        other = list(evaluate('drop', range(100, 102), workers=2, max_pieces=5,
+                              progress_path=progress))
+        again = list(evaluate('drop', range(100, 102), workers=2, max_pieces=5,
+                              progress_path=progress))
+    
+    assert not any(result.get('resumed') for result in other)
+    assert all(result['pieces'] <= 5 for result in other)
+    assert all(result.get('resumed') for result in again)
+    assert [result['config']['max_pieces'] for result in again] == [5, 5]
+    
+    assert len(first) == 4
+    assert sum(1 for result in results if result.get('resumed')) == 4
+    keys = ('seed', 'score', 'lines', 'pieces', 'level')
+    assert (sorted(tuple(result[key] for key in keys) for result in results)
+            == [tuple(result[key] for key in keys) for result in expected])
+    
+    summary = summarize(results, 1.0)
+    assert summary['games'] == 8
+    assert summary['pieces_per_second'] == sum(
+        result['pieces'] for result in results if not result.get('resumed'))
+    print("✓ Evaluation harness works")
+
+
+def test_benchmark_compare():
+    """Test running benchmarks and flagging regressions against a baseline."""
+    print("Testing benchmark suite...")
+    from bench import run_benchmarks, compare
+    
+    results = run_benchmarks(['board.clear_lines[4]'], 1, 0)
+    assert results['board.clear_lines[4]']['ns_per_op'] > 0
+    
+    baseline = {'board.clear_lines[4]': dict(results['board.clear_lines[4]'])}
+    assert compare(results, baseline, 0.10) == []
+    baseline['board.clear_lines[4]']['min_ns_per_op'] /= 2
+    assert [name for name, _, _ in compare(results, baseline, 0.10)] == ['board.clear_lines[4]']
+    print("✓ Benchmark suite works")
+
+
+def test_frame_profiler():
+    """Test per-phase frame timing, dropped frames and the trace dump."""
+    print("Testing frame profiler...")
+    import json
+    import tempfile
+    import time
+    from profiler import FrameProfiler, PHASES
+    
+    profiler = FrameProfiler(fps=100)
+    for frame in range(20):
+        profiler.begin_frame()
+        for phase in PHASES:
+            # Waiting for the frame clock never counts against the budget
+            if phase == 'wait' or (phase == 'render' and frame % 10 == 0):
+                time.sleep(0.012)
+            profiler.mark(phase)
+        profiler.end_frame()
+    
+    stats = profiler.stats()
+    assert profiler.frames == 20 and profiler.dropped == 2
+    assert stats['wait']['p50'] >= 12_000_000 > stats['frame']['p50']
+    assert stats['render']['max'] >= 12_000_000 > stats['render']['p50']
+    assert len(profiler.summary_lines()) == len(PHASES) + 3
+    
+    with tempfile.TemporaryDirectory() as directory:
+        profiler.dump(os.path.join(directory, 'trace.json'))
+        profiler.dump(os.path.join(directory, 'trace.csv'))
+        with open(os.path.join(directory, 'trace.json')) as trace_file:
+            trace = json.load(trace_file)
+        with open(os.path.join(directory, 'trace.csv')) as trace_file:
+            rows = trace_file.read().splitlines()
+    assert trace['dropped'] == 2 and len(trace['trace']) == 20
+    assert len(rows) == 21 and rows[0].startswith('events_ns')
+    print("✓ Frame profiler works")
+
+
+def test_fixed_timestep():
+    """Test fixed logic ticks, catch-up after hitches and batch parity."""
+    print("Testing fixed timestep...")
+    from game import FixedTimestep
+    from config import TICK_RATE, MAX_CATCH_UP_TICKS
+    
+    timestep = FixedTimestep()
+    # Frames at a third of the tick rate run three ticks each
+    assert [timestep.advance(3 / TICK_RATE) for _ in range(5)] == [3] * 5
+    # A long hitch is capped and the excess dropped, not carried over
+    assert timestep.advance(1.0) == MAX_CATCH_UP_TICKS
+    assert timestep.dropped_ticks == TICK_RATE - MAX_CATCH_UP_TICKS
+    assert timestep.advance(0.5 / TICK_RATE) == 0
+    assert timestep.advance(0.5 / TICK_RATE) == 1
+    
+    # Gravity drops one row every whole drop interval
+    game = TetrisGame(seed=11)
+    start_y = game.current_piece.y
+    for _ in range(game.get_drop_interval() * 3):
+        game.tick()
+    assert game.current_piece.y == start_y + 3
+    assert game.ticks == game.get_drop_interval() * 3
+    
+    game = TetrisGame(seed=12)
+    batch = BatchTetris(1, seed=12)
+    batch.piece[0] = SHAPE_TYPES.index(game.current_piece.shape_type)
+    script = random.Random(12)
+    for _ in range(20000):
+        batch.next_piece[0] = SHAPE_TYPES.index(game.next_piece.shape_type)
+        action = script.choice([0, 1, 2, None, None, None])
+        if action is not None:
+            game.apply(ACTIONS[action])
+            batch.step([action])
+        game.tick()
+        batch.tick()
+        if game.game_over:
+            break
+    assert game.pieces_placed > 10
+    assert batch.score[0] == game.score and batch.game_over[0] == game.game_over
+    assert batch.y[0] == game.current_piece.y or game.game_over
+    print("✓ Fixed timestep works")
+
+
+def test_idle_mode():
+    """Test that pausing and losing focus stop the game and the redraws."""
+    print("Testing idle mode...")
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import time
+    import pygame
+    from main import TetrisApp
+    
+    app = TetrisApp()
+    app.render()
+    assert not app.is_idle() and not app.needs_redraw
+    
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_p))
+    app.handle_events()
+    assert app.paused and app.is_idle() and app.needs_redraw
+    
+    # Paused games ignore moves and time, and draw the pause screen once
+    piece = app.game.current_piece
+    position = (piece.x, piece.y)
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+    app.handle_events()
+    time.sleep(0.05)
+    app.update()
+    assert (piece.x, piece.y) == position and app.game.ticks == 0
+    app.render()
+    assert not app.needs_redraw
+    
+    # Waiting returns as soon as an event arrives
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_p))
+    pygame.event.post(pygame.event.Event(pygame.WINDOWFOCUSLOST))
+    app.wait_for_events()
+    assert not app.paused and not app.focused and app.is_idle()
+    pygame.event.post(pygame.event.Event(pygame.WINDOWFOCUSGAINED))
+    app.wait_for_events()
+    assert not app.is_idle()
+    
+    app.game.game_over = True
+    assert app.is_idle()
+    pygame.quit()
+    print("✓ Idle mode works")
+
+
+def test_column_heights():
+    """Test incremental column heights, holes and drop distances."""
+    print("Testing column heights...")
+    
+    def recount(board):
+        heights, holes = [], []
+        for x in range(BOARD_WIDTH):
+            column = [row[x] is not None for row in board.grid]
+            top = column.index(True) if True in column else BOARD_HEIGHT
+            heights.append(BOARD_HEIGHT - top)
+            holes.append(column[top:].count(False))
+        return heights, holes
+    
+    rng = random.Random(14)
+    for board_class in (Board, BitBoard):
+        for seed in range(10):
+            game = TetrisGame(board=board_class(), seed=seed)
+            while not game.game_over and game.pieces_placed < 120:
+                piece = game.current_piece
+                board = game.board
+                for rotation, masks in enumerate(PIECE_TABLE[piece.shape_type]):
+                    x = rng.randint(masks.min_x, masks.max_x)
+                    y = rng.randint(-1, BOARD_HEIGHT - 1)
+                    if board.fits(piece.shape_type, rotation, x, y):
+                        distance = 0
+                        while board.fits(piece.shape_type, rotation, x, y + distance + 1):
+                            distance += 1
+                        assert board.drop_distance(piece.shape_type, rotation, x, y) == distance
+                
+                # Random placements include tucks that fill holes
+                for move in rng.choice(find_placements(board, piece)).moves:
+                    game.apply(move)
+                assert (game.board.heights, game.board.holes) == recount(game.board)
+    
+    board = Board()
+    board.set_cell(0, BOARD_HEIGHT - 1, 'I')
+    board.set_cell(0, BOARD_HEIGHT - 4, 'I')
+    assert board.heights[0] == 4 and board.holes[0] == 2
+    print("✓ Column heights work")
+
+
+def test_row_counts():
+    """Test that clearing only touched rows matches a full-board scan."""
+    print("Testing row fill counts...")
+    rng = random.Random(15)
+    masks = PIECE_TABLE['I'][1]
+    piece = Tetromino('I')
+    piece.rotation = 1
+    
+    for board_class in (Board, BitBoard):
+        for _ in range(200):
+            # A random stack with a well for a vertical I; some rows are
+            # complete but for the well
+            board = board_class()
+            x = rng.randint(masks.min_x, masks.max_x)
+            well = masks.cells[x][0][1]
+            for y in range(BOARD_HEIGHT - rng.randint(1, 12), BOARD_HEIGHT):
+                full = rng.random() < 0.5
+                for col in range(BOARD_WIDTH):
+                    if col != well and (full or rng.random() < 0.6):
+                        board.set_cell(col, y, rng.choice(SHAPE_TYPES))
+            assert board.clear_lines() == 0
+            
+            expected = [row[:] for row in board.grid]
+            y = board.drop_distance('I', 1, x, 0)
+            board.place_piece(piece, x, y)
+            for dy, col in masks.cells[x]:
+                expected[y + dy][col] = 'I'
+            kept = [row for row in expected if None in row]
+            expected = [[None] * BOARD_WIDTH] * (BOARD_HEIGHT - len(kept)) + kept
+            
+            assert board.clear_lines() == BOARD_HEIGHT - len(kept)
+            assert board.grid == expected
+            assert len({id(row) for row in board.grid}) == BOARD_HEIGHT
+            if board_class is Board:
+                assert board.row_counts == [BOARD_WIDTH - row.count(None) for row in expected]
+    print("✓ Row fill counts work")
+
+
+def test_zobrist_hashing():
+    """Test incremental Zobrist hashes and the transposition table."""
+    print("Testing Zobrist hashing...")
+    rng = random.Random(16)
+    for board_class in (Board, BitBoard):
+        seen = {}
+        for seed in range(5):
+            game = TetrisGame(board=board_class(), seed=seed)
+            while not game.game_over:
+                for move in rng.choice(find_placements(game.board, game.current_piece)).moves:
+                    game.apply(move)
+                assert game.board.zobrist == grid_hash(game.board.grid)
+                seen.setdefault(game.board.zobrist, game.board.occupancy())
+                assert seen[game.board.zobrist] == game.board.occupancy()
+        
+        board = board_class()
+        board.set_cell(3, 5, 'T')
+        board.set_cell(3, 5, 'I')
+        assert board.zobrist == grid_hash(board.grid)
+        board.set_cell(3, 5, None)
+        assert board.zobrist == 0
+    
+    game = TetrisGame(seed=3)
+    assert game.state_hash(include_pieces=False) == game.board.zobrist
+    assert game.state_hash() != game.board.state_hash(game.current_piece.shape_type)
+    
+    table = TranspositionTable(8)
+    assert len(table.keys) == 8
+    table.put(1, 'deep', depth=5)
+    table.put(1 + 4, 'shallow', depth=1)
+    table.put(1 + 8, 'newer', depth=0)
+    # The deep entry survives; the newest shallow one replaced the other
+    assert table.get(1) == 'deep' and table.get(9) == 'newer' and table.get(5) is None
+    table.new_search()
+    table.put(5, 'fresh', depth=0)
+    assert table.get(5) == 'fresh' and table.get(1) == 'deep' and table.get(9) is None
+    stats = table.stats()
+    assert stats['hits'] == 4 and stats['misses'] == 2 and stats['overwrites'] == 2
+    print("✓ Zobrist hashing works")
+
+
+def test_snapshot_and_clone():
+    """Test that snapshots and clones continue exactly like the original."""
+    print("Testing snapshot and clone...")
+    
+    def play(game, moves):
+        for move in moves:
+            game.apply(move)
+            game.tick()
+        return (game.board.grid, game.score, game.lines_cleared, game.pieces_placed,
+                game.next_piece.shape_type, game.state_hash(), game.board.heights)
+    
+    script = random.Random(17)
+    moves = [script.choice(ACTIONS) for _ in range(300)]
+    for board_class in (Board, BitBoard):
+        for randomizer in ('uniform', 'bag'):
+            game = TetrisGame(board=board_class(), seed=17, randomizer=randomizer)
+            play(game, moves[:100])
+            snapshot = game.snapshot()
+            clone = game.clone()
+            deep = copy.deepcopy(game)
+            hash(snapshot)
+            
+            # deepcopy shares the read-only lookup tables, not the cells
+            assert deep.board.table is game.board.table
+            assert deep.board.cell_keys is game.board.cell_keys
+            assert deep.board.grid is not game.board.grid
+            
+            expected = play(game, moves[100:])
+            assert play(clone, moves[100:]) == expected
+            assert play(deep, moves[100:]) == expected
+            
+            # The original played on without disturbing the clone's copy
+            game.restore(snapshot)
+            assert game.snapshot() == snapshot
+            assert play(game, moves[100:]) == expected
+            
+            fresh = TetrisGame(board=board_class(), seed=1)
+            fresh.restore(snapshot)
+            assert play(fresh, moves[100:]) == expected
+    print("✓ Snapshot and clone work")
+
+
+def test_game_server():
+    """Test the game server's protocol and its handling of slow clients."""
+    print("Testing game server...")
+    
+    async def scenario():
+        server = GameServer(send_interval=2, stall_timeout=0.0, seed=3)
+        port = await server.start('127.0.0.1', 0)
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        while not server.sessions:
+            await asyncio.sleep(0.01)
+        session = next(iter(server.sessions))
+        
+        # Inputs are applied on the next tick, at most a few per tick
+        writer.write(bytes([ACTIONS.index('move_left')] * 2 + [RESTART]))
+        await writer.drain()
+        while len(session.inputs) < 3:
+            await asyncio.sleep(0.01)
+        x = session.game.current_piece.x
+        server.step()
+        server.step()
+        assert session.game.current_piece.x == x - 2 and not session.inputs
+        
+        (length,) = FRAME_LENGTH.unpack(await reader.readexactly(FRAME_LENGTH.size))
+        state = decode_state(await reader.readexactly(length))
+        game = session.game
+        assert state['tick'] == 2 and state['score'] == game.score and not state['game_over']
+        assert state['piece'] == (game.current_piece.shape_type, game.current_piece.rotation,
+                                  x - 2, game.current_piece.y)
+        assert state['next_piece'] == game.next_piece.shape_type
+        assert state['cells'] == [cell for row in game.board.grid for cell in row]
+        
+        # A bot that plays on for ages still packs into a frame
+        marathon = TetrisGame(seed=4)
+        marathon.score, marathon.lines_cleared = 10 ** 12, 3_000_000
+        marathon.level = 1 + marathon.lines_cleared // 10
+        frame = encode_state(marathon, (1 << 32) + 5)
+        state = decode_state(frame[FRAME_LENGTH.size:])
+        assert (state['tick'], state['score'], state['lines'], state['level']) == (
+            5, 10 ** 12, 3_000_000, 300_001)
+        
+        # A client that stops reading misses frames, then is dropped
+        session.pause_writing()
+        server.step()
+        server.step()
+        assert session.frames_skipped == 1 and server.stalled == 1
+        await asyncio.sleep(0.01)
+        assert not server.sessions
+        
+        # Bytes that aren't inputs end the connection
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(bytes([RESTART + 1]))
+        await writer.drain()
+        while not server.sessions or not next(iter(server.sessions)).inputs:
+            await asyncio.sleep(0.01)
+        session = next(iter(server.sessions))
+        server.step()
+        server.step()
+        assert server.protocol_errors == 1
+        assert not server.sessions and not session.inputs
+        assert await reader.read() == b''
+        
+        server.close()
+        writer.close()
+    
+    asyncio.run(scenario())
+    print("✓ Game server works")
+
+
+def test_delta_stream():
+    """Test that a lossy delta stream keeps a mirror that renders like the game."""
+    print("Testing delta state stream...")
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from utils import Renderer
+    from config import WINDOW_WIDTH, WINDOW_HEIGHT
+    
+    clock = iter(range(10 ** 6))
+    encoder = DeltaEncoder(keyframe_interval=50, history=8, clock=lambda: next(clock) / 60)
+    decoder = DeltaDecoder(history=8)
+    mirror = decoder.mirror
+    game = TetrisGame(seed=19)
+    script = random.Random(19)
+    sizes = {True: [], False: []}
+    delayed = []
+    
+    for frame in range(600):
+        if game.game_over:
+            game.reset()
+        game.apply(script.choice(ACTIONS))
+        game.tick()
+        keyframes = encoder.keyframes
+        data = encoder.encode(game)
+        sizes[encoder.keyframes > keyframes].append(len(data))
+        
+        # Lose some frames and acknowledgements, and deliver some late
+        roll = script.random()
+        if roll < 0.1:
+            continue
+        if roll < 0.15:
+            delayed.append(data)
+            continue
+        acked = decoder.decode(data)
+        assert acked == frame + 1
+        if delayed and roll > 0.9:
+            assert decoder.decode(delayed.pop(0)) is None
+        if script.random() > 0.1:
+            encoder.ack(acked)
+        
+        assert mirror.board.grid == game.board.grid
+        assert mirror.board.heights == game.board.heights
+        piece = game.current_piece
+        assert (mirror.current_piece.shape_type, mirror.current_piece.rotation,
+                mirror.current_piece.x, mirror.current_piece.y) == (
+                piece.shape_type, piece.rotation, piece.x, piece.y)
+        assert (mirror.score, mirror.lines_cleared, mirror.level, mirror.game_over,
+                mirror.next_piece.shape_type) == (
+                game.score, game.lines_cleared, game.level, game.game_over,
+                game.next_piece.shape_type)
+    
+    # A delta frame is never much bigger than a keyframe, and usually tiny
+    assert sizes[True] and max(sizes[False]) <= max(sizes[True]) + 2
+    assert sum(sizes[False]) / len(sizes[False]) < 20
+    stats = encoder.stats()
+    assert stats['frames'] == 600 and stats['keyframes'] == len(sizes[True])
+    assert 0 < stats['bytes_per_second'] < 60 * max(sizes[True])
+    
+    # The stream format is laid out for the default board size only
+    encoder = DeltaEncoder()
+    try:
+        encoder.encode(TetrisGame(seed=34, width=12, height=22))
+        assert False, "delta stream accepted a 12x22 board"
+    except ValueError:
+        pass
+    assert encoder.frame == 0
+    
+    # The mirror draws exactly like the game it follows
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    game_screen = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    Renderer(screen).draw_game(mirror)
+    Renderer(game_screen).draw_game(game)
+    assert pygame.image.tostring(screen, 'RGB') == pygame.image.tostring(game_screen, 'RGB')
+    pygame.quit()
+    print("✓ Delta state stream works")
+
+
+def test_rl_environment():
+    """Test that environment observations match the game and actions play correctly."""
+    print("Testing RL environment...")
+    
+    def check(observation, game):
+        grid = game.board.grid
+        assert (observation['board'] == [[cell is not None for cell in row] for row in grid]).all()
+        assert observation['current'].sum() == 1 and observation['next'].sum() == 1
+        assert SHAPE_TYPES[observation['current'].argmax()] == game.current_piece.shape_type
+        assert SHAPE_TYPES[observation['next'].argmax()] == game.next_piece.shape_type
+        piece = game.current_piece
+        assert list(observation['piece']) == [piece.rotation, piece.x, piece.y]
+        assert list(observation['features']) == (game.board.heights + game.board.holes
+                                                 + [game.level, game.lines_cleared])
+    
+    # Key actions play exactly like the bare game, into the same arrays
+    buffers = allocate_observation()
+    env = TetrisEnv('keys', seed=23, max_steps=2000, observation=buffers)
+    observation, _ = env.reset(seed=23)
+    assert observation is buffers
+    game = TetrisGame(board=BitBoard(), seed=23)
+    script = random.Random(23)
+    for step in range(2000):
+        action = script.randrange(NOOP + 1)
+        observation, reward, terminated, truncated, _ = env.step(action)
+        score = game.score
+        if action != NOOP:
+            game.apply(ACTIONS[action])
+        game.tick()
+        assert observation is buffers and reward == game.score - score
+        assert terminated == game.game_over and truncated == (step == 1999)
+        check(observation, env.game)
+        assert env.game.board.grid == game.board.grid
+        if terminated:
+            break
+    
+    # Every placement in the mask plays and locks one piece
+    env = TetrisEnv('placement', seed=29)
+    observation, _ = env.reset()
+    assert env.action_count == ROTATIONS * BOARD_WIDTH
+    placed = 0
+    while not env.game.game_over:
+        mask = env.action_mask()
+        for action in range(env.action_count):
+            assert (env.placement_moves(action) is not None) == mask[action]
+        if not mask.all():
+            try:
+                env.step(int(mask.argmin()))
+                assert False, "unreachable placement was played"
+            except ValueError:
+                pass
+        pieces = env.game.pieces_placed
+        observation, reward, terminated, _, _ = env.step(script.choice(mask.nonzero()[0]))
+        assert env.game.pieces_placed == pieces + 1
+        check(observation, env.game)
+        placed += 1
+    assert placed > 5 and not env.action_mask().any()
+    print("✓ RL environment works")
+
+
+def test_vector_env():
+    """Test that worker processes step games exactly like local environments."""
+    print("Testing vector environment...")
+    script = random.Random(31)
+    
+    for mode in ('keys', 'placement'):
+        local = [TetrisEnv(mode, seed=31 + i, max_steps=40) for i in range(5)]
+        with VectorEnv(5, workers=2, mode=mode, seed=31, max_steps=40) as envs:
+            observation, _ = envs.reset()
+            for i, env in enumerate(local):
+                env.reset(31 + i)
+            episodes = 0
+            
+            for _ in range(120):
+                if mode == 'keys':
+                    actions = [script.randrange(NOOP + 1) for _ in local]
+                else:
+                    for i, env in enumerate(local):
+                        assert (envs.action_mask[i] == env.action_mask()).all()
+                    actions = [script.choice(env.action_mask().nonzero()[0]) for env in local]
+                observation, rewards, terminated, truncated, _ = envs.step(actions)
+                
+                for i, env in enumerate(local):
+                    expected, reward, done, cut, _ = env.step(actions[i])
+                    assert (rewards[i], terminated[i], truncated[i]) == (reward, done, cut)
+                    # Finished games start over in the workers
+                    if done or cut:
+                        expected, _ = env.reset()
+                        episodes += 1
+                    for name, array in expected.items():
+                        assert (observation[name][i] == array).all()
+            
+            assert episodes >= 5
+    
+    # A worker error reaches the trainer instead of hanging it
+    envs = VectorEnv(2, workers=2, mode='placement', seed=1, timeout=10)
+    envs.reset()
+    try:
+        envs.step([envs.action_mask[0].argmin()] * 2)
+        assert False, "unreachable placement was played"
+    except RuntimeError:
+        pass
+    assert envs.closed
+    print("✓ Vector environment works")
+
+
+def test_beam_agent():
+    """Test beam search scoring, placement inputs and the time budget."""
+    from agents import BeamAgent, DropAgent, HEURISTIC_WEIGHTS, evaluate_board
+    from sim import run_game
+    print("Testing beam search agent...")
+    
+    # Every drop position is reached by its inputs, on both backends
+    for backend in (Board, BitBoard):
+        game = TetrisGame(backend(), seed=41)
+        run_game(game, DropAgent(41), max_pieces=15)
+        board = game.board
+        piece = game.current_piece
+        positions = drop_positions(board, piece.shape_type, piece.rotation, piece.x, piece.y)
+        assert positions
+        for rotation, x, y, turns, shift in positions:
+            trial = game.clone()
+            for _ in range(turns):
+                trial.apply('rotate')
+            for _ in range(abs(shift)):
+                trial.apply('move_right' if shift > 0 else 'move_left')
+            assert (trial.current_piece.rotation, trial.current_piece.x) == (rotation, x)
+            assert trial.current_piece.y + trial.board.drop_distance(
+                trial.current_piece.shape_type, rotation, x, trial.current_piece.y) == y
+    
+    # Scores computed without copying the board match the copied board
+    agent = BeamAgent(time_budget=None)
+    board = game.board
+    piece = Tetromino(game.current_piece.shape_type)
+    for position in drop_positions(board, piece.shape_type, 0, piece.x, piece.y):
+        node = agent.score(board, board.occupancy(), sum(board.holes), piece, position, 0, None)
+        child = board.clone()
+        piece.rotation = position[0]
+        child.place_piece(piece, position[1], position[2])
+        lines = child.clear_lines()
+        if child.is_game_over():
+            assert node is None
+            continue
+        expected = HEURISTIC_WEIGHTS['lines'] * lines + evaluate_board(child)
+        assert abs(node[0] - expected) < 1e-9
+        assert node[1] == lines
+        parent = agent.materialize(node, piece)
+        assert parent[1].zobrist == child.zobrist
+        assert parent[2] == child.occupancy()
+    
+    # A clearing node's occupancy has the piece placed and the line removed
+    board = Board()
+    for x in range(4, BOARD_WIDTH):
+        board.set_cell(x, BOARD_HEIGHT - 1, 'O')
+    board.set_cell(9, BOARD_HEIGHT - 2, 'O')
+    piece = Tetromino('I')
+    position = next(position for position in drop_positions(board, 'I', 0, 0, 0)
+                    if position[:2] == (0, 0))
+    node = agent.score(board, board.occupancy(), sum(board.holes), piece, position, 0, None)
+    child, child_occupancy = node[5]
+    assert node[1] == 1 and child_occupancy != board.occupancy()
+    assert child_occupancy == child.occupancy()
+    assert agent.materialize(node, piece)[2] == child.occupancy()
+    
+    # Without a budget the search is reproducible, and it outplays random drops
+    results = []
+    for _ in range(2):
+        played = TetrisGame(seed=42)
+        run_game(played, BeamAgent(time_budget=None), max_pieces=150)
+        results.append((played.score, played.lines_cleared, played.game_over))
+    assert results[0] == results[1]
+    dropped = TetrisGame(seed=42)
+    run_game(dropped, DropAgent(42), max_pieces=150)
+    assert not results[0][2] and results[0][1] > dropped.lines_cleared
+    
+    # Out of time, the agent still plays a move for every piece
+    agent = BeamAgent(time_budget=0)
+    played = TetrisGame(seed=43)
+    run_game(played, agent, max_pieces=20)
+    stats = agent.stats()
+    assert stats['searches'] == stats['timeouts'] == played.pieces_placed
+    assert stats['mean_depth'] == 0
+    
+    agent = BeamAgent(time_budget=0.05)
+    run_game(TetrisGame(seed=44), agent, max_pieces=20)
+    stats = agent.stats()
+    assert stats['mean_depth'] == 2 and stats['nodes_per_second'] > 0
+    print("✓ Beam search agent works")
+
+
+def test_vector_features():
+    """Test batched placement boards and features against Board."""
+    from agents import VectorAgent, DropAgent
+    from features import (candidate_boards, clear_rows, board_features, score_boards,
+                          weight_vector, FEATURES)
+    from sim import run_game
+    print("Testing vectorized board features...")
+    
+    rng = random.Random(51)
+    for seed in range(20):
+        game = TetrisGame(seed=seed)
+        run_game(game, DropAgent(seed), max_pieces=rng.randint(0, 50))
+        if game.game_over:
+            continue
+        for _ in range(rng.randint(0, 3)):
+            game.apply('rotate')
+        piece = game.current_piece
+        expected = drop_positions(game.board, piece.shape_type, piece.rotation, piece.x, piece.y)
+        positions, boards, locked_out = candidate_boards(game.board, piece)
+        assert len(positions) == len(expected)
+        boards, lines = clear_rows(boards)
+        features = board_features(boards, lines)
+        
+        placed = Tetromino(piece.shape_type)
+        for i, (rotation, x, y, _, _) in enumerate(positions.tolist()):
+            board = game.board.clone()
+            placed.rotation = rotation
+            board.place_piece(placed, x, y)
+            cleared = board.clear_lines()
+            assert tuple(boards[i]) == board.occupancy()
+            assert locked_out[i] == (y + PIECE_TABLE[piece.shape_type][rotation].top <= 0)
+            heights = board.heights
+            bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+            assert list(features[i]) == [sum(heights), sum(board.holes), bumpiness,
+                                         features[i][3], cleared]
+    
+    # Wells: columns below both neighbours, with the walls as full height
+    board = Board()
+    for x, height in enumerate([3, 0, 3, 3, 1, 2, 2, 2, 2, 0]):
+        for y in range(BOARD_HEIGHT - height, BOARD_HEIGHT):
+            board.set_cell(x, y, 'O')
+    features = board_features(np.array([board.occupancy()]))
+    assert features[0][FEATURES.index('wells')] == 3 + 1 + 2
+    assert score_boards(np.array([board.occupancy()]), {'holes': 1.0, 'height': 2.0})[0] == 36
+    try:
+        weight_vector({'height': 1.0, 'tetrises': 1.0})
+        assert False, "unknown feature was accepted"
+    except ValueError:
+        pass
+    
+    # One batch per piece is enough to play well
+    game = TetrisGame(seed=52)
+    run_game(game, VectorAgent(), max_pieces=150)
+    dropped = TetrisGame(seed=52)
+    run_game(dropped, DropAgent(52), max_pieces=150)
+    assert game.lines_cleared > dropped.lines_cleared
+    try:
+        VectorAgent().act(TetrisGame(seed=53, width=12))
+        assert False, "vector agent played on a 12x20 board"
+    except ValueError:
+        pass
+    
+    # Only the vector agent needs NumPy
+    imported = subprocess.run(
+        [sys.executable, '-c', "import sys, sim, harness, agents; print('numpy' in sys.modules)"],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    assert imported.stdout.strip() == 'False'
+    print("✓ Vectorized board features work")
+
+
+def test_board_geometry():
+    """Test boards and games of sizes other than the default."""
+    from agents import BeamAgent
+    from features import score_placements
+    from sim import run_game
+    print("Testing board geometry...")
+    
+    # Board sizes are per instance, so different sizes live side by side
+    small, large = Board(), Board(100, 1000)
+    assert (small.width, small.height) == (BOARD_WIDTH, BOARD_HEIGHT)
+    assert len(large.grid) == 1000 and len(large.grid[0]) == 100
+    assert small.table is PIECE_TABLE and large.table is not PIECE_TABLE
+    
+    game = TetrisGame(seed=61, width=100, height=1000)
+    assert game.current_piece.x == 49
+    game.hard_drop()
+    assert max(game.board.heights) <= 2 and game.board.zobrist == grid_hash(game.board.grid)
+    assert all(0 <= placement.x < 100 for placement in
+               find_placements(game.board, game.current_piece))
+    try:
+        score_placements(game, {'height': -1.0})
+        assert False, "vectorized features accepted a 100x1000 board"
+    except ValueError:
+        pass
+    
+    # Both backends play the same game on a custom size, clearing lines
+    games = [TetrisGame(backend(13, 30), seed=62) for backend in (Board, BitBoard)]
+    for played in games:
+        run_game(played, BeamAgent(seed=62, time_budget=None), max_pieces=120)
+    board, bitboard = games[0].board, games[1].board
+    assert games[0].lines_cleared == games[1].lines_cleared > 0
+    assert board.grid == bitboard.grid and board.occupancy() == bitboard.occupancy()
+    assert board.heights == bitboard.heights and board.holes == bitboard.holes
+    assert board.zobrist == bitboard.zobrist == grid_hash(board.grid)
+    clone = bitboard.clone()
+    clone.reset()
+    assert len(clone.rows) == 30 and clone.grid[0] == [None] * 13
+    
+    # The renderer draws any board size, incrementally or not
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from utils import Renderer
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((400, 500))
+    full_screen = pygame.Surface((400, 500))
+    incremental = Renderer(screen, incremental=True, board_width=13, board_height=30,
+                           cell_size=12)
+    full = Renderer(full_screen, board_width=13, board_height=30, cell_size=12)
+    game = TetrisGame(seed=63, width=13, height=30)
+    for frame in range(200):
+        if frame % 3 == 2:
+            game.hard_drop()
+        else:
+            game.move_left() if frame % 2 else game.rotate()
+        incremental.draw_game(game)
+        full.draw_game(game)
+    assert pygame.image.tostring(screen, 'RGB') == pygame.image.tostring(full_screen, 'RGB')
+    assert incremental.score_x == full.score_x < 280
+    pygame.quit()
+    print("✓ Board geometry works")
+
+
+def test_startup_time():
+    """Test the time-to-first-frame measurement and the lean startup path."""
+    from startup import measure_startup, parse_import_times
+    print("Testing startup timing...")
+    
+    report = measure_startup(headless=True)
+    phases = report['interpreter'] + report['imports'] + report['init'] + report['draw']
+    assert 0 < report['imports'] < report['first_frame']
+    assert abs(phases - report['first_frame']) < 1e-6
+    
+    # The first frame needs the game and renderer, not the agents, replays
+    # or the profiler
+    modules = report['modules']
+    assert {'main', 'game', 'utils', 'pygame'} <= set(modules)
+    assert not {'agents', 'features', 'replay', 'profiler'} & set(modules)
+    
+    times = parse_import_times([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       300 |        300 |     numpy.linalg",
+        "import time:       200 |        500 |   numpy",
+        "import time:      1000 |       1500 | pygame",
+    ])
+    assert times == {'pygame': 0.001, 'numpy': 0.0005}
+    print("✓ Startup timing works")
+
+
 def run_all_tests():
     """Run all tests."""
     print("=" * 50)
@@ -169,6 +1282,34 @@ def run_all_tests():
     test_game_scoring()
     test_level_progression()
     test_game_reset()
+    test_bitboard_line_clearing()
+    test_bitboard_matches_board()
+    test_piece_table()
+    test_soft_drop_locks_piece()
+    test_batch_matches_game()
+    test_headless_simulation()
+    test_incremental_rendering()
+    test_render_caches()
+    test_placements()
+    test_seeded_pieces()
+    test_replay_round_trip()
+    test_evaluation_harness()
+    test_benchmark_compare()
+    test_frame_profiler()
+    test_fixed_timestep()
+    test_idle_mode()
+    test_column_heights()
+    test_row_counts()
+    test_zobrist_hashing()
+    test_snapshot_and_clone()
+    test_game_server()
+    test_delta_stream()
+    test_rl_environment()
+    test_vector_env()
+    test_beam_agent()
+    test_vector_features()
+    test_board_geometry()
+    test_startup_time()
     
     print("=" * 50)
     print("✓ All tests passed!")
@@ -0,0 +1,128 @@
+# Tetris Transposition Table (bounded cache of values by state hash)
+
+from config import TRANSPOSITION_TABLE_SIZE
+
+
+class TranspositionTable:
+    """
+    Fixed-size cache of search values keyed by 64-bit Zobrist hashes.
+    
+    Each slot is a pair of entries. The first keeps the most valuable
+    entry, the one searched deepest, unless it was stored during an
+    earlier search (see new_search). The second always takes the latest
+    entry that the first one rejected, so recent states are cached too.
+    Lookups check both.
+    """
+    
+    def __init__(self, size=TRANSPOSITION_TABLE_SIZE):
+        """
+        Initialize an empty table.
+        
+        Args:
+            size: Number of entries; rounded up to a power of two (at least 2)
+        """
+        slots = 1
+        while slots * 2 < size:
+            slots *= 2
+        self.mask = slots - 1
+        
+        # Entry 2i is the depth-preferred one of slot i, 2i + 1 the latest
+        self.keys = [None] * (slots * 2)
+        self.values = [None] * (slots * 2)
+        self.depths = [0] * (slots * 2)
+        self.generations = [0] * (slots * 2)
+        self.generation = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+    
+    def __len__(self):
+        """Get the number of entries in use."""
+        return sum(1 for key in self.keys if key is not None)
+    
+    def new_search(self):
+        """Age the stored entries so deep results of old searches get replaced."""
+        self.generation += 1
+    
+    def get(self, key, default=None):
+        """
+        Look up the value stored for a hash.
+        
+        Args:
+            key: 64-bit state hash
+            default: Value returned when the hash isn't in the table
+        
+        Returns:
+            The stored value, or default
+        """
+        index = (key & self.mask) * 2
+        keys = self.keys
+        if keys[index] == key:
+            self.hits += 1
+            return self.values[index]
+        if keys[index + 1] == key:
+            self.hits += 1
+            return self.values[index + 1]
+        self.misses += 1
+        return default
+    
+    def put(self, key, value, depth=0):
+        """
+        Store a value for a hash.
+        
+        Args:
+            key: 64-bit state hash
+            value: Value to store
+            depth: Search depth the value was computed with; deeper values
+                   are kept in preference to shallower ones
+        """
+        index = (key & self.mask) * 2
+        keys = self.keys
+        self.stores += 1
+        
+        # The deep entry stays unless the new one is at least as deep, or it
+        # is left over from an earlier search
+        if (keys[index] == key or keys[index] is None or depth >= self.depths[index]
+                or self.generations[index] != self.generation):
+            if keys[index] is not None and keys[index] != key:
+                # The deep entry is demoted rather than lost
+                self.replace(index + 1, keys[index], self.values[index],
+                             self.depths[index], self.generations[index])
+                keys[index] = None
+            self.replace(index, key, value, depth, self.generation)
+        else:
+            self.replace(index + 1, key, value, depth, self.generation)
+    
+    def replace(self, index, key, value, depth, generation):
+        """Write one entry, counting it if it evicts a different key."""
+        if self.keys[index] is not None and self.keys[index] != key:
+            self.overwrites += 1
+        self.keys[index] = key
+        self.values[index] = value
+        self.depths[index] = depth
+        self.generations[index] = generation
+    
+    def clear(self):
+        """Remove every entry and reset the statistics."""
+        self.__init__(len(self.keys))
+    
+    def stats(self):
+        """
+        Get the usage statistics, for tuning the table size.
+        
+        Returns:
+            Dictionary with hits, misses, hit rate, stores, overwrites of
+            other states, and the fraction of entries in use
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.keys),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+            'fill': len(self) / len(self.keys),
+        }
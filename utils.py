@@ -1,8 +1,10 @@
 # Tetris Game Utilities (Rendering)
 
 import pygame
+from collections import OrderedDict
+from functools import cached_property
 from config import (
-    WINDOW_WIDTH, WINDOW_HEIGHT, CELL_SIZE,
+    CELL_SIZE,
     BOARD_WIDTH, BOARD_HEIGHT,
     COLOR_BLACK, COLOR_WHITE, COLOR_GRAY, COLOR_DARK_GRAY, COLOR_LIGHT_GRAY,
     COLORS,
@@ -10,38 +12,294 @@ from config import (
     NEXT_PIECE_X, NEXT_PIECE_Y,
     SCORE_X, SCORE_Y,
     LEVEL_X, LEVEL_Y,
+    TEXT_CACHE_SIZE, GHOST_PIECE,
 )
 
 
 class Renderer:
     """Handles all rendering for the Tetris game."""
     
-    def __init__(self, screen):
+    def __init__(self, screen, incremental=False, board_width=BOARD_WIDTH,
+                 board_height=BOARD_HEIGHT, cell_size=CELL_SIZE):
         """
         Initialize the renderer.
         
         Args:
             screen: Pygame surface to render to
+            incremental: If True, draw_game only repaints what changed since
+                         the previous frame onto a persistent back buffer
+            board_width: Columns of the boards drawn
+            board_height: Rows of the boards drawn
+            cell_size: Size of a board cell in pixels
         """
         self.screen = screen
-        self.font_large = pygame.font.Font(None, 36)
-        self.font_medium = pygame.font.Font(None, 28)
-        self.font_small = pygame.font.Font(None, 24)
+        self.incremental = incremental
+        self.board_width = board_width
+        self.board_height = board_height
+        self.cell_size = cell_size
+        
+        # The HUD stays to the right of the board, however wide it is
+        self.hud_offset = board_width * cell_size - BOARD_WIDTH * CELL_SIZE
+        self.next_piece_x = NEXT_PIECE_X + self.hud_offset
+        self.score_x = SCORE_X + self.hud_offset
+        self.level_x = LEVEL_X + self.hud_offset
+        
+        # Surface the draw methods paint on
+        if incremental:
+            self.canvas = pygame.Surface(screen.get_size()).convert()
+        else:
+            self.canvas = screen
+        
+        # State shown by the previous incremental frame
+        self.shown_hud = None
+        self.shown_board_key = None
+        self.shown_cells = None
+        self.shown_piece = None
+        
+        # Fonts are loaded on first use (see the font_* properties), so
+        # those only needed for game over, pause or the profiler HUD never
+        # hold up the first frame
+        self.text_cache = OrderedDict()
+        
+        # Pre-rendered surfaces reused every frame
+        self.block_sprites = {
+            shape_type: self.create_block_sprite(color) for shape_type, color in COLORS.items()
+        }
+        self.ghost_sprites = {
+            shape_type: self.create_ghost_sprite(color) for shape_type, color in COLORS.items()
+        }
+        self.block_positions = [
+            [(BOARD_OFFSET_X + x * cell_size + 1, BOARD_OFFSET_Y + y * cell_size + 1)
+             for x in range(board_width)]
+            for y in range(board_height)
+        ]
+        self.board_background = self.create_board_background()
+        self.game_over_overlay = pygame.Surface(screen.get_size()).convert()
+        self.game_over_overlay.set_alpha(200)
+        self.game_over_overlay.fill(COLOR_BLACK)
+    
+    @cached_property
+    def font_large(self):
+        """Font of the game over and pause titles."""
+        return pygame.font.Font(None, 36)
+    
+    @cached_property
+    def font_medium(self):
+        """Font of the HUD labels."""
+        return pygame.font.Font(None, 28)
+    
+    @cached_property
+    def font_small(self):
+        """Font of the HUD values and hints."""
+        return pygame.font.Font(None, 24)
+    
+    @cached_property
+    def font_tiny(self):
+        """Font of text panels such as the profiler HUD."""
+        return pygame.font.Font(None, 18)
+    
+    def create_block_sprite(self, color):
+        """
+        Pre-render a single block.
+        
+        Args:
+            color: Fill color of the block
+        
+        Returns:
+            Surface holding the block with its outline
+        """
+        size = max(self.cell_size - 2, 1)
+        sprite = pygame.Surface((size, size)).convert()
+        sprite.fill(color)
+        pygame.draw.rect(sprite, COLOR_LIGHT_GRAY, sprite.get_rect(), 1)
+        return sprite
+    
+    def create_ghost_sprite(self, color):
+        """
+        Pre-render a single block of the ghost piece.
+        
+        Args:
+            color: Outline color of the block
+        
+        Returns:
+            Surface holding the outlined block
+        """
+        size = max(self.cell_size - 2, 1)
+        sprite = pygame.Surface((size, size)).convert()
+        sprite.fill(COLOR_BLACK)
+        pygame.draw.rect(sprite, color, sprite.get_rect(), 2)
+        return sprite
+    
+    def create_board_background(self):
+        """
+        Pre-render the empty board with its grid outlines.
+        
+        Returns:
+            Surface covering the board area
+        """
+        cell_size = self.cell_size
+        background = pygame.Surface((self.board_width * cell_size,
+                                     self.board_height * cell_size)).convert()
+        background.fill(COLOR_BLACK)
+        
+        for y in range(self.board_height):
+            for x in range(self.board_width):
+                rect = pygame.Rect(x * cell_size, y * cell_size, cell_size, cell_size)
+                pygame.draw.rect(background, COLOR_DARK_GRAY, rect, 1)
+        
+        return background
     
     def draw_game(self, game):
         """
-        Draw the entire game state.
+        Draw the game state.
         
         Args:
             game: TetrisGame object
+        
+        Returns:
+            List of screen rectangles that changed, for pygame.display.update
+        """
+        if self.incremental:
+            return self.draw_changes(game)
+        
+        self.draw_frame(game)
+        return [self.screen.get_rect()]
+    
+    def draw_frame(self, game):
         """
-        self.screen.fill(COLOR_BLACK)
+        Draw the entire game state onto the canvas.
+        
+        Args:
+            game: TetrisGame object
+        """
+        self.canvas.fill(COLOR_BLACK)
         
         self.draw_board(game.board)
+        self.draw_ghost_piece(game.current_piece, game.board)
         self.draw_current_piece(game.current_piece, game.board)
         self.draw_border()
         self.draw_ui(game)
     
+    def draw_changes(self, game):
+        """
+        Repaint only the cells and HUD fields that changed since the last
+        frame onto the back buffer, then copy those regions to the screen.
+        
+        Args:
+            game: TetrisGame object
+        
+        Returns:
+            List of screen rectangles that changed
+        """
+        hud = (game.next_piece.shape_type, game.score, game.level, game.game_over)
+        piece = game.current_piece
+        piece_cells = self.piece_cells(piece)
+        ghost_cells = self.ghost_cells(piece, game.board) - piece_cells
+        shown_piece = (piece.shape_type, piece_cells, ghost_cells)
+        
+        # The game over overlay covers everything, so toggling it repaints all
+        if self.shown_hud is None or hud[3] != self.shown_hud[3]:
+            self.draw_frame(game)
+            self.shown_hud = hud
+            self.shown_board_key = None
+            self.shown_cells = [row[:] for row in game.board.grid]
+            self.shown_piece = shown_piece
+            self.screen.blit(self.canvas, (0, 0))
+            return [self.screen.get_rect()]
+        
+        dirty_cells = set()
+        
+        # The board only changes when a piece locks or the grid is replaced
+        board_key = (id(game.board.grid), game.pieces_placed)
+        if board_key != self.shown_board_key:
+            grid = game.board.grid
+            for y, row in enumerate(grid):
+                shown_row = self.shown_cells[y]
+                if row != shown_row:
+                    for x in range(len(row)):
+                        if row[x] != shown_row[x]:
+                            dirty_cells.add((x, y))
+                    self.shown_cells[y] = row[:]
+            self.shown_board_key = board_key
+        
+        if shown_piece != self.shown_piece:
+            dirty_cells |= self.shown_piece[1] | self.shown_piece[2] | piece_cells | ghost_cells
+            self.shown_piece = shown_piece
+        
+        rects = []
+        for x, y in dirty_cells:
+            if (x, y) in piece_cells:
+                rects.append(self.draw_cell(x, y, piece.shape_type))
+            elif self.shown_cells[y][x] is None and (x, y) in ghost_cells:
+                rects.append(self.draw_cell(x, y, piece.shape_type, ghost=True))
+            else:
+                rects.append(self.draw_cell(x, y, self.shown_cells[y][x]))
+        if rects:
+            self.draw_border()
+        
+        if hud[0] != self.shown_hud[0]:
+            rect = pygame.Rect(self.next_piece_x, NEXT_PIECE_Y, 4 * CELL_SIZE, 4 * CELL_SIZE)
+            self.canvas.fill(COLOR_BLACK, rect)
+            self.draw_next_piece(game.next_piece)
+            rects.append(rect)
+        
+        if hud[1] != self.shown_hud[1]:
+            rects.append(self.draw_value(game.score, self.score_x, SCORE_Y))
+        
+        if hud[2] != self.shown_hud[2]:
+            rects.append(self.draw_value(game.level, self.level_x, LEVEL_Y))
+        
+        self.shown_hud = hud
+        
+        for rect in rects:
+            self.screen.blit(self.canvas, rect, rect)
+        return rects
+    
+    def draw_cell(self, x, y, shape_type, ghost=False):
+        """
+        Repaint a single board cell, including its grid outline.
+        
+        Args:
+            x: Column position
+            y: Row position
+            shape_type: Shape type of the block in the cell, or None if empty
+            ghost: If True, draw the block as part of the ghost piece
+        
+        Returns:
+            Screen rectangle covered by the cell
+        """
+        cell_size = self.cell_size
+        rect = pygame.Rect(
+            BOARD_OFFSET_X + x * cell_size,
+            BOARD_OFFSET_Y + y * cell_size,
+            cell_size,
+            cell_size
+        )
+        self.canvas.blit(self.board_background, rect,
+                         rect.move(-BOARD_OFFSET_X, -BOARD_OFFSET_Y))
+        if ghost:
+            self.canvas.blit(self.ghost_sprites[shape_type], self.block_positions[y][x])
+        elif shape_type is not None:
+            self.draw_block(x, y, shape_type)
+        return rect
+    
+    def draw_value(self, value, x, y):
+        """
+        Repaint a HUD number, clearing the area the old number covered.
+        
+        Args:
+            value: Number to draw
+            x: Left position
+            y: Top position
+        
+        Returns:
+            Screen rectangle covered by the number
+        """
+        rect = pygame.Rect(x, y, self.canvas.get_width() - x, self.font_small.get_linesize())
+        self.canvas.fill(COLOR_BLACK, rect)
+        self.canvas.blit(self.render_text(self.font_small, str(value), COLOR_LIGHT_GRAY), (x, y))
+        return rect
+    
     def draw_board(self, board):
         """
         Draw the game board grid.
@@ -50,21 +308,64 @@ class Renderer:
             board: Board object
         """
         # Draw grid background
-        for y in range(BOARD_HEIGHT):
-            for x in range(BOARD_WIDTH):
-                rect = pygame.Rect(
-                    BOARD_OFFSET_X + x * CELL_SIZE,
-                    BOARD_OFFSET_Y + y * CELL_SIZE,
-                    CELL_SIZE,
-                    CELL_SIZE
-                )
-                pygame.draw.rect(self.screen, COLOR_DARK_GRAY, rect, 1)
+        self.canvas.blit(self.board_background, (BOARD_OFFSET_X, BOARD_OFFSET_Y))
         
         # Draw placed blocks
-        for y in range(BOARD_HEIGHT):
-            for x in range(BOARD_WIDTH):
-                if board.grid[y][x] is not None:
-                    self.draw_block(x, y, board.grid[y][x])
+        sprites = self.block_sprites
+        self.canvas.blits(
+            [(sprites[shape_type], self.block_positions[y][x])
+             for y, row in enumerate(board.grid)
+             for x, shape_type in enumerate(row) if shape_type is not None],
+            False
+        )
+    
+    def piece_cells(self, piece, drop=0):
+        """
+        Get the board cells a piece covers, ignoring those above the board.
+        
+        Args:
+            piece: Tetromino object
+            drop: Rows to move the piece down by first
+        
+        Returns:
+            Frozenset of (x, y) cells
+        """
+        y = piece.y + drop
+        return frozenset(
+            (piece.x + dx, y + dy) for dx, dy in piece.get_blocks() if y + dy >= 0
+        )
+    
+    def ghost_cells(self, piece, board):
+        """
+        Get the cells of the ghost piece, where the piece would land.
+        
+        Args:
+            piece: Tetromino object
+            board: Board object the piece falls on
+        
+        Returns:
+            Frozenset of (x, y) cells (empty when GHOST_PIECE is off)
+        """
+        if not GHOST_PIECE:
+            return frozenset()
+        
+        drop = board.drop_distance(piece.shape_type, piece.rotation, piece.x, piece.y)
+        return self.piece_cells(piece, drop)
+    
+    def draw_ghost_piece(self, piece, board):
+        """
+        Draw the outline of where the current piece would land.
+        
+        Args:
+            piece: Tetromino object
+            board: Board object the piece falls on
+        """
+        sprite = self.ghost_sprites[piece.shape_type]
+        self.canvas.blits(
+            [(sprite, self.block_positions[y][x])
+             for x, y in self.ghost_cells(piece, board) - self.piece_cells(piece)],
+            False
+        )
     
     def draw_current_piece(self, piece, board):
         """
@@ -90,25 +391,17 @@ class Renderer:
             y: Row position
             shape_type: Shape type (for color)
         """
-        color = COLORS.get(shape_type, COLOR_WHITE)
-        rect = pygame.Rect(
-            BOARD_OFFSET_X + x * CELL_SIZE + 1,
-            BOARD_OFFSET_Y + y * CELL_SIZE + 1,
-            CELL_SIZE - 2,
-            CELL_SIZE - 2
-        )
-        pygame.draw.rect(self.screen, color, rect)
-        pygame.draw.rect(self.screen, COLOR_LIGHT_GRAY, rect, 1)
+        self.canvas.blit(self.block_sprites[shape_type], self.block_positions[y][x])
     
     def draw_border(self):
         """Draw the border around the game board."""
         border_rect = pygame.Rect(
             BOARD_OFFSET_X - 2,
             BOARD_OFFSET_Y - 2,
-            BOARD_WIDTH * CELL_SIZE + 4,
-            BOARD_HEIGHT * CELL_SIZE + 4
+            self.board_width * self.cell_size + 4,
+            self.board_height * self.cell_size + 4
         )
-        pygame.draw.rect(self.screen, COLOR_WHITE, border_rect, 3)
+        pygame.draw.rect(self.canvas, COLOR_WHITE, border_rect, 3)
     
     def draw_ui(self, game):
         """
@@ -118,25 +411,25 @@ class Renderer:
             game: TetrisGame object
         """
         # Draw "Next Piece" label
-        next_label = self.font_medium.render("NEXT", True, COLOR_WHITE)
-        self.screen.blit(next_label, (NEXT_PIECE_X, NEXT_PIECE_Y - 30))
+        next_label = self.render_text(self.font_medium, "NEXT", COLOR_WHITE)
+        self.canvas.blit(next_label, (self.next_piece_x, NEXT_PIECE_Y - 30))
         
         # Draw next piece preview
         self.draw_next_piece(game.next_piece)
         
         # Draw score
-        score_label = self.font_medium.render("SCORE", True, COLOR_WHITE)
-        self.screen.blit(score_label, (SCORE_X, SCORE_Y - 30))
+        score_label = self.render_text(self.font_medium, "SCORE", COLOR_WHITE)
+        self.canvas.blit(score_label, (self.score_x, SCORE_Y - 30))
         
-        score_text = self.font_small.render(str(game.score), True, COLOR_LIGHT_GRAY)
-        self.screen.blit(score_text, (SCORE_X, SCORE_Y))
+        score_text = self.render_text(self.font_small, str(game.score), COLOR_LIGHT_GRAY)
+        self.canvas.blit(score_text, (self.score_x, SCORE_Y))
         
         # Draw level
-        level_label = self.font_medium.render("LEVEL", True, COLOR_WHITE)
-        self.screen.blit(level_label, (LEVEL_X, LEVEL_Y - 30))
+        level_label = self.render_text(self.font_medium, "LEVEL", COLOR_WHITE)
+        self.canvas.blit(level_label, (self.level_x, LEVEL_Y - 30))
         
-        level_text = self.font_small.render(str(game.level), True, COLOR_LIGHT_GRAY)
-        self.screen.blit(level_text, (LEVEL_X, LEVEL_Y))
+        level_text = self.render_text(self.font_small, str(game.level), COLOR_LIGHT_GRAY)
+        self.canvas.blit(level_text, (self.level_x, LEVEL_Y))
         
         # Draw game over message
         if game.game_over:
@@ -149,36 +442,138 @@ class Renderer:
         Args:
             piece: Tetromino object
         """
-        preview_x = NEXT_PIECE_X
+        preview_x = self.next_piece_x
         preview_y = NEXT_PIECE_Y
+        sprite = self.block_sprites[piece.shape_type]
         
-        for dx, dy in piece.get_blocks():
-            x = preview_x + dx * CELL_SIZE
-            y = preview_y + dy * CELL_SIZE
-            
-            color = COLORS.get(piece.shape_type, COLOR_WHITE)
-            rect = pygame.Rect(x, y, CELL_SIZE - 2, CELL_SIZE - 2)
-            pygame.draw.rect(self.screen, color, rect)
-            pygame.draw.rect(self.screen, COLOR_LIGHT_GRAY, rect, 1)
+        self.canvas.blits(
+            [(sprite, (preview_x + dx * CELL_SIZE, preview_y + dy * CELL_SIZE))
+             for dx, dy in piece.get_blocks()],
+            False
+        )
     
     def draw_game_over(self):
         """Draw the game over screen."""
         # Semi-transparent overlay
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        overlay.set_alpha(200)
-        overlay.fill(COLOR_BLACK)
-        self.screen.blit(overlay, (0, 0))
+        self.canvas.blit(self.game_over_overlay, (0, 0))
         
         # Game over text
-        game_over_text = self.font_large.render("GAME OVER", True, COLOR_WHITE)
+        width, height = self.canvas.get_size()
+        game_over_text = self.render_text(self.font_large, "GAME OVER", COLOR_WHITE)
         text_rect = game_over_text.get_rect(
-            center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 30)
+            center=(width // 2, height // 2 - 30)
         )
-        self.screen.blit(game_over_text, text_rect)
+        self.canvas.blit(game_over_text, text_rect)
         
         # Restart instruction
-        restart_text = self.font_small.render("Press SPACE to restart", True, COLOR_LIGHT_GRAY)
+        restart_text = self.render_text(self.font_small, "Press SPACE to restart", COLOR_LIGHT_GRAY)
         restart_rect = restart_text.get_rect(
-            center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 30)
+            center=(width // 2, height // 2 + 30)
         )
-        self.screen.blit(restart_text, restart_rect)
+        self.canvas.blit(restart_text, restart_rect)
+    
+    def create_text_panel(self, lines):
+        """
+        Render lines of text onto an opaque panel.
+        
+        The text is rendered directly rather than through the text cache,
+        since panel contents (such as timings) rarely repeat.
+        
+        Args:
+            lines: List of strings, one per row
+        
+        Returns:
+            Panel surface
+        """
+        rendered = [self.font_tiny.render(line, True, COLOR_LIGHT_GRAY) for line in lines]
+        line_height = self.font_tiny.get_linesize()
+        width = max(surface.get_width() for surface in rendered) + 4
+        panel = pygame.Surface((width, line_height * len(rendered) + 4)).convert()
+        panel.fill(COLOR_BLACK)
+        panel.blits([(surface, (2, 2 + i * line_height)) for i, surface in enumerate(rendered)],
+                    False)
+        return panel
+    
+    def draw_overlay(self, surface, x, y):
+        """
+        Draw a surface straight onto the screen, above the game.
+        
+        Overlays are not part of the canvas, so incremental frames never
+        redraw or remember them; call restore() to remove one.
+        
+        Args:
+            surface: Surface to draw
+            x: Screen x position
+            y: Screen y position
+        
+        Returns:
+            Screen rectangle covered by the overlay
+        """
+        return self.screen.blit(surface, (x, y))
+    
+    def restore(self, rect):
+        """
+        Repaint a screen region from the canvas, removing any overlay on it.
+        
+        Args:
+            rect: Screen rectangle to repaint
+        
+        Returns:
+            The repainted rectangle
+        """
+        if self.incremental:
+            self.screen.blit(self.canvas, rect, rect)
+        return rect
+    
+    def draw_paused(self):
+        """
+        Draw the pause screen over the current frame, straight onto the screen.
+        
+        Returns:
+            Screen rectangle that changed
+        """
+        rect = self.restore(self.screen.get_rect())
+        self.screen.blit(self.game_over_overlay, (0, 0))
+        
+        paused_text = self.render_text(self.font_large, "PAUSED", COLOR_WHITE)
+        self.screen.blit(paused_text, paused_text.get_rect(
+            center=(rect.centerx, rect.centery - 30)
+        ))
+        
+        resume_text = self.render_text(self.font_small, "Press P to resume", COLOR_LIGHT_GRAY)
+        self.screen.blit(resume_text, resume_text.get_rect(
+            center=(rect.centerx, rect.centery + 30)
+        ))
+        return rect
+    
+    def invalidate(self):
+        """Make the next draw_game repaint the whole screen."""
+        self.shown_hud = None
+    
+    def render_text(self, font, text, color):
+        """
+        Render text through the text cache.
+        
+        Surfaces are kept keyed by (font, text, color); the least recently
+        used entry is evicted once TEXT_CACHE_SIZE surfaces are cached.
+        
+        Args:
+            font: Pygame font to render with
+            text: String to render
+            color: Text color
+        
+        Returns:
+            Rendered text surface (shared, do not modify)
+        """
+        key = (font, text, color)
+        surface = self.text_cache.get(key)
+        
+        if surface is None:
+            surface = font.render(text, True, color)
+            self.text_cache[key] = surface
+            if len(self.text_cache) > TEXT_CACHE_SIZE:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        
+        return surface
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# Tetris Vector Environment (worker processes over shared memory)
+#
+# Steps many TetrisEnv games in worker processes. Actions, observations,
+# rewards and done flags live in one multiprocessing.shared_memory block;
+# the trainer reads the observations as NumPy views of it without copying.
+# The trainer and the workers meet at two barriers per step instead of
+# sending messages, and finished games are reset inside the workers.
+#
+# Measure throughput with random actions:
+#     python vecenv.py --envs 256 --workers 4 --steps 2000
+
+import argparse
+import os
+import sys
+import threading
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from env import TetrisEnv, ACTION_COUNTS, OBSERVATION_SPEC
+from config import VECENV_TIMEOUT
+
+# Commands written to the control array before the trainer releases the workers
+STEP, RESET, CLOSE = range(3)
+
+# Arrays are placed at multiples of this many bytes, so separate arrays
+# never share a cache line
+ALIGNMENT = 64
+
+
+def buffer_layout(num_envs, mode):
+    """
+    Lay out the shared arrays of a vector environment.
+    
+    Args:
+        num_envs: Number of games
+        mode: Action mode of the games ('placement' or 'keys')
+    
+    Returns:
+        Tuple of (list of (name, shape, dtype, offset), total size in bytes);
+        observation arrays keep their OBSERVATION_SPEC names
+    """
+    arrays = [(name, (num_envs,) + shape, dtype)
+              for name, (shape, dtype) in OBSERVATION_SPEC.items()]
+    arrays += [
+        ('actions', (num_envs,), np.int32),
+        ('rewards', (num_envs,), np.float32),
+        ('terminated', (num_envs,), np.bool_),
+        ('truncated', (num_envs,), np.bool_),
+        ('control', (1,), np.int32),
+    ]
+    if mode == 'placement':
+        arrays.append(('action_mask', (num_envs, ACTION_COUNTS['placement']), np.bool_))
+    
+    layout = []
+    offset = 0
+    for name, shape, dtype in arrays:
+        layout.append((name, shape, dtype, offset))
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        offset += -(-size // ALIGNMENT) * ALIGNMENT
+    return layout, offset
+
+
+def map_arrays(buffer, layout):
+    """
+    Create NumPy views of the shared arrays.
+    
+    Args:
+        buffer: Shared memory buffer
+        layout: Layout from buffer_layout
+    
+    Returns:
+        Dictionary mapping array name to array
+    """
+    return {name: np.ndarray(shape, dtype, buffer=buffer, offset=offset)
+            for name, shape, dtype, offset in layout}
+
+
+def worker_main(memory_name, layout, start, end, mode, seeds, max_steps, randomizer,
+                step_barrier, done_barrier):
+    """
+    Run the games start to end - 1 of a vector environment.
+    
+    Args:
+        memory_name: Name of the shared memory block
+        layout: Layout from buffer_layout
+        start: Index of the first game
+        end: Index after the last game
+        mode: Action mode of the games
+        seeds: Seed of each game, or None
+        max_steps: Optional episode length limit
+        randomizer: Key of the piece randomizer in RANDOMIZERS
+        step_barrier: Barrier released when a command is ready
+        done_barrier: Barrier released when every worker has carried it out
+    """
+    memory = shared_memory.SharedMemory(memory_name)
+    try:
+        arrays = map_arrays(memory.buf, layout)
+        envs = [
+            TetrisEnv(mode, seed=seeds[i], randomizer=randomizer, max_steps=max_steps,
+                      observation={name: arrays[name][i] for name in OBSERVATION_SPEC})
+            for i in range(start, end)
+        ]
+        actions = arrays['actions']
+        rewards = arrays['rewards']
+        terminated = arrays['terminated']
+        truncated = arrays['truncated']
+        action_mask = arrays.get('action_mask')
+        control = arrays['control']
+        
+        while True:
+            try:
+                step_barrier.wait()
+            except threading.BrokenBarrierError:
+                break
+            command = control[0]
+            if command == CLOSE:
+                break
+            
+            try:
+                for i, env in enumerate(envs, start):
+                    if command == RESET:
+                        env.reset(seeds[i])
+                        rewards[i] = 0
+                        terminated[i] = truncated[i] = False
+                    else:
+                        _, rewards[i], terminated[i], truncated[i], _ = env.step(actions[i])
+                        # Reset here so the trainer never waits for a restart
+                        if terminated[i] or truncated[i]:
+                            env.reset()
+                    if action_mask is not None:
+                        action_mask[i] = env.action_mask()
+            except BaseException:
+                # Wake the trainer instead of leaving it at the barrier
+                done_barrier.abort()
+                raise
+            
+            try:
+                done_barrier.wait()
+            except threading.BrokenBarrierError:
+                break
+    finally:
+        memory.close()
+
+
+class VectorEnv:
+    """
+    Many games stepped in lockstep by worker processes.
+    
+    reset() and step() return dictionaries of arrays shaped (num_envs, ...)
+    that are views of shared memory: the next call overwrites them. When a
+    game ends, its terminated or truncated flag is set and its observation
+    already shows the first state of the next game.
+    """
+    
+    def __init__(self, num_envs, workers=None, mode='placement', seed=None, max_steps=None,
+                 randomizer='uniform', timeout=VECENV_TIMEOUT):
+        """
+        Start the worker processes.
+        
+        Args:
+            num_envs: Number of games
+            workers: Number of worker processes (default: all cores, at
+                     most one per game)
+            mode: Action mode of the games ('placement' or 'keys')
+            seed: Optional seed; game i uses seed + i
+            max_steps: Optional episode length limit
+            randomizer: Key of the piece randomizer in RANDOMIZERS
+            timeout: Seconds to wait for the workers before giving up
+        """
+        if mode not in ACTION_COUNTS:
+            raise ValueError(f"unknown action mode: {mode!r}")
+        workers = min(workers or os.cpu_count(), num_envs)
+        self.num_envs = num_envs
+        self.mode = mode
+        self.action_count = ACTION_COUNTS[mode]
+        self.timeout = timeout
+        self.closed = False
+        
+        layout, size = buffer_layout(num_envs, mode)
+        self.memory = shared_memory.SharedMemory(create=True, size=size)
+        self.arrays = map_arrays(self.memory.buf, layout)
+        self.observation = {name: self.arrays[name] for name in OBSERVATION_SPEC}
+        self.action_mask = self.arrays.get('action_mask')
+        
+        self.step_barrier = multiprocessing.Barrier(workers + 1)
+        self.done_barrier = multiprocessing.Barrier(workers + 1)
+        seeds = [None if seed is None else seed + i for i in range(num_envs)]
+        bounds = [num_envs * k // workers for k in range(workers + 1)]
+        self.processes = [
+            multiprocessing.Process(
+                target=worker_main, daemon=True,
+                args=(self.memory.name, layout, bounds[k], bounds[k + 1], mode, seeds,
+                      max_steps, randomizer, self.step_barrier, self.done_barrier),
+            )
+            for k in range(workers)
+        ]
+        for process in self.processes:
+            process.start()
+    
+    def run(self, command):
+        """
+        Have every worker carry out a command and wait until they have.
+        
+        Raises:
+            RuntimeError: If a worker failed or didn't answer in time
+        """
+        self.arrays['control'][0] = command
+        try:
+            self.step_barrier.wait(self.timeout)
+            if command != CLOSE:
+                self.done_barrier.wait(self.timeout)
+        except threading.BrokenBarrierError:
+            self.close()
+            raise RuntimeError("vector environment worker failed or timed out") from None
+    
+    def reset(self):
+        """
+        Start new games in every slot.
+        
+        Returns:
+            Tuple of (observation, info)
+        """
+        self.run(RESET)
+        return self.observation, {}
+    
+    def step(self, actions):
+        """
+        Perform one action in every game.
+        
+        Args:
+            actions: Sequence of num_envs action indices
+        
+        Returns:
+            Tuple of (observation, rewards, terminated, truncated, info)
+        """
+        self.arrays['actions'][:] = actions
+        self.run(STEP)
+        arrays = self.arrays
+        return self.observation, arrays['rewards'], arrays['terminated'], arrays['truncated'], {}
+    
+    def close(self):
+        """Stop the workers and free the shared memory."""
+        if self.closed:
+            return
+        self.closed = True
+        
+        if self.done_barrier.broken:
+            # After a failure, breaking the barrier releases the workers
+            self.step_barrier.abort()
+        else:
+            self.arrays['control'][0] = CLOSE
+            try:
+                self.step_barrier.wait(self.timeout)
+            except threading.BrokenBarrierError:
+                pass
+        for process in self.processes:
+            process.join(self.timeout)
+            if process.is_alive():
+                process.terminate()
+        
+        self.observation = self.action_mask = self.arrays = None
+        self.memory.close()
+        self.memory.unlink()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    """Entry point for the throughput measurement."""
+    parser = argparse.ArgumentParser(description="Measure vector environment throughput.")
+    parser.add_argument('--envs', type=int, default=64, help="number of games")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument('--mode', choices=sorted(ACTION_COUNTS), default='placement',
+                        help="action mode")
+    parser.add_argument('--steps', type=int, default=1000, help="steps to time")
+    parser.add_argument('--seed', type=int, default=0, help="seed for games and actions")
+    args = parser.parse_args(argv)
+    
+    rng = np.random.default_rng(args.seed)
+    with VectorEnv(args.envs, args.workers, args.mode, seed=args.seed) as envs:
+        envs.reset()
+        episodes = 0
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            if envs.action_mask is not None:
+                # A random legal placement for every game at once
+                actions = (rng.random(envs.action_mask.shape) * envs.action_mask).argmax(axis=1)
+            else:
+                actions = rng.integers(envs.action_count, size=args.envs)
+            _, _, terminated, truncated, _ = envs.step(actions)
+            episodes += int(terminated.sum() + truncated.sum())
+        elapsed = time.perf_counter() - start
+    
+    print(f"{len(envs.processes)} workers, {args.envs} games, {args.mode} actions")
+    print(f"{args.steps * args.envs / elapsed:.0f} game steps/s, "
+          f"{elapsed / args.steps * 1e6:.0f} us per vector step, {episodes} episodes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
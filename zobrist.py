@@ -0,0 +1,81 @@
+# Tetris Zobrist Hashing (64-bit state keys)
+#
+# A board's hash is the XOR of the keys of its occupied cells, so placing
+# or removing a block is a single XOR. Only occupancy is hashed; the shape
+# type stored in a cell is cosmetic and doesn't affect play.
+
+import random
+from functools import lru_cache, reduce
+from operator import xor
+from shapes import SHAPE_TYPES
+from config import BOARD_WIDTH, BOARD_HEIGHT, ZOBRIST_SEED
+
+_rng = random.Random(ZOBRIST_SEED)
+
+# Key of each board cell, indexed by [y][x]
+CELL_KEYS = [[_rng.getrandbits(64) for _ in range(BOARD_WIDTH)] for _ in range(BOARD_HEIGHT)]
+
+# XOR of all the cell keys of each row, for removing complete rows at once
+FULL_ROW_KEYS = [reduce(xor, row) for row in CELL_KEYS]
+
+# Keys of the current and next piece by shape type
+CURRENT_PIECE_KEYS = {shape_type: _rng.getrandbits(64) for shape_type in SHAPE_TYPES}
+NEXT_PIECE_KEYS = {shape_type: _rng.getrandbits(64) for shape_type in SHAPE_TYPES}
+
+
+@lru_cache(maxsize=None)
+def board_keys(width, height):
+    """
+    Get the cell keys for a board size, generated once per size.
+    
+    Args:
+        width: Number of columns
+        height: Number of rows
+    
+    Returns:
+        Tuple of (cell keys indexed by [y][x], full row keys indexed by y);
+        the default size gets CELL_KEYS and FULL_ROW_KEYS
+    """
+    if (width, height) == (BOARD_WIDTH, BOARD_HEIGHT):
+        return CELL_KEYS, FULL_ROW_KEYS
+    rng = random.Random(f"{ZOBRIST_SEED}:{width}x{height}")
+    cell_keys = [[rng.getrandbits(64) for _ in range(width)] for _ in range(height)]
+    return cell_keys, [reduce(xor, row) for row in cell_keys]
+
+
+def grid_hash(grid):
+    """
+    Compute the hash of a grid from scratch.
+    
+    Args:
+        grid: List of rows of cells (None when empty), top row first
+    
+    Returns:
+        64-bit hash of the occupied cells
+    """
+    cell_keys, _ = board_keys(len(grid[0]), len(grid))
+    value = 0
+    for y, row in enumerate(grid):
+        for x, cell in enumerate(row):
+            if cell is not None:
+                value ^= cell_keys[y][x]
+    return value
+
+
+def piece_hash(current=None, next_piece=None):
+    """
+    Get the hash contribution of the current and next piece.
+    
+    Args:
+        current: Shape type of the current piece, or None to leave it out
+        next_piece: Shape type of the next piece, or None to leave it out
+    
+    Returns:
+        64-bit value to XOR into a board hash
+    """
+    value = 0
+    if current is not None:
+        value ^= CURRENT_PIECE_KEYS[current]
+    if next_piece is not None:
+        value ^= NEXT_PIECE_KEYS[next_piece]
+    return value